@@ -0,0 +1,56 @@
+"""
+Async support for DRF API views.
+
+DRF's ``APIView.dispatch`` is synchronous. ``AsyncAPIView`` keeps its
+authentication, permission, throttling, exception handling and content
+negotiation, but awaits ``async def`` handlers. Authentication and
+permission checks may hit the database themselves and run through
+``sync_to_async``.
+
+Under ASGI the request only stays off a thread while it waits if every
+middleware is async-capable; WhiteNoise is not (see ``SERVE_STATIC`` in
+the settings). The ORM, including its ``a...`` methods, still runs each
+query in the request's single thread-sensitive ``sync_to_async``
+thread, so queries of one request run one after another.
+"""
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers (``async def get`` etc.) are coroutines."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # csrf_exempt() hides that the view is a coroutine function on
+        # Django versions whose decorators are not async-aware
+        markcoroutinefunction(view)
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
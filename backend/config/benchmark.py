@@ -0,0 +1,231 @@
+"""
+In-process endpoint latency benchmarks (``manage.py benchmark_endpoints``).
+
+Each benchmarked endpoint is requested through Django's test ``Client``,
+so requests go through the real middleware stack and the URLconf in
+``config/urls.py`` without a network hop. Users authenticate with a
+signed API token. The fixtures are picked from the data in the
+database, usually loaded with ``manage.py seed_scale``:
+
+* the donor with the most food items;
+* the verified organization with the most donations.
+
+Every endpoint is called ``warmup`` times and then ``iterations`` times.
+The results record p50/p95/p99 and mean latency in milliseconds and
+the queries per call. They are saved as a JSON baseline and later runs
+are compared against it. A run regresses when an endpoint's latency
+metric grows by more than ``tolerance`` (and by at least
+``min_delta_ms``), or when it runs more queries. Query counts are
+exact; latency baselines only compare well on the same machine and
+data set.
+
+Requests that write (donation create) run in a transaction that is
+rolled back, so the data set is unchanged and every call sees the same
+rows. Savepoint statements are not counted as queries because they
+only exist due to that transaction.
+"""
+
+import json
+import platform
+import statistics
+import time
+from collections import namedtuple
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from config.query_budget import count_queries
+from donations.models import Donation, Organization
+from food.models import FoodItem, WasteLog
+from users.authentication import issue_token
+
+User = get_user_model()
+
+Endpoint = namedtuple('Endpoint', 'name method path user data')
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')
+
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class BenchmarkError(Exception):
+    """Raised when the database has no data to benchmark against."""
+
+
+def percentile(values, fraction):
+    """Linearly interpolated percentile of a sorted, non-empty list."""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def dataset_size():
+    """Row counts the results depend on, stored with every baseline."""
+    return {
+        'users': User.objects.count(),
+        'organizations': Organization.objects.count(),
+        'food_items': FoodItem.objects.count(),
+        'donations': Donation.objects.count(),
+        'waste_logs': WasteLog.objects.count(),
+    }
+
+
+def load_fixtures(donor_email=None, organization_id=None):
+    """Return the donor and organization the endpoints are requested as."""
+    if donor_email:
+        donor = User.objects.filter(email=donor_email).first()
+    else:
+        donor = User.objects.filter(user_type='donor').annotate(
+            item_count=Count('food_items')
+        ).order_by('-item_count', 'id').first()
+    if donor is None:
+        raise BenchmarkError('No donor to benchmark with; load data with manage.py seed_scale.')
+
+    if organization_id:
+        organization = Organization.objects.filter(pk=organization_id).select_related('user').first()
+    else:
+        busiest = Donation.objects.filter(organization__is_verified=True).values(
+            'organization'
+        ).annotate(donation_count=Count('id')).order_by('-donation_count', 'organization').first()
+        organization = busiest and Organization.objects.select_related('user').get(
+            pk=busiest['organization']
+        )
+    if organization is None:
+        raise BenchmarkError('No organization to benchmark with; load data with manage.py seed_scale.')
+    return donor, organization
+
+
+def get_endpoints(donor, organization):
+    """The benchmarked requests, in the order they are run."""
+    latitude = donor.latitude if donor.latitude is not None else organization.latitude
+    longitude = donor.longitude if donor.longitude is not None else organization.longitude
+    item_ids = list(
+        FoodItem.objects.filter(user=donor).order_by('-created_at', 'id').values_list('id', flat=True)[:3]
+    )
+    return [
+        Endpoint(
+            'organizations_nearby', 'get',
+            f'/api/organizations/nearby/?lat={latitude}&lng={longitude}&distance=10', donor, None
+        ),
+        Endpoint('organizations_match', 'get', '/api/organizations/match/?limit=50', donor, None),
+        Endpoint(
+            'organizations_analytics', 'get',
+            f'/api/organizations/analytics/{organization.id}/', organization.user, None
+        ),
+        Endpoint('donations_list_donor', 'get', '/api/donations/', donor, None),
+        Endpoint('donations_list_organization', 'get', '/api/donations/', organization.user, None),
+        Endpoint('donations_create', 'post', '/api/donations/', donor, {
+            'organization': organization.id,
+            'donation_date': timezone.localdate().isoformat(),
+            'notes': 'Benchmark donation',
+            'food_items_data': [{'food_item': item_id} for item_id in item_ids],
+        }),
+        Endpoint('food_items_list', 'get', '/api/food/items/', donor, None),
+        Endpoint('waste_logs_list', 'get', '/api/food/waste/', donor, None),
+    ]
+
+
+class EndpointBenchmark:
+    """Time a list of endpoints and compare the results with a baseline."""
+
+    def __init__(self, endpoints, iterations=100, warmup=5):
+        self.endpoints = endpoints
+        self.iterations = iterations
+        self.warmup = warmup
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.tokens = {}
+
+    def request(self, endpoint):
+        """Make one request; return (seconds, queries, status code)."""
+        user = endpoint.user
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = issue_token(user)
+        kwargs = {'HTTP_AUTHORIZATION': f'Bearer {self.tokens[user.pk]}'}
+        if endpoint.data is not None:
+            kwargs.update(data=json.dumps(endpoint.data), content_type='application/json')
+        call = getattr(self.client, endpoint.method)
+
+        with count_queries() as counter:
+            if endpoint.method == 'get':
+                start = time.perf_counter()
+                response = call(endpoint.path, **kwargs)
+                elapsed = time.perf_counter() - start
+            else:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    response = call(endpoint.path, **kwargs)
+                    elapsed = time.perf_counter() - start
+                    transaction.set_rollback(True)
+        queries = sum(1 for sql in counter.queries if not sql.startswith(SAVEPOINT_PREFIXES))
+        return elapsed, queries, response.status_code
+
+    def measure(self, endpoint):
+        for _ in range(self.warmup):
+            self.request(endpoint)
+        timings, queries, statuses = [], [], set()
+        for _ in range(self.iterations):
+            elapsed, query_count, status = self.request(endpoint)
+            timings.append(elapsed * 1000)
+            queries.append(query_count)
+            statuses.add(status)
+        timings.sort()
+        return {
+            'method': endpoint.method.upper(),
+            'path': endpoint.path,
+            'calls': self.iterations,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def run(self, log=None):
+        """Benchmark every endpoint; return the results document."""
+        results = {}
+        for endpoint in self.endpoints:
+            results[endpoint.name] = self.measure(endpoint)
+            if log:
+                log(endpoint.name, results[endpoint.name])
+        return {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': self.iterations,
+                'dataset': dataset_size(),
+            },
+            'endpoints': results,
+        }
+
+
+def compare(results, baseline, metric='p50_ms', tolerance=0.25, min_delta_ms=1.0):
+    """Return a list of regression messages of ``results`` against ``baseline``."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f"{name}: {current['queries']} queries per call, baseline {previous['queries']}"
+            )
+        limit = previous[metric] * (1 + tolerance)
+        if current[metric] > limit and current[metric] - previous[metric] >= min_delta_ms:
+            regressions.append(
+                f'{name}: {metric} {current[metric]:.2f} ms, baseline {previous[metric]:.2f} ms '
+                f'(+{(current[metric] / max(previous[metric], 1e-9) - 1) * 100:.0f}%, '
+                f'tolerance {tolerance * 100:.0f}%)'
+            )
+        if current['status'] != previous['status']:
+            regressions.append(f"{name}: status {current['status']}, baseline {previous['status']}")
+    return regressions
@@ -0,0 +1,142 @@
+"""
+Versioned cache namespaces.
+
+Cached values are stored under keys that include the current version of
+their namespace. Bumping the version invalidates everything in the
+namespace at once without having to know the individual keys; the old
+entries simply expire. Versions start from the current time so a
+namespace whose version key was evicted never reuses an old version.
+
+``VersionedResponseCacheMixin`` builds on this to cache whole API
+responses of rarely-changing viewsets, with ETag/304 support.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def get_cache_version(namespace):
+    """Return the current version of a cache namespace."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(*namespaces):
+    """Invalidate everything cached under the given namespaces."""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, *parts):
+    """Return a cache key for ``parts`` under the current namespace version."""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:{get_cache_version(namespace)}:{suffix}'
+
+
+def invalidate_on_change(namespace, *models):
+    """Bump ``namespace`` whenever an instance of one of ``models`` is saved or deleted."""
+    def handler(sender, **kwargs):
+        bump_cache_version(namespace)
+
+    for model in models:
+        uid = f'invalidate-{namespace}-{model._meta.label_lower}'
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _etag_matches(header, etag):
+    """
+    Weak If-None-Match comparison (RFC 9110 13.1.2).
+
+    Compression turns the ETag into ``W/"..."`` on the way out, so clients
+    send it back weak; the ``W/`` prefix is ignored on both sides.
+    """
+    if not header:
+        return False
+    candidates = [_strip_weak(candidate.strip()) for candidate in header.split(',')]
+    return '*' in candidates or _strip_weak(etag) in candidates
+
+
+class VersionedResponseCacheMixin:
+    """
+    Cache the serialized responses of a read-mostly viewset.
+
+    Viewsets set ``cache_namespace`` and wire it up with
+    ``invalidate_on_change``. Responses to ``cached_actions`` are stored
+    under the namespace version and carry a strong ETag derived from it,
+    so a request whose ``If-None-Match`` matches is answered with a 304
+    before the view touches the database.
+
+    Entries are per user unless ``cache_per_user`` is turned off, which
+    only viewsets returning the same data to every user may do.
+    """
+
+    cache_namespace = None
+    cached_actions = ('list', 'retrieve')
+    cache_per_user = True
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 3600)
+
+    def finalize_cache_key(self, request):
+        """Everything besides the namespace version that the response depends on."""
+        media_type = getattr(request, 'accepted_media_type', '')
+        key = f'{self.action}:{request.build_absolute_uri()}:{media_type}'
+        if self.cache_per_user:
+            key = f'user:{request.user.pk}:{key}'
+        return key
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        version = get_cache_version(self.cache_namespace)
+        digest = hashlib.sha256(
+            f'{version}:{self.finalize_cache_key(request)}'.encode()
+        ).hexdigest()
+        etag = f'"{digest}"'
+
+        if _etag_matches(request.headers.get('If-None-Match'), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'{self.cache_namespace}:{version}:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    # Errors are neither cached nor validated
+                    return response
+                cache.set(key, response.data, self.get_cache_timeout())
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.cached_actions:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.cached_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
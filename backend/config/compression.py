@@ -0,0 +1,24 @@
+"""
+Response compression.
+
+``CompressionMiddleware`` is Django's ``GZipMiddleware`` with a size
+threshold (``GZIP_MIN_LENGTH``): small JSON responses are sent as they
+are, since compressing them costs more CPU than it saves on the wire.
+Clients that do not send ``Accept-Encoding: gzip`` always get the plain
+body, and streaming responses (exports) are compressed as they stream.
+Compressed responses carry a weak ETag (``W/"..."``), so code answering
+``If-None-Match`` must compare weakly, as ``config.caching`` does.
+"""
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves responses under ``GZIP_MIN_LENGTH`` bytes alone."""
+
+    def process_response(self, request, response):
+        min_length = getattr(settings, 'GZIP_MIN_LENGTH', 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,189 @@
+"""
+A bounded, thread-safe pool of DB-API connections.
+
+The pool is backend-agnostic: it is handed callables to open, reset,
+check and close connections (see ``config.db.pooled_postgresql``). At
+most ``max_size`` connections are open at once; further checkouts wait
+up to ``timeout`` seconds, in arrival order, for one to be released.
+Idle connections are reused most-recently-released first, checked before
+reuse when they have been idle longer than ``health_check_interval``,
+and closed once they are older than ``max_lifetime``.
+"""
+
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    """Raised when no connection became available within the pool timeout."""
+
+
+class _Waiter:
+    """A checkout queued for the next released connection or free slot."""
+
+    __slots__ = ('event', 'entry')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+
+
+# Handed to a waiter in place of an idle entry: open a new connection
+_SLOT = object()
+
+
+class ConnectionPool:
+    """Bounded connection pool with checkout counters."""
+
+    def __init__(self, max_size=10, max_lifetime=1800, timeout=30, health_check_interval=30,
+                 reset=None, check=None, close=None):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._reset = reset or (lambda connection: True)
+        self._check = check or (lambda connection: True)
+        self._close = close or (lambda connection: connection.close())
+
+        self._lock = threading.Lock()
+        # (connection, created_at, released_at), most recently released last
+        self._idle = deque()
+        # Checkouts waiting for a connection, served first come first served
+        self._waiters = deque()
+        # id(connection) -> created_at for checked out connections
+        self._in_use = {}
+        self._size = 0
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def acquire(self, connect):
+        """Check out a connection, opening one with ``connect()`` if needed."""
+        with self._lock:
+            self.checkouts += 1
+        while True:
+            entry = self._take()
+            if entry is _SLOT:
+                return self._open(connect)
+            connection, created_at, released_at = entry
+            now = time.monotonic()
+            healthy = (
+                now - created_at < self.max_lifetime and
+                (now - released_at < self.health_check_interval or self._safe(self._check, connection))
+            )
+            if healthy:
+                with self._lock:
+                    self._in_use[id(connection)] = created_at
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, discard=False):
+        """Return a checked out connection to the pool (or close it)."""
+        with self._lock:
+            created_at = self._in_use.pop(id(connection), None)
+        if created_at is None:
+            # Not ours (or already released): just close it
+            self._safe(self._close, connection)
+            return
+        now = time.monotonic()
+        if discard or now - created_at >= self.max_lifetime or not self._safe(self._reset, connection):
+            self._discard(connection)
+            return
+        with self._lock:
+            entry = (connection, created_at, now)
+            if not self._hand_off(entry):
+                self._idle.append(entry)
+
+    def _hand_off(self, entry):
+        """Give ``entry`` to the longest waiting checkout, if any (lock held)."""
+        if not self._waiters:
+            return False
+        waiter = self._waiters.popleft()
+        waiter.entry = entry
+        waiter.event.set()
+        return True
+
+    def _take(self):
+        """Pop an idle entry, or reserve a slot for a new connection (_SLOT)."""
+        with self._lock:
+            if not self._waiters:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return _SLOT
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+            self.waits += 1
+
+        started = time.monotonic()
+        waiter.event.wait(self.timeout)
+        with self._lock:
+            self.wait_time += time.monotonic() - started
+            if waiter.entry is None:
+                self._waiters.remove(waiter)
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f'No database connection available within {self.timeout}s '
+                    f'(pool size {self.max_size})'
+                )
+        return waiter.entry
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            self._free_slot()
+            raise
+        with self._lock:
+            self.created += 1
+            self._in_use[id(connection)] = time.monotonic()
+        return connection
+
+    def _discard(self, connection):
+        self._safe(self._close, connection)
+        with self._lock:
+            self.discarded += 1
+        self._free_slot()
+
+    def _free_slot(self):
+        with self._lock:
+            if not self._hand_off(_SLOT):
+                self._size -= 1
+
+    @staticmethod
+    def _safe(func, connection):
+        try:
+            return func(connection) is not False
+        except Exception:
+            return False
+
+    def close_idle(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': len(self._waiters),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': round(self.wait_time, 6),
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
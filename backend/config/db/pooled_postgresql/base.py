@@ -0,0 +1,91 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool.
+
+Use it as ``'ENGINE': 'config.db.pooled_postgresql'`` and configure the
+pool with a ``POOL`` mapping in the database settings (``MAX_SIZE``,
+``MAX_LIFETIME``, ``TIMEOUT``, ``HEALTH_CHECK_INTERVAL``). Django still
+"closes" the connection at the end of each request when ``CONN_MAX_AGE``
+is 0; here that returns it to the pool instead of hanging up, so the
+next request skips the TCP and authentication handshake.
+
+To compare tail latency with and without the pool, run the same load
+against a PostgreSQL database twice, e.g.
+``DB_POOL=True manage.py load_test --spawn wsgi --workers 2 --threads 8
+--worker-class gthread --output pooled.json`` and again with
+``DB_POOL=False``, and compare the p99 columns.
+"""
+
+import threading
+from functools import partial
+
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from ..pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_stats():
+    """Return the counters of every pool in this process, by database alias."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {alias: pool.stats() for (alias, _), pool in pools}
+
+
+def _reset(connection):
+    """Roll back whatever the previous user left open; False if unusable."""
+    if connection.closed:
+        return False
+    if connection.info.transaction_status != 0:  # not idle
+        connection.rollback()
+    return connection.info.transaction_status == 0
+
+
+def _check(connection):
+    if connection.closed:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    """PostgreSQL wrapper whose connections come from a ConnectionPool."""
+
+    @property
+    def pool(self):
+        key = (self.alias, self.settings_dict['NAME'])
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    options = self.settings_dict.get('POOL') or {}
+                    pool = _pools[key] = ConnectionPool(
+                        max_size=options.get('MAX_SIZE', 10),
+                        max_lifetime=options.get('MAX_LIFETIME', 1800),
+                        timeout=options.get('TIMEOUT', 30),
+                        health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30),
+                        reset=_reset,
+                        check=_check,
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(partial(super().get_new_connection, conn_params))
+        # Reused connections skip the parent's setup of this attribute
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None
+            else IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Django keeps using the connection object after closing
+                # inside an atomic block, so it must not be handed out again.
+                self.pool.release(self.connection, discard=self.in_atomic_block)
@@ -0,0 +1,121 @@
+"""
+Streaming CSV / NDJSON exports for list endpoints.
+
+``StreamingExportMixin`` adds an ``export/`` action to a viewset. It
+applies the same queryset and filter backends as ``list``, reads the
+rows with ``.values_list()`` through a server-side cursor
+(``iterator(chunk_size=...)``) and writes them to a
+``StreamingHttpResponse`` as it goes, so memory use does not grow with
+the size of the export. The format is picked with ``?export_format=``
+(``csv`` or ``ndjson``); DRF reserves ``?format=`` for renderers.
+
+The export's queries run while the body is streamed, after the view and
+the middleware have returned, so views declare no ``query_budget`` for
+the action: ``QueryBudgetMiddleware`` would only see the queries run
+before streaming starts.
+"""
+
+import csv
+import io
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Encoder(DjangoJSONEncoder):
+    def encode_value(self, value):
+        """Encode a scalar for CSV the same way it is encoded for JSON."""
+        if value is None:
+            return ''
+        if isinstance(value, (str, int, float, bool)):
+            return value
+        return self.default(value)
+
+
+class StreamingExportMixin:
+    """
+    Add a streaming ``export/`` action to a viewset.
+
+    Viewsets declare ``export_fields``, a mapping of output column to
+    ``values_list()`` lookup, and may override ``get_export_rows`` to attach
+    nested rows (a list of dicts under ``export_nested[0]`` whose columns
+    are ``export_nested[1]``); CSV exports write one line per nested row.
+    """
+
+    export_fields = {}
+    export_nested = None
+    export_filename = 'export'
+    export_chunk_size = 2000
+
+    def get_export_rows(self, queryset):
+        """Yield one dict per exported object."""
+        names = list(self.export_fields)
+        rows = queryset.values_list(*self.export_fields.values())
+        for row in rows.iterator(chunk_size=self.export_chunk_size):
+            yield dict(zip(names, row))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every object matching the list filters as CSV or NDJSON."""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in CONTENT_TYPES:
+            raise ParseError(f"export_format must be one of: {', '.join(CONTENT_TYPES)}.")
+
+        rows = self.get_export_rows(self.filter_queryset(self.get_queryset()))
+        if export_format == 'csv':
+            content = self.stream_csv(rows)
+        else:
+            content = self.stream_ndjson(rows)
+
+        response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_filename}.{export_format}"'
+        )
+        return response
+
+    def stream_ndjson(self, rows):
+        encoder = _Encoder(separators=(',', ':'))
+        for batch in batched(rows, self.export_chunk_size):
+            yield ''.join(encoder.encode(row) + '\n' for row in batch)
+
+    def stream_csv(self, rows):
+        encoder = _Encoder()
+        columns = list(self.export_fields)
+        nested_key, nested_columns = self.export_nested or (None, ())
+        header = columns + [f'{nested_key}_{column}' for column in nested_columns]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for batch in batched(rows, self.export_chunk_size):
+            for row in batch:
+                values = [encoder.encode_value(row[column]) for column in columns]
+                nested = row.get(nested_key) if nested_key else None
+                if not nested:
+                    writer.writerow(values + [''] * len(nested_columns))
+                    continue
+                for child in nested:
+                    writer.writerow(values + [encoder.encode_value(child[c]) for c in nested_columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
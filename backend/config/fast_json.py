@@ -0,0 +1,129 @@
+"""
+JSON renderer and parser backed by orjson.
+
+``FastJSONRenderer`` and ``FastJSONParser`` are drop-in replacements
+for DRF's ``JSONRenderer`` and ``JSONParser`` and produce the same
+bytes:
+
+* datetimes use ``Z`` for UTC, as DRF's encoder does (``OPT_UTC_Z``);
+* ``Decimal`` is rendered as a float, and lazy translation strings and
+  the other types DRF's encoder knows go through that encoder's
+  ``default()``;
+* ``\\u2028`` and ``\\u2029`` are escaped.
+
+Anything orjson cannot do falls back to the DRF classes: indented
+output (``Accept: application/json; indent=4``, the browsable API),
+non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings, rendering
+integers wider than 64 bits, and request bodies that are not UTF-8. Invalid request bodies
+are re-parsed by ``JSONParser``, so clients get the same error
+messages. So are bodies with numbers of 19 or more digits, which orjson
+would turn into floats when they do not fit in 64 bits. orjson writes
+NaN and infinite floats as ``null``; when a rendered body contains
+``null`` the data is checked for them and rendered by DRF, which raises
+``ValueError`` as before.
+
+Known difference: floats in exponent form are written ``1e-7`` rather
+than ``1e-07`` (same value).
+
+orjson is optional. Without it both classes behave exactly like the
+DRF ones.
+"""
+
+import io
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+_encoder = JSONEncoder()
+
+# Digits map to 0 so a run of 19, which may not fit in 64 bits, is a plain
+# substring search; much cheaper than a regex over the whole body
+_DIGITS = bytes.maketrans(b'123456789', b'000000000')
+_LONG_NUMBER = b'0' * 19
+
+_SCALARS = (str, int, bool, type(None))
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+def _has_non_finite(data):
+    """Return whether ``data`` holds a NaN or infinite float or Decimal."""
+    stack = [data]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        value = pop()
+        # Exact type checks first: most values are plain scalars, lists and dicts
+        kind = type(value)
+        if kind is dict:
+            extend(value.values())
+        elif kind is list:
+            extend(value)
+        elif kind in _SCALARS:
+            continue
+        elif isinstance(value, dict):
+            extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            extend(value)
+        elif isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal) and not value.is_finite():
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it can."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None or self.ensure_ascii or not self.compact or
+            self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite(data):
+            # orjson writes them as null; JSONRenderer rejects them
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict javascript subset, like JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when it can."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _LONG_NUMBER in body.translate(_DIGITS):
+            # orjson reads integers beyond 64 bits as floats
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Report the error (or parse what orjson rejects) the way JSONParser does
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,193 @@
+"""
+Read-only fast path for list endpoints.
+
+For every row, ``ModelSerializer`` builds a model instance (plus one for
+each ``select_related`` relation) and then calls ``get_attribute`` and
+``to_representation`` on every field. ``FastListMixin`` serves ``list``
+from ``.values()`` rows instead. A mapping is compiled once from the
+serializer's fields, and each row becomes a plain dict. Columns are
+copied as they are. Only fields whose representation differs from the
+database value (decimals, dates, datetimes, choice labels) are
+converted, using the field's own ``to_representation``, so the output
+is identical to the serializer's. Nested serializers on reverse
+relations are read with one ``.values()`` query per page.
+
+The mapping understands model fields, primary key relations,
+``ReadOnlyField`` sources that follow forward relations,
+``get_<field>_display`` and nested model serializers. Any other field
+raises ``ImproperlyConfigured`` when the mapping is built.
+``FAST_LIST_SERIALIZATION = False`` switches back to the serializers.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.encoding import force_str
+from django.utils.hashable import make_hashable
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields that represent a ``.values()`` value as the value itself
+PLAIN_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+# serializer class -> compiled ValuesMapping
+_mappings = {}
+
+
+def _display(field):
+    choices = dict(make_hashable(field.flatchoices))
+
+    def convert(value):
+        return force_str(choices.get(make_hashable(value), value), strings_only=True)
+    return convert
+
+
+class ValuesMapping:
+    """Turn ``.values()`` rows of a serializer's model into its output."""
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.name
+        # (output name, lookup, converter or None, lookups that omit the field when None)
+        self.fields = []
+        # (output name, mapping, lookup of the parent on the related model, many)
+        self.nested = []
+        for field in serializer._readable_fields:
+            if isinstance(field, (serializers.ListSerializer, serializers.ModelSerializer)):
+                self.add_nested(field)
+            else:
+                self.fields.append(self.compile_field(field))
+        self.lookups = list(dict.fromkeys(
+            [self.pk] +
+            [lookup for _, lookup, _, guards in self.fields for lookup in (lookup, *guards)]
+        ))
+
+    def error(self, field, reason):
+        return ImproperlyConfigured(
+            f'{field.parent.__class__.__name__}.{field.field_name} cannot be read '
+            f'from .values() rows: {reason}.'
+        )
+
+    def compile_field(self, field):
+        *path, name = field.source_attrs
+        model, guards = self.model, ()
+        for depth, attr in enumerate(path):
+            try:
+                relation = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise self.error(field, f'{attr} is not a field of {model.__name__}')
+            if not (relation.many_to_one or relation.one_to_one) or not relation.concrete:
+                raise self.error(field, f'{attr} is not a forward relation')
+            if relation.null:
+                # DRF skips the field when the relation is empty
+                guards += (LOOKUP_SEP.join(field.source_attrs[:depth + 1]),)
+            model = relation.related_model
+        lookup = LOOKUP_SEP.join(field.source_attrs)
+
+        if not path and name.startswith('get_') and name.endswith('_display'):
+            try:
+                model_field = model._meta.get_field(name[4:-8])
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is not None and model_field.choices:
+                return field.field_name, model_field.name, _display(model_field), guards
+
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise self.error(field, f'{name} is not a field of {model.__name__}')
+        if not model_field.concrete or model_field.many_to_many:
+            raise self.error(field, f'{name} is not a column')
+
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return field.field_name, lookup, field.pk_field.to_representation, guards
+            return field.field_name, lookup, None, guards
+        if model_field.is_relation:
+            raise self.error(field, f'unsupported relation field {field.__class__.__name__}')
+        if isinstance(field, PLAIN_FIELDS):
+            return field.field_name, lookup, None, guards
+        return field.field_name, lookup, field.to_representation, guards
+
+    def add_nested(self, field):
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        if not isinstance(child, serializers.ModelSerializer):
+            raise self.error(field, 'nested serializers must be model serializers')
+        try:
+            relation = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise self.error(field, f'{field.source} is not a relation of {self.model.__name__}')
+        if not (relation.one_to_many or relation.one_to_one) or relation.concrete:
+            raise self.error(field, f'{field.source} is not a reverse relation')
+        if relation.one_to_many != many:
+            raise self.error(field, f'many={many} does not match the relation')
+        # Hold the row's primary key until the nested rows are attached
+        self.fields.append((field.field_name, self.pk, None, ()))
+        self.nested.append((field.field_name, ValuesMapping(child), relation.field.name, many))
+
+    def values(self, queryset):
+        """Return ``queryset`` as the ``.values()`` rows this mapping reads."""
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def represent(self, rows):
+        """Return the serialized form of ``rows``, a list of ``.values()`` dicts."""
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert, guards in self.fields:
+                if guards and any(row[guard] is None for guard in guards):
+                    continue
+                value = row[lookup]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        if self.nested and data:
+            self.attach_nested(data)
+        return data
+
+    def attach_nested(self, data):
+        for name, mapping, parent_lookup, many in self.nested:
+            queryset = mapping.model._default_manager.filter(
+                **{f'{parent_lookup}__in': {item[name] for item in data}}
+            )
+            if not mapping.model._meta.ordering:
+                queryset = queryset.order_by(mapping.pk)
+            rows = list(queryset.values(*dict.fromkeys([parent_lookup, *mapping.lookups])))
+            children = defaultdict(list) if many else {}
+            for row, child in zip(rows, mapping.represent(rows)):
+                if many:
+                    children[row[parent_lookup]].append(child)
+                else:
+                    children[row[parent_lookup]] = child
+            for item in data:
+                item[name] = children[item[name]] if many else children.get(item[name])
+
+
+def get_values_mapping(serializer_class):
+    """Return the compiled mapping of ``serializer_class``."""
+    mapping = _mappings.get(serializer_class)
+    if mapping is None:
+        mapping = _mappings[serializer_class] = ValuesMapping(serializer_class())
+    return mapping
+
+
+class FastListMixin:
+    """Serve a viewset's ``list`` from ``.values()`` rows."""
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_LIST_SERIALIZATION', True):
+            return super().list(request, *args, **kwargs)
+        mapping = get_values_mapping(self.get_serializer_class())
+        queryset = mapping.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(mapping.represent(page))
+        return Response(mapping.represent(queryset))
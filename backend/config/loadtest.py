@@ -0,0 +1,515 @@
+"""
+HTTP load generator (``manage.py load_test``).
+
+Virtual users are threads. Each one holds its own keep-alive
+``http.client`` connection and logs in through ``/api/users/login/``.
+It then loops over one scenario with a random think time between
+requests:
+
+* ``donor``: a donor browsing their items, donations, waste stats,
+  nearby organizations and matches;
+* ``organization``: an organization polling its analytics dashboard and
+  its pending donations;
+* ``bulk``: a donor logging batches of food items and donating them.
+
+The number of active users follows ramp stages: ``10x30,50x60`` ramps
+linearly to 10 users over 30 seconds, then to 50 over the next 60.
+Users beyond the current target wait at the end of their current
+request. With ``async_views`` the nearby and analytics requests go to
+the async variants of those views, which only pay off under ASGI.
+
+Login is recorded as its own endpoint; password hashing makes it slow
+and it happens while users ramp up, so read the tail latencies of the
+other endpoints rather than the total.
+
+The target is either a running server (``--url``) or a gunicorn
+started for the run. The WSGI app (``config.wsgi``) runs with sync or
+gthread workers; the ASGI app uses ``gunicorn_asgi.conf.py``. Every
+request is recorded, and the report gives throughput, latency
+percentiles and errors per endpoint and per time window. It also
+includes the server's ``/api/health/`` payload (connection pool stats
+when the pooled engine is used).
+
+Users are taken from the database by username prefix, normally those
+created by ``manage.py seed_scale``. The ``bulk`` scenario writes food items and
+donations, so run it against disposable data.
+"""
+
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from config.benchmark import percentile
+from donations.models import Organization
+
+User = get_user_model()
+
+Stage = namedtuple('Stage', 'users seconds')
+Sample = namedtuple('Sample', 'label started latency status')
+
+SCENARIOS = ('donor', 'organization', 'bulk')
+
+
+class LoadTestError(Exception):
+    """Raised for invalid load test settings, or when the target cannot be reached."""
+
+
+def parse_stages(spec):
+    """Parse ``"10x30,50x60"`` into [Stage(10, 30), Stage(50, 60)]."""
+    stages = []
+    for part in spec.split(','):
+        try:
+            users, seconds = part.strip().lower().split('x')
+            stage = Stage(int(users), float(seconds))
+        except ValueError:
+            raise LoadTestError(f'Invalid stage "{part}"; expected <users>x<seconds>.')
+        if stage.users < 0 or stage.seconds <= 0:
+            raise LoadTestError(f'Invalid stage "{part}".')
+        stages.append(stage)
+    return stages
+
+
+def parse_mix(spec):
+    """Parse ``"donor=70,bulk=10"`` into normalised scenario weights."""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise LoadTestError(f"Unknown scenario \"{name}\"; choose from {', '.join(SCENARIOS)}.")
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise LoadTestError(f'Invalid weight in "{part}".')
+    total = sum(weights.values())
+    if total <= 0:
+        raise LoadTestError('The scenario mix needs a positive weight.')
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def target_users(stages, elapsed):
+    """Active users ``elapsed`` seconds into the run, or None once the stages are over."""
+    previous = 0
+    for stage in stages:
+        if elapsed < stage.seconds:
+            return round(previous + (stage.users - previous) * elapsed / stage.seconds)
+        elapsed -= stage.seconds
+        previous = stage.users
+    return None
+
+
+def assign_scenarios(mix, count):
+    """Scenario of each user slot, spreading the mix evenly over the slots."""
+    assigned = []
+    given = Counter()
+    for slot in range(count):
+        # The scenario furthest behind its share gets the slot
+        name = max(mix, key=lambda name: mix[name] * (slot + 1) - given[name])
+        given[name] += 1
+        assigned.append(name)
+    return assigned
+
+
+class Stopped(Exception):
+    """Raised inside a virtual user when its slot is no longer active."""
+
+
+class Finished(Exception):
+    """Raised inside a virtual user once the run is over."""
+
+
+class Connection:
+    """Keep-alive HTTP connection that reconnects when the server closes it."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                return response.status, response.getheader('Set-Cookie'), response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # A keep-alive connection the server already closed
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class VirtualUser(threading.Thread):
+    """One simulated client running a scenario in a loop."""
+
+    def __init__(self, runner, slot, scenario, account):
+        super().__init__(daemon=True, name=f'vu-{slot}')
+        self.runner = runner
+        self.slot = slot
+        self.scenario = scenario
+        self.account = account
+        self.random = random.Random(runner.seed * 100003 + slot)
+        self.connection = Connection(runner.url, runner.timeout)
+        self.samples = []
+        self.token = None
+        self.cookie = None
+
+    def run(self):
+        try:
+            while True:
+                self.wait_until_active()
+                try:
+                    if self.token is None:
+                        self.login()
+                    getattr(self, f'scenario_{self.scenario}')()
+                except Stopped:
+                    continue
+        except Finished:
+            pass
+        finally:
+            self.connection.close()
+
+    def wait_until_active(self):
+        while not self.runner.is_active(self.slot):
+            time.sleep(0.05)
+
+    def call(self, label, method, path, data=None, auth=True):
+        """Make a request and record it; return the decoded JSON body, or None."""
+        if not self.runner.is_active(self.slot):
+            raise Stopped()
+        headers = {'Accept': 'application/json'}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if auth:
+            if self.cookie and method == 'GET':
+                headers['Cookie'] = self.cookie
+            else:
+                headers['Authorization'] = f'Bearer {self.token}'
+
+        started = time.perf_counter()
+        try:
+            status, set_cookie, content = self.connection.request(method, path, body, headers)
+        except (OSError, http.client.HTTPException) as exc:
+            self.connection.close()
+            status, set_cookie, content = type(exc).__name__, None, b''
+        latency = time.perf_counter() - started
+        self.samples.append(Sample(label, started - self.runner.started, latency, status))
+
+        if self.runner.think_time:
+            time.sleep(self.random.uniform(0, 2 * self.runner.think_time))
+        if isinstance(status, int) and 200 <= status < 300:
+            if set_cookie and label == 'login':
+                morsel = SimpleCookie(set_cookie).get('sessionid')
+                if morsel is not None:
+                    self.cookie = f'sessionid={morsel.value}'
+            try:
+                return json.loads(content) if content else None
+            except ValueError:
+                return None
+        return None
+
+    def login(self):
+        data = self.call('login', 'POST', '/api/users/login/', {
+            'email': self.account['email'], 'password': self.runner.password
+        }, auth=False)
+        if not data or 'token' not in data:
+            # Retry after a pause rather than hammering the login endpoint
+            time.sleep(1)
+            raise Stopped()
+        self.token = data['token']
+        if self.runner.auth != 'session':
+            self.cookie = None
+
+    def scenario_donor(self):
+        account = self.account
+        self.call('food_items', 'GET', '/api/food/items/')
+        self.call('donations', 'GET', '/api/donations/')
+        self.call('waste_stats', 'GET', '/api/food/waste/stats/')
+        if account['latitude'] is not None:
+            self.call(
+                'nearby', 'GET',
+                f"/api/organizations/nearby/{self.runner.async_suffix}"
+                f"?lat={account['latitude']}&lng={account['longitude']}&distance=10"
+            )
+        self.call('match', 'GET', '/api/organizations/match/')
+        self.call('waste_logs', 'GET', '/api/food/waste/')
+
+    def scenario_organization(self):
+        self.call(
+            'analytics', 'GET',
+            f"/api/organizations/analytics/{self.account['organization']}/{self.runner.async_suffix}"
+        )
+        self.call('donations_pending', 'GET', '/api/donations/?status=pending')
+        self.call('donations_recent', 'GET', '/api/donations/?cursor=')
+
+    def scenario_bulk(self):
+        # Log a batch of items, then donate them, so the donor never runs dry
+        expiry = time.strftime('%Y-%m-%d', time.localtime(time.time() + 3 * 86400))
+        items = []
+        for number in range(self.random.randint(1, 5)):
+            item = self.call('food_item_create', 'POST', '/api/food/items/', {
+                'name': f'Load test item {number + 1}',
+                'quantity': '2.00',
+                'unit': 'kg',
+                'expiry_date': expiry,
+            })
+            if item:
+                items.append(item['id'])
+        if not items:
+            return
+        self.call('donation_create', 'POST', '/api/donations/', {
+            'organization': self.random.choice(self.runner.organizations),
+            'donation_date': time.strftime('%Y-%m-%d'),
+            'notes': 'Load test donation',
+            'food_items_data': [{'food_item': item_id} for item_id in items],
+        })
+        self.call('donations', 'GET', '/api/donations/')
+
+
+class LoadTest:
+    """Run the virtual users through the stages and build the report."""
+
+    def __init__(self, url, stages, mix, think_time=0.5, auth='token', prefix='seed',
+                 password='seed-password', timeout=30.0, window=5.0, seed=0, async_views=False):
+        self.url = url.rstrip('/')
+        self.stages = stages
+        self.mix = mix
+        self.think_time = think_time
+        self.auth = auth
+        self.prefix = prefix
+        self.password = password
+        self.timeout = timeout
+        self.window = window
+        self.seed = seed
+        self.async_views = async_views
+        # The nearby and analytics views have async variants under async/
+        self.async_suffix = 'async/' if async_views else ''
+        self.target = 0
+        self.finished = False
+
+    def load_accounts(self, scenarios):
+        """Pick the users for each slot from the database."""
+        donors_needed = sum(1 for name in scenarios if name in ('donor', 'bulk'))
+        orgs_needed = scenarios.count('organization')
+        donors = list(User.objects.filter(
+            user_type='donor', username__startswith=self.prefix, is_active=True
+        ).order_by('id').values('email', 'latitude', 'longitude')[:max(donors_needed, 1)])
+        organizations = list(Organization.objects.filter(
+            user__username__startswith=self.prefix, user__is_active=True, is_verified=True
+        ).order_by('id').values('id', 'user__email'))
+        if not donors or not organizations:
+            raise LoadTestError(
+                f'No donors or verified organizations with usernames starting "{self.prefix}"; '
+                'load data with manage.py seed_scale.'
+            )
+        self.organizations = [org['id'] for org in organizations]
+        accounts = []
+        donor_index = org_index = 0
+        for name in scenarios:
+            if name == 'organization':
+                org = organizations[org_index % len(organizations)]
+                accounts.append({'email': org['user__email'], 'organization': org['id']})
+                org_index += 1
+            else:
+                accounts.append(donors[donor_index % len(donors)])
+                donor_index += 1
+        # Several users on one account share its rows, which is worth knowing
+        self.shared_accounts = donors_needed > len(donors) or orgs_needed > len(organizations)
+        return accounts
+
+    def is_active(self, slot):
+        if self.finished:
+            raise Finished()
+        return slot < self.target
+
+    def run(self, log=None):
+        """Run the load test and return the report."""
+        max_users = max(stage.users for stage in self.stages)
+        scenarios = assign_scenarios(self.mix, max_users)
+        accounts = self.load_accounts(scenarios)
+
+        self.started = time.perf_counter()
+        users = [
+            VirtualUser(self, slot, scenario, account)
+            for slot, (scenario, account) in enumerate(zip(scenarios, accounts))
+        ]
+        for user in users:
+            user.start()
+
+        next_report = self.window
+        while True:
+            elapsed = time.perf_counter() - self.started
+            target = target_users(self.stages, elapsed)
+            if target is None:
+                break
+            self.target = target
+            if log and elapsed >= next_report:
+                done = sum(len(user.samples) for user in users)
+                log(f'{elapsed:6.0f}s  {target:4d} users  {done} requests')
+                next_report += self.window
+            time.sleep(0.05)
+        self.target = 0
+        self.finished = True
+        duration = time.perf_counter() - self.started
+        for user in users:
+            user.join(self.timeout + 5)
+
+        samples = [sample for user in users for sample in user.samples]
+        return self.report(samples, duration, scenarios)
+
+    def report(self, samples, duration, scenarios):
+        by_label = defaultdict(list)
+        for sample in samples:
+            by_label[sample.label].append(sample)
+
+        def summarize(group, seconds):
+            latencies = sorted(sample.latency * 1000 for sample in group)
+            errors = sum(1 for sample in group if not self.ok(sample))
+            summary = {
+                'requests': len(group),
+                'errors': errors,
+                'error_rate': round(errors / len(group), 4) if group else 0,
+                'throughput_rps': round(len(group) / seconds, 2) if seconds else 0,
+            }
+            if latencies:
+                summary.update({
+                    'p50_ms': round(percentile(latencies, 0.50), 2),
+                    'p95_ms': round(percentile(latencies, 0.95), 2),
+                    'p99_ms': round(percentile(latencies, 0.99), 2),
+                    'max_ms': round(latencies[-1], 2),
+                })
+            return summary
+
+        windows = defaultdict(list)
+        for sample in samples:
+            windows[int(sample.started // self.window)].append(sample)
+        timeline = []
+        for index in range(int(duration // self.window) + 1):
+            start = index * self.window
+            summary = summarize(windows.get(index, []), min(self.window, duration - start) or self.window)
+            summary['start_s'] = start
+            summary['users'] = target_users(self.stages, min(start + self.window / 2, duration)) or 0
+            timeline.append(summary)
+
+        return {
+            'config': {
+                'url': self.url,
+                'stages': [list(stage) for stage in self.stages],
+                'mix': self.mix,
+                'scenarios': dict(Counter(scenarios)),
+                'think_time_s': self.think_time,
+                'auth': self.auth,
+                'async_views': self.async_views,
+                'shared_accounts': self.shared_accounts,
+            },
+            'duration_s': round(duration, 2),
+            'total': summarize(samples, duration),
+            'endpoints': {label: summarize(group, duration) for label, group in sorted(by_label.items())},
+            'errors': dict(Counter(str(sample.status) for sample in samples if not self.ok(sample))),
+            'timeline': timeline,
+            'server': self.server_health(),
+        }
+
+    @staticmethod
+    def ok(sample):
+        return isinstance(sample.status, int) and sample.status < 500 and sample.status not in (401, 403, 429)
+
+    def server_health(self):
+        try:
+            status, _, content = Connection(self.url, self.timeout).request('GET', '/api/health/')
+            return json.loads(content) if status == 200 else {'status': status}
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            return {'error': str(exc)}
+
+
+class GunicornServer:
+    """Start gunicorn serving this project for the duration of a ``with`` block."""
+
+    def __init__(self, app='wsgi', workers=2, threads=1, worker_class=None, port=None, log_path=None):
+        self.app = app
+        self.workers = workers
+        self.threads = threads
+        self.worker_class = worker_class
+        self.port = port or self.free_port()
+        self.log_path = log_path
+        self.process = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    @staticmethod
+    def free_port():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def command(self):
+        command = [sys.executable, '-m', 'gunicorn']
+        if self.app == 'asgi':
+            command += ['-c', 'gunicorn_asgi.conf.py', 'config.asgi:application']
+        else:
+            command += ['config.wsgi:application', '--threads', str(self.threads)]
+            if self.worker_class:
+                command += ['--worker-class', self.worker_class]
+        return command + [
+            '--bind', f'127.0.0.1:{self.port}', '--workers', str(self.workers),
+            '--error-logfile', '-',
+        ]
+
+    def __enter__(self):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        # Let the report read the pool counters from /api/health/
+        env.setdefault('INTERNAL_IPS', '127.0.0.1')
+        self.log = open(self.log_path, 'ab') if self.log_path else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            self.command(), cwd=settings.BASE_DIR, env=env,
+            stdout=self.log, stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise LoadTestError(f'gunicorn exited with status {self.process.returncode}.')
+            try:
+                status, _, _ = Connection(self.url, 2).request('GET', '/api/health/')
+                if status == 200:
+                    return self
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.2)
+        self.__exit__()
+        raise LoadTestError('gunicorn did not answer /api/health/ within 60 seconds.')
+
+    def __exit__(self, *exc_info):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log is not subprocess.DEVNULL:
+            self.log.close()
@@ -0,0 +1,71 @@
+"""
+Component benchmarks (``manage.py run_benchmarks``).
+
+``benchmark_endpoints`` times whole requests. The benchmarks here time
+one component, usually side by side with the implementation it
+replaced and across data sizes. Apps define them in a ``benchmarks``
+module with the ``@benchmark`` decorator:
+
+    @benchmark('nearby', sizes=(1000, 10000))
+    def nearby(sizes, repeat, log):
+        ...
+        return [{'size': 1000, 'grid_ms': ..., 'scan_ms': ...}]
+
+A benchmark returns a list of result rows (flat dicts), which the
+command prints as a table and can write as JSON. Benchmarks that need
+rows create them inside ``scratch_data()``, whose transaction is rolled
+back, so the database is left as it was.
+"""
+
+import statistics
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils.module_loading import autodiscover_modules
+
+from config.benchmark import percentile
+
+Benchmark = namedtuple('Benchmark', 'name func sizes description')
+
+_registry = {}
+
+
+def benchmark(name, sizes=(), description=''):
+    """Register a benchmark function under ``name``."""
+    def register(func):
+        _registry[name] = Benchmark(name, func, tuple(sizes), description or (func.__doc__ or '').strip())
+        return func
+    return register
+
+
+def get_benchmarks():
+    """Return the registered benchmarks by name, importing every app's ``benchmarks`` module."""
+    autodiscover_modules('benchmarks')
+    return dict(sorted(_registry.items()))
+
+
+def time_call(func, repeat, warmup=1):
+    """Call ``func`` ``warmup + repeat`` times; return p50, mean and min of the timed calls in ms."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(timings[0], 3),
+    }
+
+
+@contextmanager
+def scratch_data():
+    """Run the block in a transaction that is rolled back at the end."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
@@ -0,0 +1,169 @@
+"""
+Pagination for the REST API.
+
+List endpoints default to page-number pagination, which reports a total
+``count`` but needs a COUNT(*) and an OFFSET scan per page. Views that
+declare a ``keyset_ordering`` also support keyset (cursor) pagination:
+passing ``?cursor=`` (empty for the first page) switches to it. Keyset
+pages are located with a WHERE clause on the ordering columns, so every
+page costs the same and results stay stable under concurrent inserts.
+Keyset pages are always in ``keyset_ordering``: a cursor request whose
+queryset was ordered differently (``?ordering=`` or search relevance) is
+rejected rather than silently reordered.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def keyset_filter(ordering, position):
+    """
+    Return a Q object selecting rows after ``position`` in ``ordering``.
+
+    ``ordering`` is a sequence of field names (``-`` prefix for descending)
+    and ``position`` the values of those fields on the last row seen.
+    """
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, position):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+class KeysetPagination:
+    """Keyset pagination over a view's ``keyset_ordering``."""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    conflicting_ordering_message = (
+        'Cursor pagination is only available in the default ordering ({ordering}); '
+        'remove the ordering or search parameter, or use page-number pagination.'
+    )
+
+    def __init__(self, ordering, page_size):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'KEYSET_PAGINATION_MAX_PAGE_SIZE', 100)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, row):
+        # Pages hold model instances, or dicts when read with .values()
+        if isinstance(row, dict):
+            position = [row[name.lstrip('-')] for name in self.ordering]
+        else:
+            position = [getattr(row, name.lstrip('-')) for name in self.ordering]
+        position = [_encode_value(value) for value in position]
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, model, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def check_ordering(self, queryset):
+        """Reject querysets explicitly ordered other than by a prefix of ``ordering``."""
+        requested = tuple(str(item) for item in queryset.query.order_by)
+        if requested != self.ordering[:len(requested)]:
+            raise ParseError(self.conflicting_ordering_message.format(ordering=','.join(self.ordering)))
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.check_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            position = self.decode_cursor(queryset.model, token)
+            queryset = queryset.filter(keyset_filter(self.ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Requests carrying a ``cursor`` query parameter are paginated with
+    ``KeysetPagination`` when the view declares ``keyset_ordering``;
+    everything else keeps the page-number behaviour and its totals.
+    """
+
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'KEYSET_PAGINATION_MAX_PAGE_SIZE', 100)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'keyset_ordering', None)
+        if ordering and KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(ordering, self.page_size)
+            return self.keyset.paginate_queryset(queryset, request)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
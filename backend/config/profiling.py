@@ -0,0 +1,249 @@
+"""
+Per-request profiling.
+
+With ``REQUEST_PROFILING`` enabled, ``ProfilingMiddleware`` times every
+request and breaks the time down by phase:
+
+* ``db``: queries and time spent executing them, on every connection;
+* ``auth``: DRF authentication (``APIView.perform_authentication``);
+* ``view``: the DRF view from request initialization to the finalized
+  response, including auth, serializer and db time spent in the view;
+* ``serializer``: serializer validation and output (``is_valid()``,
+  ``.data``) and the ``.values()`` fast list path;
+* ``render``: rendering the response body;
+* ``total``: the whole request as seen by the middleware.
+
+The phases overlap (db time is also part of the view), so they do not
+add up to the total. The result is sent in a ``Server-Timing`` header,
+which browser dev tools show next to the request. A share of requests
+(``REQUEST_PROFILING_LOG_SAMPLE_RATE``) is also logged as one JSON line
+on the ``config.profiling`` logger.
+
+The phases are measured by wrapping the DRF methods above, and a query
+wrapper is added to every database connection. This happens once, when
+the middleware is loaded (``install``), and is undone by ``uninstall``,
+which also runs when ``REQUEST_PROFILING`` is turned off by
+``override_settings``. When profiling is disabled the middleware removes
+itself from the stack and nothing is wrapped, so it costs nothing. The
+measurements of a request live in a context variable, which
+``sync_to_async`` carries into async views.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+from config.fast_list import ValuesMapping
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('db', 'auth', 'view', 'serializer', 'render')
+
+_current = ContextVar('request_profile', default=None)
+
+# (owner, attribute, original value) of every wrapped method, while installed
+_originals = []
+
+
+class RequestProfile:
+    """Phase timings of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.view_started = None
+        self._active = set()
+
+    @contextmanager
+    def phase(self, name):
+        # Nested calls of the same phase (serializers inside serializers) count once
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            self._active.discard(name)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value of the ``Server-Timing`` header."""
+        queries = f'{self.queries} quer{"y" if self.queries == 1 else "ies"}'
+        metrics = [f'db;desc="{queries}";dur={self.durations["db"] * 1000:.2f}']
+        metrics += [
+            f'{name};dur={self.durations[name] * 1000:.2f}'
+            for name in PHASES[1:] if self.durations[name]
+        ]
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        data = {f'{name}_ms': round(self.durations[name] * 1000, 3) for name in PHASES}
+        data.update(queries=self.queries, total_ms=round(self.total * 1000, 3))
+        return data
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.durations['db'] += time.perf_counter() - start
+
+
+def _add_execute_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _timed(phase, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.phase(phase):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _view_started(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is not None and profile.view_started is None:
+            profile.view_started = time.perf_counter()
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _view_finished(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is not None and profile.view_started is not None:
+            profile.durations['view'] += time.perf_counter() - profile.view_started
+            profile.view_started = None
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _wrap(owner, name, wrapped):
+    _originals.append((owner, name, owner.__dict__[name]))
+    setattr(owner, name, wrapped)
+
+
+def install():
+    """Wrap the profiled methods and database connections; safe to call more than once."""
+    if _originals:
+        return
+
+    _wrap(APIView, 'perform_authentication', _timed('auth', APIView.perform_authentication))
+    _wrap(APIView, 'initialize_request', _view_started(APIView.initialize_request))
+    _wrap(APIView, 'finalize_response', _view_finished(APIView.finalize_response))
+    _wrap(BaseSerializer, 'is_valid', _timed('serializer', BaseSerializer.is_valid))
+    _wrap(BaseSerializer, 'data', property(_timed('serializer', BaseSerializer.data.fget)))
+    _wrap(ValuesMapping, 'represent', _timed('serializer', ValuesMapping.represent))
+    _wrap(Response, 'rendered_content', property(_timed('render', Response.rendered_content.fget)))
+
+    # Connections are per thread: wrap the open ones and every new one
+    connection_created.connect(_add_execute_wrapper, dispatch_uid='config.profiling')
+    for connection in connections.all(initialized_only=True):
+        _add_execute_wrapper(connection)
+
+
+def uninstall():
+    """Restore what ``install`` wrapped; safe to call when not installed."""
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+    connection_created.disconnect(dispatch_uid='config.profiling')
+    # Only this thread's connections can be reached; the wrapper is a no-op
+    # outside a profiled request anyway
+    for connection in connections.all(initialized_only=True):
+        if _execute_wrapper in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_execute_wrapper)
+
+
+def _profiling_setting_changed(setting, value, **kwargs):
+    if setting == 'REQUEST_PROFILING' and not value:
+        uninstall()
+
+
+setting_changed.connect(_profiling_setting_changed, dispatch_uid='config.profiling.setting_changed')
+
+
+class ProfilingMiddleware:
+    """Send per-phase request timings in a ``Server-Timing`` header and sample them to the log."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILING_LOG_SAMPLE_RATE', 0.0)
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        profile.finish()
+        response['Server-Timing'] = profile.server_timing()
+        if self.sample_rate and random.random() < self.sample_rate:
+            match = request.resolver_match
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+            }
+            record.update(profile.as_dict())
+            logger.info(json.dumps(record))
+        return response
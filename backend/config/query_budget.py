@@ -0,0 +1,134 @@
+"""
+Query counting and per-view query budgets.
+
+Views declare how many queries a request may cost with a ``query_budget``
+attribute, either a single number or a mapping of viewset action to
+number. ``QueryBudgetMiddleware`` counts the queries each request runs,
+reports them in the ``X-Query-Count`` header and flags requests that go
+over budget; with ``QUERY_BUDGET_STRICT`` enabled it raises instead, so
+test runs fail on regressions (``manage.py test`` always runs strict, see
+``config.test_runner``). ``assert_max_queries`` gives tests the
+same check around arbitrary code.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request runs more queries than its budget."""
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.queries.append(sql)
+
+
+@contextmanager
+def count_queries(using=None):
+    """Count the queries run inside the block on the given (or every) connection."""
+    counter = QueryCounter()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
+
+
+@contextmanager
+def assert_max_queries(budget, using=None):
+    """Fail with AssertionError if the block runs more than ``budget`` queries."""
+    with count_queries(using) as counter:
+        yield counter
+    if counter.count > budget:
+        raise AssertionError(
+            f'{counter.count} queries executed, budget is {budget}:\n' +
+            '\n'.join(counter.queries)
+        )
+
+
+def get_query_budget(view_func, request):
+    """Return the budget the view declares for this request, or None."""
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if not isinstance(budget, dict):
+        return budget
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    return budget.get(action)
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the number of queries per request and enforce declared budgets.
+
+    The middleware is async-capable. Under ASGI the ORM runs in the
+    request's thread-sensitive ``sync_to_async`` thread, so the counter is
+    installed on that thread's connections.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.query_budget = None
+        with count_queries() as counter:
+            response = self.get_response(request)
+        return self.check_budget(request, response, counter)
+
+    async def __acall__(self, request):
+        request.query_budget = None
+        counting = count_queries()
+        counter = await sync_to_async(counting.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counting.__exit__)(None, None, None)
+        return self.check_budget(request, response, counter)
+
+    def check_budget(self, request, response, counter):
+        response['X-Query-Count'] = str(counter.count)
+        budget = request.query_budget
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{request.method} {request.path} ran {counter.count} queries, '
+                f'budget is {budget}'
+            )
+            if self.strict:
+                raise QueryBudgetExceeded(message + ':\n' + '\n'.join(counter.queries))
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request)
@@ -0,0 +1,306 @@
+"""
+Indexed full-text search.
+
+``FullTextSearchFilter`` replaces ``filters.SearchFilter`` on viewsets
+whose ``search_fields`` are covered by a full-text index. Models declare
+the indexed columns with a ``search_index_fields`` attribute, and a
+migration installs the index with ``install_search_index``:
+
+* PostgreSQL: a generated ``search_vector`` tsvector column with a GIN
+  index, plus a trigram GIN index (``pg_trgm``) on the model's
+  ``search_trigram_field`` for fuzzy matches.
+* SQLite: an FTS5 external-content table kept in sync by triggers.
+
+Terms combine as in ``SearchFilter``: every term must match, each in
+any of the search fields. Matches are ranked by relevance
+(``ts_rank``/trigram similarity or ``bm25``) unless the request asks for
+another ordering. When the database has no index, or a search field is
+not covered by one, the filter falls back to ``SearchFilter``.
+
+Unlike ``SearchFilter``'s ``icontains``, a term matches words by prefix
+after stemming (``bread`` finds "breads", not "shortbread"), and it
+matches every indexed column of the model a search field reaches: a
+search through ``organization__name`` also finds words in the
+organization's description, city and state.
+
+Whether each index is installed is looked up once per process, after
+``migrate`` (``remember_search_indexes``) or before the first request
+(``warm_search_indexes``), so the lookup never counts against a
+request's query budget.
+"""
+
+import re
+
+from django.apps import apps
+from django.db import connections, router
+from django.db.models import FloatField, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+# Text search configuration of the PostgreSQL tsvector columns
+SEARCH_CONFIG = 'english'
+VECTOR_COLUMN = 'search_vector'
+
+_WORD = re.compile(r'\w+')
+
+# (alias, table) -> whether the index is installed
+_installed = {}
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def install_search_index(connection, table, fields, trigram_field=None, pk='id'):
+    """Create the full-text index of ``table`` over ``fields`` (idempotent)."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            document = " || ' ' || ".join(f"coalesce({qn(field)}, '')" for field in fields)
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} ADD COLUMN IF NOT EXISTS {qn(VECTOR_COLUMN)} tsvector '
+                f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}'::regconfig, {document})) STORED"
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(table + "_search_idx")} '
+                f'ON {qn(table)} USING gin ({qn(VECTOR_COLUMN)})'
+            )
+            if trigram_field:
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {qn(f"{table}_{trigram_field}_trgm_idx")} '
+                    f'ON {qn(table)} USING gin ({qn(trigram_field)} gin_trgm_ops)'
+                )
+        elif connection.vendor == 'sqlite':
+            fts = _fts_table(table)
+            columns = ', '.join(qn(field) for field in fields)
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5({columns}, '
+                f"content='{table}', content_rowid='{pk}', "
+                f"tokenize='porter unicode61 remove_diacritics 2')"
+            )
+            _create_triggers(cursor, connection, table, fields, pk)
+            cursor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')")
+    _installed.pop((connection.alias, table), None)
+
+
+def drop_search_index(connection, table, trigram_field=None):
+    """Remove what ``install_search_index`` created."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            if trigram_field:
+                cursor.execute(f'DROP INDEX IF EXISTS {qn(f"{table}_{trigram_field}_trgm_idx")}')
+            cursor.execute(f'DROP INDEX IF EXISTS {qn(table + "_search_idx")}')
+            cursor.execute(f'ALTER TABLE {qn(table)} DROP COLUMN IF EXISTS {qn(VECTOR_COLUMN)}')
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {qn(f"{_fts_table(table)}_{suffix}")}')
+            cursor.execute(f'DROP TABLE IF EXISTS {qn(_fts_table(table))}')
+    _installed.pop((connection.alias, table), None)
+
+
+def _create_triggers(cursor, connection, table, fields, pk):
+    qn = connection.ops.quote_name
+    fts = _fts_table(table)
+    columns = ', '.join(qn(field) for field in fields)
+    new = ', '.join(f'new.{qn(field)}' for field in fields)
+    old = ', '.join(f'old.{qn(field)}' for field in fields)
+    delete = (
+        f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {columns}) "
+        f"VALUES ('delete', old.{qn(pk)}, {old});"
+    )
+    insert = f'INSERT INTO {qn(fts)}(rowid, {columns}) VALUES (new.{qn(pk)}, {new});'
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_ai")} AFTER INSERT ON {qn(table)} '
+        f'BEGIN {insert} END'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_ad")} AFTER DELETE ON {qn(table)} '
+        f'BEGIN {delete} END'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {qn(fts + "_au")} AFTER UPDATE ON {qn(table)} '
+        f'BEGIN {delete} {insert} END'
+    )
+
+
+def repair_search_triggers(sender, using='default', **kwargs):
+    """
+    ``post_migrate`` receiver restoring FTS5 triggers on SQLite.
+
+    SQLite migrations that alter a table rebuild it, which drops its
+    triggers; the index is recreated and rebuilt when that happened.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    for model in sender.get_models():
+        fields = getattr(model, 'search_index_fields', None)
+        table = model._meta.db_table
+        if not fields or not _sqlite_object_exists(connection, 'table', _fts_table(table)):
+            continue
+        if not _sqlite_object_exists(connection, 'trigger', f'{_fts_table(table)}_au'):
+            install_search_index(connection, table, fields, pk=model._meta.pk.column)
+
+
+def _sqlite_object_exists(connection, kind, name):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM sqlite_master WHERE type = %s AND name = %s', [kind, name])
+        return cursor.fetchone() is not None
+
+
+def _index_exists(connection, table):
+    if connection.vendor == 'sqlite':
+        return _sqlite_object_exists(connection, 'table', _fts_table(table))
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM information_schema.columns '
+                'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s',
+                [table, VECTOR_COLUMN]
+            )
+            return cursor.fetchone() is not None
+    return False
+
+
+def is_installed(connection, model):
+    """Whether the full-text index of ``model`` exists in this database."""
+    key = (connection.alias, model._meta.db_table)
+    if key not in _installed:
+        _installed[key] = _index_exists(connection, model._meta.db_table)
+    return _installed[key]
+
+
+def remember_search_indexes(sender, using='default', **kwargs):
+    """``post_migrate`` receiver recording which of the app's indexes are installed."""
+    connection = connections[using]
+    for model in sender.get_models():
+        if getattr(model, 'search_index_fields', None):
+            table = model._meta.db_table
+            _installed[(using, table)] = _index_exists(connection, table)
+
+
+def warm_search_indexes(**kwargs):
+    """
+    ``request_started`` receiver looking the indexes up before the first request.
+
+    It runs ahead of the middleware, so the lookup is not part of any
+    request's query count; afterwards it only reads the cache.
+    """
+    for model in apps.get_models():
+        if getattr(model, 'search_index_fields', None):
+            is_installed(connections[router.db_for_read(model)], model)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """SearchFilter backed by the full-text indexes, ranked by relevance."""
+
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+
+        words = [word.lower() for word in _WORD.findall(' '.join(terms))]
+        connection = connections[queryset.db]
+        groups = self.group_search_fields(queryset.model, search_fields)
+        if not words or groups is None or not all(
+            is_installed(connection, model) for model in groups.values()
+        ):
+            return super().filter_queryset(request, queryset, view)
+
+        # Every word must match, in any of the models, like SearchFilter's terms
+        for word in words:
+            condition = Q()
+            for path, model in groups.items():
+                sql, params = self.match_sql(connection, model, word)
+                lookup = f'{path}__in' if path else 'pk__in'
+                condition |= Q(**{lookup: RawSQL(sql, params)})
+            queryset = queryset.filter(condition)
+
+        if '' in groups:
+            sql, params = self.rank_sql(connection, queryset.model, words)
+            queryset = queryset.annotate(
+                **{self.rank_annotation: RawSQL(sql, params, output_field=FloatField())}
+            ).order_by(f'-{self.rank_annotation}', 'pk')
+        return queryset
+
+    def group_search_fields(self, model, search_fields):
+        """
+        Map each relation path in ``search_fields`` to the model it reaches.
+
+        Returns None when a field cannot be served by a full-text index:
+        a lookup prefix (``^``, ``=``, ``@``, ``$``) or a column the target
+        model does not index.
+        """
+        groups = {}
+        for search_field in search_fields:
+            if search_field[0] in self.lookup_prefixes:
+                return None
+            *path, name = search_field.split(LOOKUP_SEP)
+            target = model
+            for part in path:
+                target = target._meta.get_field(part).related_model
+                if target is None:
+                    return None
+            if name not in getattr(target, 'search_index_fields', ()):
+                return None
+            groups[LOOKUP_SEP.join(path)] = target
+        return groups
+
+    def match_sql(self, connection, model, word):
+        """Return SQL selecting the primary keys of ``model`` rows matching ``word``."""
+        qn = connection.ops.quote_name
+        table = model._meta.db_table
+        pk = qn(model._meta.pk.column)
+        if connection.vendor == 'postgresql':
+            sql = (
+                f'SELECT {pk} FROM {qn(table)} '
+                f'WHERE {qn(VECTOR_COLUMN)} @@ to_tsquery(%s::regconfig, %s)'
+            )
+            params = [SEARCH_CONFIG, self.tsquery([word])]
+            trigram_field = getattr(model, 'search_trigram_field', None)
+            if trigram_field:
+                # Word similarity: the word against the closest part of the field
+                sql += f' OR %s <%% {qn(trigram_field)}'
+                params.append(word)
+            return sql, params
+        fts = qn(_fts_table(table))
+        return f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [self.fts5_query([word])]
+
+    def rank_sql(self, connection, model, words):
+        """
+        Return SQL computing the relevance of the current row (higher is better).
+
+        Any of the words counts, since a row may match some of them only
+        through a related model; rows without any rank 0.
+        """
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        pk = qn(model._meta.pk.column)
+        if connection.vendor == 'postgresql':
+            sql = f'ts_rank({table}.{qn(VECTOR_COLUMN)}, to_tsquery(%s::regconfig, %s))'
+            params = [SEARCH_CONFIG, self.tsquery(words, ' | ')]
+            trigram_field = getattr(model, 'search_trigram_field', None)
+            if trigram_field:
+                sql = f'GREATEST({sql}, similarity({table}.{qn(trigram_field)}, %s))'
+                params.append(' '.join(words))
+            return sql, params
+        fts = qn(_fts_table(model._meta.db_table))
+        return (
+            f'COALESCE((SELECT -bm25({fts}) FROM {fts} '
+            f'WHERE {fts} MATCH %s AND rowid = {table}.{pk}), 0)',
+            [self.fts5_query(words, ' OR ')]
+        )
+
+    @staticmethod
+    def tsquery(words, operator=' & '):
+        return operator.join(f'{word}:*' for word in words)
+
+    @staticmethod
+    def fts5_query(words, operator=' '):
+        return operator.join(f'"{word}"*' for word in words)
@@ -47,6 +47,8 @@ MIDDLEWARE = [
     
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this
     'django.middleware.security.SecurityMiddleware',
+    'config.profiling.ProfilingMiddleware',
+    'config.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,8 +56,26 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.query_budget.QueryBudgetMiddleware',
 ]
 
+# WhiteNoise is sync-only: under ASGI it makes Django run the middleware
+# chain on a thread, so every request holds one even in async views. ASGI
+# deployments that serve static files from a proxy or CDN should set
+# SERVE_STATIC=False to drop it.
+if os.environ.get('SERVE_STATIC', 'True') != 'True':
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Query budgets
+# Counts the queries of every request and checks them against the
+# `query_budget` declared on each view (see config/query_budget.py).
+# Strict mode raises instead of logging, which makes test runs fail.
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# `manage.py test` always runs with strict budgets (see config/test_runner.py)
+TEST_RUNNER = 'config.test_runner.QueryBudgetTestRunner'
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -87,12 +107,48 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'admin'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Seconds to keep a connection per thread; 0 closes it after each request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # Used by the pooled engine only (DB_POOL=True)
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+            'HEALTH_CHECK_INTERVAL': float(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', '30')),
+        },
     }
 }
 
+# Check connections out of a per-process pool (config.db.pooled_postgresql).
+# Keep DB_CONN_MAX_AGE at 0 with it so connections return to the pool per request.
+if os.environ.get('DB_POOL', 'False') == 'True':
+    DATABASES['default']['ENGINE'] = 'config.db.pooled_postgresql'
+
+# Addresses allowed to see the pool counters on /api/health/ (comma-separated).
+# Behind a reverse proxy REMOTE_ADDR is the proxy, so leave the proxy out.
+INTERNAL_IPS = [ip for ip in os.environ.get('INTERNAL_IPS', '').split(',') if ip]
+
 # User model
 AUTH_USER_MODEL = 'users.User'
 
+# Cache
+# CACHE_BACKEND picks a Django cache backend; file-based caches store entries
+# under CACHE_LOCATION. Use a shared backend (Redis, Memcached) when running
+# several processes so invalidations are seen by all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Sessions are read through the cache, falling back to the database
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Session users are resolved through the user cache (users.cache)
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -136,16 +192,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.HybridPagination',
     'PAGE_SIZE': 10,
 }
 
+# Responses smaller than this are not gzipped (config.compression)
+GZIP_MIN_LENGTH = int(os.environ.get('GZIP_MIN_LENGTH', '1024'))
+
+# Largest page a client may request with ?page_size= (both pagination modes)
+KEYSET_PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('KEYSET_PAGINATION_MAX_PAGE_SIZE', '100'))
+
+# Responses of viewsets using config.caching.VersionedResponseCacheMixin
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '3600'))
+
+# Waste stats are invalidated on change, so they can be cached for long
+WASTE_STATS_CACHE_TIMEOUT = int(os.environ.get('WASTE_STATS_CACHE_TIMEOUT', '3600'))
+
+# Expiry sweep (manage.py sweep_expiring_items)
+EXPIRY_SWEEP_HORIZON_DAYS = int(os.environ.get('EXPIRY_SWEEP_HORIZON_DAYS', '7'))
+EXPIRY_SWEEP_SHELF_LIFE_FRACTION = float(os.environ.get('EXPIRY_SWEEP_SHELF_LIFE_FRACTION', '0.25'))
+
+# Largest upload accepted by the food item / waste log import endpoints
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', '50000'))
+
+# Lifetime of signed API tokens, and of cached user rows used to verify them
+AUTH_TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE', str(60 * 60 * 24)))
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', '60'))
+
+# Endpoint benchmarks (manage.py benchmark_endpoints): where the baseline
+# is kept, and how much slower than it an endpoint may get
+BENCHMARK_BASELINE = os.environ.get('BENCHMARK_BASELINE', str(BASE_DIR / 'benchmarks' / 'baseline.json'))
+BENCHMARK_TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', '0.25'))
+
+# Serve list endpoints from .values() rows instead of the serializers
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'True') == 'True'
+
+# Per-request phase timings in a Server-Timing header (config.profiling),
+# and the share of profiled requests also logged as JSON lines
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+REQUEST_PROFILING_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_LOG_SAMPLE_RATE', '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'config.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
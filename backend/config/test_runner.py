@@ -0,0 +1,25 @@
+"""
+Test runner enforcing the query budgets.
+
+Every test runs with ``QueryBudgetMiddleware`` enabled in strict mode, so
+a view that goes over its declared ``query_budget`` fails the test that
+requested it instead of logging a warning.
+"""
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """DiscoverRunner with ``QUERY_BUDGET_ENABLED`` and ``QUERY_BUDGET_STRICT`` on."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_settings = override_settings(
+            QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True
+        )
+        self.query_budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
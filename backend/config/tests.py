@@ -0,0 +1,377 @@
+import io
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from donations.views import DonationViewSet
+
+from . import profiling
+from .db.pool import ConnectionPool, PoolTimeout
+from .db.pooled_postgresql import base as pooled_base
+from .fast_json import FastJSONParser, FastJSONRenderer
+from .query_budget import QueryBudgetExceeded
+
+
+class FastJSONTests(SimpleTestCase):
+    """The orjson renderer and parser behave like DRF's."""
+
+    def assert_same_render(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def assert_same_parse(self, body):
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_render(self):
+        self.assert_same_render({
+            'id': 1, 'name': 'Caf\u00e9 \u2028 \u2029', 'quantity': Decimal('1.50'), 'notes': None,
+            'created_at': datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc), 'items': [1, 2.5, True],
+        })
+
+    def test_render_wide_integer(self):
+        self.assert_same_render({'count': 123456789012345678901234567890})
+
+    def test_render_non_finite_numbers_raises(self):
+        for value in (float('nan'), float('inf'), Decimal('NaN')):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({'value': value, 'nested': [{'value': value}]})
+
+    def test_parse(self):
+        self.assert_same_parse(b'{"name": "Bread", "quantity": "1.50", "items": [1, 2.5, null]}')
+
+    def test_parse_wide_integer(self):
+        data = FastJSONParser().parse(io.BytesIO(b'{"id": 123456789012345678901234567890}'))
+        self.assertEqual(data['id'], 123456789012345678901234567890)
+        self.assert_same_parse(b'[-9223372036854775809, 18446744073709551616, 9223372036854775807]')
+
+
+class QueryBudgetTests(TestCase):
+    """The test runner enforces the declared budgets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='donor', email='donor@example.com', password=None
+        ))
+
+    def test_requests_are_counted(self):
+        response = self.client.get('/api/donations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Query-Count', response)
+
+    def test_overrun_fails(self):
+        with patch.object(DonationViewSet, 'query_budget', {'list': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/donations/')
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_LOG_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+    """Server-Timing headers and sampled logs of ProfilingMiddleware."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='donor', email='donor@example.com', password=None
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing(self):
+        response = self.client.get('/api/donations/')
+        metrics = dict(
+            re.match(r'(\w+);(?:desc="(\d+) quer(?:y|ies)";)?dur=[\d.]+$', metric).group(1, 2)
+            for metric in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(list(metrics), ['db', 'auth', 'view', 'serializer', 'render', 'total'])
+        # Both middleware see the same queries (force_authenticate reads no session)
+        self.assertEqual(metrics['db'], response['X-Query-Count'])
+
+    def test_log_sampling(self):
+        for rate, draw, logged in ((0, 0.0, False), (0.5, 0.3, True), (0.5, 0.7, False), (1, 0.99, True)):
+            with self.subTest(rate=rate, draw=draw):
+                with self.settings(REQUEST_PROFILING_LOG_SAMPLE_RATE=rate):
+                    client = APIClient()
+                    client.force_authenticate(self.user)
+                    with patch('config.profiling.random.random', return_value=draw):
+                        if logged:
+                            with self.assertLogs('config.profiling', 'INFO') as logs:
+                                client.get('/api/donations/')
+                            self.assertIn('"path": "/api/donations/"', logs.output[0])
+                        else:
+                            with self.assertNoLogs('config.profiling'):
+                                client.get('/api/donations/')
+
+
+class ProfilingInstallTests(SimpleTestCase):
+    """The DRF wrapping does not outlive the setting."""
+
+    def test_disabling_the_setting_uninstalls(self):
+        original = APIView.__dict__['perform_authentication']
+        with self.settings(REQUEST_PROFILING=True):
+            profiling.install()
+            self.assertIsNot(APIView.__dict__['perform_authentication'], original)
+        self.assertIs(APIView.__dict__['perform_authentication'], original)
+        self.assertFalse(profiling._originals)
+
+
+class FakeConnection:
+    """Stands in for a DB-API connection in the pool tests."""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ConnectionPool with fake connections and a fake clock."""
+
+    def setUp(self):
+        self.opened = []
+        self.clock = FakeClock()
+        patcher = patch('config.db.pool.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self):
+        connection = FakeConnection(len(self.opened))
+        self.opened.append(connection)
+        return connection
+
+    def pool(self, **kwargs):
+        kwargs.setdefault('check', lambda connection: connection.healthy)
+        return ConnectionPool(**kwargs)
+
+    def test_reuses_released_connections(self):
+        pool = self.pool()
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(self.connect), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use']), (1, 2, 1))
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.pool(max_size=1, timeout=0.01)
+        pool.acquire(self.connect)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+        stats = pool.stats()
+        self.assertEqual((stats['timeouts'], stats['waits'], stats['waiting']), (1, 1, 0))
+
+    def test_release_hands_off_to_a_waiting_checkout(self):
+        pool = self.pool(max_size=1, timeout=10)
+        first = pool.acquire(self.connect)
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(pool.acquire(self.connect)))
+        waiter.start()
+        while pool.stats()['waiting'] == 0:
+            time.sleep(0.001)
+        pool.release(first)
+        waiter.join(5)
+        self.assertEqual(received, [first])
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_discard_frees_the_slot_for_a_waiting_checkout(self):
+        pool = self.pool(max_size=1, timeout=10)
+        first = pool.acquire(self.connect)
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(pool.acquire(self.connect)))
+        waiter.start()
+        while pool.stats()['waiting'] == 0:
+            time.sleep(0.001)
+        pool.release(first, discard=True)
+        waiter.join(5)
+        self.assertTrue(first.closed)
+        self.assertEqual(received, [self.opened[1]])
+
+    def test_connections_are_recycled_after_max_lifetime(self):
+        pool = self.pool(max_lifetime=60)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        self.clock.now += 61
+        second = pool.acquire(self.connect)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        # Released past its lifetime: closed instead of kept idle
+        self.clock.now += 61
+        pool.release(second)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_are_checked_before_reuse(self):
+        checked = []
+        pool = self.pool(health_check_interval=30, check=lambda connection: checked.append(connection) or connection.healthy)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        self.clock.now += 10
+        self.assertIs(pool.acquire(self.connect), first)
+        self.assertEqual(checked, [])
+
+        pool.release(first)
+        self.clock.now += 31
+        first.healthy = False
+        second = pool.acquire(self.connect)
+        self.assertEqual(checked, [first])
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_connections_that_fail_reset_are_discarded(self):
+        def reset(connection):
+            if connection.number == 1:
+                raise RuntimeError('connection lost')
+            return connection.number != 0
+
+        pool = self.pool(reset=reset)
+        for _ in range(2):
+            connection = pool.acquire(self.connect)
+            pool.release(connection)
+            self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = self.pool(max_size=1, timeout=0.01)
+
+        def connect():
+            raise OSError('refused')
+
+        with self.assertRaises(OSError):
+            pool.acquire(connect)
+        self.assertIsNotNone(pool.acquire(self.connect))
+
+    def test_concurrent_checkouts_stay_within_max_size(self):
+        pool = self.pool(max_size=3, timeout=10)
+        lock = threading.Lock()
+        in_use = set()
+        peak = []
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(200):
+                    connection = pool.acquire(self.connect)
+                    with lock:
+                        self.assertNotIn(connection, in_use)
+                        in_use.add(connection)
+                        peak.append(len(in_use))
+                    with lock:
+                        in_use.discard(connection)
+                    pool.release(connection)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(errors, [])
+        self.assertLessEqual(max(peak), 3)
+        stats = pool.stats()
+        self.assertLessEqual(stats['created'], 3)
+        self.assertEqual((stats['in_use'], stats['checkouts'], stats['timeouts']), (0, 1600, 0))
+
+
+class FakePsycopgConnection(FakeConnection):
+    """The parts of a psycopg connection the pooled backend uses."""
+
+    def __init__(self, number=0, transaction_status=0):
+        super().__init__(number)
+        self.info = type('Info', (), {'transaction_status': transaction_status})()
+        self.executed = []
+
+    def rollback(self):
+        self.info.transaction_status = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def execute(self, sql):
+                connection.executed.append(sql)
+
+        return Cursor()
+
+
+class PooledPostgreSQLTests(SimpleTestCase):
+    """The pooled backend's reset/check hooks and its use of the pool."""
+
+    def test_reset_rolls_back_open_transactions(self):
+        idle, in_transaction, closed = (
+            FakePsycopgConnection(), FakePsycopgConnection(transaction_status=2), FakePsycopgConnection()
+        )
+        closed.closed = True
+        self.assertTrue(pooled_base._reset(idle))
+        self.assertTrue(pooled_base._reset(in_transaction))
+        self.assertEqual(in_transaction.info.transaction_status, 0)
+        self.assertFalse(pooled_base._reset(closed))
+
+    def test_check_runs_a_query(self):
+        connection = FakePsycopgConnection()
+        self.assertTrue(pooled_base._check(connection))
+        self.assertEqual(connection.executed, ['SELECT 1'])
+        connection.closed = True
+        self.assertFalse(pooled_base._check(connection))
+
+    def get_wrapper(self):
+        name = f'pooled-{self._testMethodName}'
+        self.addCleanup(pooled_base._pools.pop, ('default', name), None)
+        return ConnectionHandler({'default': {
+            'ENGINE': 'config.db.pooled_postgresql', 'NAME': name, 'POOL': {'MAX_SIZE': 2},
+        }})['default']
+
+    def test_closing_returns_the_connection_to_the_pool(self):
+        wrapper = self.get_wrapper()
+        opened = []
+
+        def connect(wrapper, conn_params):
+            opened.append(FakePsycopgConnection(len(opened)))
+            return opened[-1]
+
+        with patch.object(PostgreSQLDatabaseWrapper, 'get_new_connection', connect):
+            wrapper.connection = wrapper.get_new_connection({})
+            wrapper._close()
+            self.assertIs(wrapper.get_new_connection({}), opened[0])
+            self.assertEqual(len(opened), 1)
+            self.assertEqual(wrapper.pool.max_size, 2)
+
+            # Closed inside an atomic block: never handed out again
+            wrapper.connection = opened[0]
+            wrapper.in_atomic_block = True
+            wrapper._close()
+            wrapper.in_atomic_block = False
+            self.assertTrue(opened[0].closed)
+            self.assertIs(wrapper.get_new_connection({}), opened[1])
+        stats = pooled_base.pool_stats()['default']
+        self.assertEqual((stats['created'], stats['discarded']), (2, 1))
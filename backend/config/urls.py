@@ -2,12 +2,19 @@
 URL configuration for the Food Donation & Waste Tracker project.
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 
 def health_check(request):
-    return JsonResponse({"status": "ok"})
+    data = {"status": "ok"}
+    # Pool internals are only shown to staff sessions and INTERNAL_IPS (monitoring, load tests)
+    internal = request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS or request.user.is_staff
+    if internal and 'config.db.pooled_postgresql' in {db['ENGINE'] for db in settings.DATABASES.values()}:
+        from config.db.pooled_postgresql.base import pool_stats
+        data["db_pools"] = pool_stats()
+    return JsonResponse(data)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -0,0 +1,96 @@
+"""
+Benchmarks of the list endpoints' serialization (``manage.py run_benchmarks``).
+
+They read the rows already in the database, as a staff user sees them,
+so run them against a seeded database (``seed_scale``).
+"""
+
+import io
+
+from django.contrib.auth import get_user_model
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.fast_json import FastJSONParser, FastJSONRenderer
+from config.fast_list import get_values_mapping
+from config.microbench import benchmark, time_call
+from food.views import FoodItemViewSet, WasteLogViewSet
+
+from .views import DonationViewSet
+
+User = get_user_model()
+
+
+def list_view(viewset_class, user):
+    view = viewset_class(action='list', format_kwarg=None)
+    view.request = Request(APIRequestFactory().get('/'))
+    view.request.user = user
+    return view
+
+
+@benchmark('fast_list', sizes=(20, 100, 1000))
+def fast_list(sizes, repeat, log):
+    """Per-row cost of a list page: serializers vs the .values() fast path, with and without the page query."""
+    staff = User(is_staff=True, user_type='donor')
+    rows = []
+    for viewset_class in (DonationViewSet, FoodItemViewSet, WasteLogViewSet):
+        view = list_view(viewset_class, staff)
+        serializer_class = view.get_serializer_class()
+        mapping = get_values_mapping(serializer_class)
+        for size in sizes:
+            queryset = view.get_queryset().order_by(*viewset_class.keyset_ordering)[:size]
+            count = queryset.count()
+            if not count:
+                continue
+
+            def serializers():
+                return serializer_class(list(queryset), many=True).data
+
+            def values():
+                return mapping.represent(list(mapping.values(queryset)))
+
+            # The same work without fetching the page itself
+            instances = list(queryset)
+            values_rows = list(mapping.values(queryset))
+            timings = {
+                'serializer': time_call(serializers, repeat)['p50_ms'],
+                'values': time_call(values, repeat)['p50_ms'],
+                'serializer_only': time_call(
+                    lambda: serializer_class(instances, many=True).data, repeat
+                )['p50_ms'],
+                'values_only': time_call(lambda: mapping.represent(values_rows), repeat)['p50_ms'],
+            }
+            row = {'viewset': viewset_class.__name__, 'rows': count}
+            for name, ms in timings.items():
+                row[f'{name}_us_per_row'] = round(ms * 1000 / count, 1)
+            row['speedup'] = round(timings['serializer'] / timings['values'], 1)
+            row['speedup_without_fetch'] = round(timings['serializer_only'] / timings['values_only'], 1)
+            rows.append(row)
+    return rows
+
+
+@benchmark('json', sizes=(20, 100, 1000))
+def json_codec(sizes, repeat, log):
+    """Rendering a donation list page and parsing it back: DRF's json vs orjson."""
+    view = list_view(DonationViewSet, User(is_staff=True, user_type='donor'))
+    mapping = get_values_mapping(view.get_serializer_class())
+    rows = []
+    for size in sizes:
+        data = mapping.represent(list(mapping.values(
+            view.get_queryset().order_by(*DonationViewSet.keyset_ordering)[:size]
+        )))
+        if not data:
+            continue
+        body = JSONRenderer().render(data)
+        timings = {
+            'render_json': time_call(lambda: JSONRenderer().render(data), repeat),
+            'render_orjson': time_call(lambda: FastJSONRenderer().render(data), repeat),
+            'parse_json': time_call(lambda: JSONParser().parse(io.BytesIO(body)), repeat),
+            'parse_orjson': time_call(lambda: FastJSONParser().parse(io.BytesIO(body)), repeat),
+        }
+        row = {'rows': len(data), 'bytes': len(body)}
+        row.update((f'{name}_ms', result['p50_ms']) for name, result in timings.items())
+        rows.append(row)
+    return rows
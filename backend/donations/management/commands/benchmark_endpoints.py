@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config.benchmark import (
+    METRICS, BenchmarkError, EndpointBenchmark, compare, get_endpoints, load_fixtures
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints in-process and compare them with a JSON baseline. '
+        'Exits with an error when an endpoint regressed beyond the tolerance, or when there '
+        'is no baseline to compare with.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Only run this endpoint (may be given more than once).'
+        )
+        parser.add_argument(
+            '--baseline', default=getattr(settings, 'BENCHMARK_BASELINE', 'benchmarks/baseline.json'),
+            help='Baseline JSON file to compare with (or to write with --update-baseline).'
+        )
+        parser.add_argument(
+            '--update-baseline', '--save', action='store_true', dest='save',
+            help='Write the results as the new baseline instead of comparing.'
+        )
+        parser.add_argument('--output', help='Also write the results to this JSON file.')
+        parser.add_argument(
+            '--tolerance', type=float, default=getattr(settings, 'BENCHMARK_TOLERANCE', 0.25),
+            help='Allowed latency growth over the baseline, as a fraction.'
+        )
+        parser.add_argument(
+            '--metric', choices=[m[:-3] for m in METRICS], default='p50',
+            help='Latency statistic compared with the baseline; the tails are noisier.'
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Ignore latency growth smaller than this many milliseconds.'
+        )
+        parser.add_argument('--donor', help='Email of the donor to request as.')
+        parser.add_argument('--organization', type=int, help='Id of the organization to request as.')
+
+    def handle(self, *args, **options):
+        try:
+            donor, organization = load_fixtures(options['donor'], options['organization'])
+        except BenchmarkError as exc:
+            raise CommandError(str(exc))
+        endpoints = get_endpoints(donor, organization)
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {endpoint.name for endpoint in endpoints}
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}.")
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+
+        self.stdout.write(
+            f'Donor {donor.email}, organization {organization.id}; '
+            f"{options['iterations']} calls per endpoint after {options['warmup']} warmup calls."
+        )
+        self.stdout.write(f"{'endpoint':<30}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>9}{'queries':>9}")
+        benchmark = EndpointBenchmark(endpoints, options['iterations'], options['warmup'])
+        results = benchmark.run(log=self.write_row)
+
+        baseline_path = Path(options['baseline'])
+        if options['output']:
+            self.write_json(Path(options['output']), results)
+        if options['save']:
+            self.write_json(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f'Saved the baseline to {baseline_path}.'))
+            return
+        if not baseline_path.exists():
+            raise CommandError(
+                f'No baseline at {baseline_path}; run with --update-baseline to create one.'
+            )
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('meta', {}).get('dataset') != results['meta']['dataset']:
+            self.stdout.write(self.style.WARNING(
+                'The data set differs from the baseline; latencies may not be comparable.'
+            ))
+        regressions = compare(
+            results, baseline,
+            metric=f"{options['metric']}_ms",
+            tolerance=options['tolerance'],
+            min_delta_ms=options['min_delta_ms'],
+        )
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}.'))
+
+    def write_row(self, name, result):
+        self.stdout.write(
+            f"{name:<30}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            f"{result['p99_ms']:>9.2f}{result['mean_ms']:>9.2f}{result['queries']:>9}"
+            + ('' if result['status'] in ([200], [201]) else f"  status {result['status']}")
+        )
+
+    def write_json(self, path, results):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + '\n')
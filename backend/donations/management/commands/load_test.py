@@ -0,0 +1,121 @@
+import json
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.loadtest import GunicornServer, LoadTest, LoadTestError, parse_mix, parse_stages
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a concurrent HTTP load test with mixed donor, organization and bulk donation '
+        'scenarios, against a running server or a gunicorn started for the run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load (without --spawn).')
+        parser.add_argument(
+            '--spawn', choices=['wsgi', 'asgi'],
+            help='Start gunicorn serving config.wsgi or config.asgi for the run.'
+        )
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (with --spawn).')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per WSGI worker (with --spawn).')
+        parser.add_argument('--worker-class', help='gunicorn worker class for WSGI, e.g. gthread.')
+        parser.add_argument('--server-log', help='Append the spawned gunicorn output to this file.')
+        parser.add_argument(
+            '--stages', default='10x20,10x40,0x5',
+            help='Ramp profile as <users>x<seconds> stages, e.g. 10x30,50x60,0x10.'
+        )
+        parser.add_argument(
+            '--mix', default='donor=70,organization=20,bulk=10',
+            help='Scenario weights; bulk creates food items and donations.'
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0.5,
+            help='Mean pause between a user\'s requests, in seconds.'
+        )
+        parser.add_argument(
+            '--async-views', action='store_true',
+            help='Request the async variants of the nearby and analytics views.'
+        )
+        parser.add_argument('--auth', choices=['token', 'session'], default='token')
+        parser.add_argument('--prefix', default='seed', help='Username prefix of the accounts to log in as.')
+        parser.add_argument('--password', default='seed-password', help='Password of those accounts.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Request timeout in seconds.')
+        parser.add_argument('--window', type=float, default=5.0, help='Timeline window in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the report to this JSON file.')
+
+    def handle(self, *args, **options):
+        try:
+            stages = parse_stages(options['stages'])
+            mix = parse_mix(options['mix'])
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        server = nullcontext()
+        if options['spawn']:
+            server = GunicornServer(
+                options['spawn'], options['workers'], options['threads'],
+                options['worker_class'], log_path=options['server_log']
+            )
+        try:
+            with server:
+                url = server.url if options['spawn'] else options['url']
+                self.stdout.write(
+                    f"Loading {url}: stages {options['stages']}, mix {options['mix']}, "
+                    f"{options['auth']} auth" + (', async views.' if options['async_views'] else '.')
+                )
+                report = LoadTest(
+                    url, stages, mix,
+                    think_time=options['think_time'],
+                    auth=options['auth'],
+                    prefix=options['prefix'],
+                    password=options['password'],
+                    timeout=options['timeout'],
+                    window=options['window'],
+                    seed=options['seed'],
+                    async_views=options['async_views'],
+                ).run(log=self.stdout.write)
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        self.write_report(report)
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f'Wrote the report to {path}.')
+
+    def write_report(self, report):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'endpoint':<22}{'requests':>9}{'rps':>8}{'errors':>8}"
+            f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+        )
+        rows = list(report['endpoints'].items()) + [('total', report['total'])]
+        for name, row in rows:
+            if not row['requests']:
+                continue
+            self.stdout.write(
+                f"{name:<22}{row['requests']:>9}{row['throughput_rps']:>8.1f}{row['errors']:>8}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f"{'window':<10}{'users':>6}{'rps':>8}{'errors':>8}{'p95':>9}")
+        for window in report['timeline']:
+            self.stdout.write(
+                f"{window['start_s']:>6.0f}s   {window['users']:>6}{window['throughput_rps']:>8.1f}"
+                f"{window['errors']:>8}{window.get('p95_ms', 0):>9.1f}"
+            )
+        if report['errors']:
+            self.stdout.write(self.style.WARNING(
+                'Errors: ' + ', '.join(f'{key} x{count}' for key, count in sorted(report['errors'].items()))
+            ))
+        if report['config']['shared_accounts']:
+            self.stdout.write(self.style.WARNING('Some accounts were shared by several users.'))
+        pools = report['server'].get('db_pools')
+        if pools:
+            self.stdout.write(f'Server connection pools: {json.dumps(pools)}')
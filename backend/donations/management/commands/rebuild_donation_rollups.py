@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from donations import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the organization analytics rollups from the donation table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization', type=int, action='append', dest='organizations',
+            help='Only rebuild this organization (may be given more than once).'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        daily_count, donor_count = rollups.rebuild(
+            organization_ids=options['organizations'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {daily_count} daily rollups and {donor_count} donor rollups.'
+        ))
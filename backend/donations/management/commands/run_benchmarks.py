@@ -0,0 +1,72 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.microbench import get_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Run component benchmarks (the benchmarks modules of the apps) and print their results. '
+        'Data the benchmarks create is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all).')
+        parser.add_argument('--list', action='store_true', help='List the benchmarks and exit.')
+        parser.add_argument(
+            '--sizes', help='Comma-separated data sizes, instead of each benchmark\'s defaults.'
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Timed calls per measurement.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        benchmarks = get_benchmarks()
+        if options['list']:
+            for item in benchmarks.values():
+                sizes = ', '.join(str(size) for size in item.sizes) or '-'
+                self.stdout.write(f'{item.name:<24}sizes {sizes:<34}{item.description}')
+            return
+
+        unknown = set(options['names']) - set(benchmarks)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')] if options['sizes'] else None
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers.')
+
+        results = {}
+        for name in options['names'] or benchmarks:
+            item = benchmarks[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {item.description}'))
+            rows = item.func(sizes or item.sizes, options['repeat'], self.stdout.write)
+            self.write_table(rows)
+            results[name] = rows
+
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(f'Wrote the results to {path}.')
+
+    def write_table(self, rows):
+        if not rows:
+            return
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        widths = {
+            column: max(len(column), *(len(self.format(row.get(column))) for row in rows)) + 2
+            for column in columns
+        }
+        self.stdout.write(''.join(f'{column:>{widths[column]}}' for column in columns))
+        for row in rows:
+            self.stdout.write(''.join(f'{self.format(row.get(column)):>{widths[column]}}' for column in columns))
+
+    @staticmethod
+    def format(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.3f}'
+        return str(value)
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:28
+
+import math
+
+from django.db import migrations, models
+
+# Frozen copy of organizations.geo.grid_cell as of this migration, so
+# later changes to the grid do not change what the migration writes
+GRID_CELL_DEGREES = 0.1
+GRID_ROWS = 1800
+GRID_COLUMNS = 3600
+
+
+def grid_cell(latitude, longitude):
+    row = min(max(math.floor((float(latitude) + 90) / GRID_CELL_DEGREES), 0), GRID_ROWS - 1)
+    column = math.floor((float(longitude) + 180) / GRID_CELL_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+def populate_geo_cells(apps, schema_editor):
+    Organization = apps.get_model('donations', 'Organization')
+    organizations = Organization.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).only('id', 'latitude', 'longitude')
+    batch = []
+    for organization in organizations.iterator(chunk_size=2000):
+        organization.geo_cell = grid_cell(organization.latitude, organization.longitude)
+        batch.append(organization)
+        if len(batch) >= 2000:
+            Organization.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        Organization.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='geo_cell',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, help_text='Grid cell of the coordinates, used for nearby lookups', null=True),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
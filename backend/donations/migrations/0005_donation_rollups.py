@@ -0,0 +1,97 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+# Frozen copy of donations.rollups.rebuild as of this migration, so later
+# changes to the rollups do not change what the migration writes
+STATUS_FIELDS = ('pending', 'confirmed', 'in_transit', 'completed', 'cancelled')
+BATCH_SIZE = 1000
+
+
+def populate_rollups(apps, schema_editor):
+    Donation = apps.get_model('donations', 'Donation')
+    DailyRollup = apps.get_model('donations', 'OrganizationDailyRollup')
+    DonorRollup = apps.get_model('donations', 'OrganizationDonorRollup')
+
+    donations = Donation.objects.order_by()
+    completed = Q(status='completed')
+    daily_rows = donations.values('organization_id', 'donation_date').annotate(
+        rating_sum=Sum('feedback__rating', filter=completed),
+        rating_count=Count('feedback', filter=completed),
+        **{field: Count('id', filter=Q(status=field)) for field in STATUS_FIELDS}
+    )
+    donor_rows = donations.filter(completed).values('organization_id', 'donor_id').annotate(
+        completed_count=Count('id')
+    )
+
+    batch = []
+    for row in daily_rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(DailyRollup(
+            organization_id=row['organization_id'],
+            date=row['donation_date'],
+            rating_sum=row['rating_sum'] or 0,
+            rating_count=row['rating_count'],
+            **{field: row[field] for field in STATUS_FIELDS}
+        ))
+        if len(batch) >= BATCH_SIZE:
+            DailyRollup.objects.bulk_create(batch)
+            batch = []
+    DailyRollup.objects.bulk_create(batch)
+
+    batch = []
+    for row in donor_rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(DonorRollup(**row))
+        if len(batch) >= BATCH_SIZE:
+            DonorRollup.objects.bulk_create(batch)
+            batch = []
+    DonorRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('donations', '0004_organization_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationDonorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.IntegerField(default=0)),
+                ('donor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='donor_rollups', to='donations.organization')),
+            ],
+            options={
+                'verbose_name': 'organization donor rollup',
+                'verbose_name_plural': 'organization donor rollups',
+                'unique_together': {('organization', 'donor')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OrganizationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pending', models.IntegerField(default=0)),
+                ('confirmed', models.IntegerField(default=0)),
+                ('in_transit', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0, help_text='Sum of feedback ratings on completed donations')),
+                ('rating_count', models.IntegerField(default=0, help_text='Number of completed donations with feedback')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='donations.organization')),
+            ],
+            options={
+                'verbose_name': 'organization daily rollup',
+                'verbose_name_plural': 'organization daily rollups',
+                'ordering': ['-date'],
+                'unique_together': {('organization', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
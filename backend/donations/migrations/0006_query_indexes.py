@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0005_donation_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['donor', '-created_at', 'id'], name='donation_donor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['organization', '-created_at', 'id'], name='donation_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-created_at', 'id'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['organization', 'status', 'donation_date'], name='donation_org_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organizationneed',
+            index=models.Index(fields=['food_category', '-priority'], name='orgneed_category_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from config.search import drop_search_index, install_search_index
+
+# (table, indexed columns, trigram column)
+SEARCH_INDEXES = [
+    ('donations_organization', ('name', 'description', 'city', 'state'), 'name'),
+    ('donations_donation', ('notes',), None),
+]
+
+
+def install_search_indexes(apps, schema_editor):
+    for table, fields, trigram_field in SEARCH_INDEXES:
+        install_search_index(schema_editor.connection, table, fields, trigram_field)
+
+
+def drop_search_indexes(apps, schema_editor):
+    for table, fields, trigram_field in SEARCH_INDEXES:
+        drop_search_index(schema_editor.connection, table, trigram_field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_indexes, drop_search_indexes),
+    ]
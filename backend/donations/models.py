@@ -2,10 +2,16 @@ from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from food.models import FoodItem
+from organizations.geo import grid_cell
 
 class Organization(models.Model):
     """Model representing organizations that can receive donations."""
     
+    # Columns of the full-text index (config.search), and the column
+    # that also gets a trigram index for fuzzy matches on PostgreSQL
+    search_index_fields = ('name', 'description', 'city', 'state')
+    search_trigram_field = 'name'
+    
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='organization')
@@ -20,6 +26,10 @@ class Organization(models.Model):
     website = models.URLField(blank=True, null=True)
     hours_of_operation = models.TextField(blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    geo_cell = models.PositiveIntegerField(
+        blank=True, null=True, editable=False, db_index=True,
+        help_text=_("Grid cell of the coordinates, used for nearby lookups")
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -30,6 +40,14 @@ class Organization(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        # Keep the grid cell in step with the coordinates.
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
 
 class OrganizationNeed(models.Model):
     """Model representing the types of food an organization needs."""
@@ -46,6 +64,9 @@ class OrganizationNeed(models.Model):
         verbose_name_plural = _('organization needs')
         ordering = ['-priority']
         unique_together = ('organization', 'food_category')
+        indexes = [
+            models.Index(fields=['food_category', '-priority'], name='orgneed_category_priority_idx'),
+        ]
     
     def __str__(self):
         return f"{self.organization.name} - {self.food_category.name}"
@@ -61,6 +82,18 @@ class Donation(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
+    # Columns of the full-text index (config.search)
+    search_index_fields = ('notes',)
+    
+    # Statuses each status may move to; completed and cancelled are final
+    STATUS_TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled'),
+        'confirmed': ('in_transit', 'completed', 'cancelled'),
+        'in_transit': ('completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+    }
+    
     donor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='donations')
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='donations')
     food_items = models.ManyToManyField(FoodItem, related_name='donations', through='DonationItem')
@@ -75,6 +108,25 @@ class Donation(models.Model):
         verbose_name = _('donation')
         verbose_name_plural = _('donations')
         ordering = ['-created_at']
+        indexes = [
+            # Donor and organization listings, including keyset pagination
+            models.Index(fields=['donor', '-created_at', 'id'], name='donation_donor_created_idx'),
+            models.Index(fields=['organization', '-created_at', 'id'], name='donation_org_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='donation_created_idx'),
+            # Status/date filters within an organization
+            models.Index(
+                fields=['organization', 'status', 'donation_date'],
+                name='donation_org_status_date_idx'
+            ),
+        ]
+    
+    @classmethod
+    def statuses_leading_to(cls, status):
+        """Return the statuses a donation may move to ``status`` from."""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items() if status in targets]
+    
+    def can_transition_to(self, status):
+        return status in self.STATUS_TRANSITIONS.get(self.status, ())
     
     def __str__(self):
         return f"Donation {self.id} - {self.donor.email} to {self.organization.name}"
@@ -112,4 +164,47 @@ class DonationFeedback(models.Model):
         verbose_name_plural = _('donation feedback')
     
     def __str__(self):
-        return f"Feedback for Donation {self.donation.id} - {self.rating}/5"
\ No newline at end of file
+        return f"Feedback for Donation {self.donation.id} - {self.rating}/5"
+
+class OrganizationDailyRollup(models.Model):
+    """
+    Per-day donation counters for an organization.
+    
+    Rows are keyed by donation date and maintained incrementally by the
+    signals in ``donations.signals``; ``manage.py rebuild_donation_rollups``
+    recomputes them from scratch.
+    """
+    
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    pending = models.IntegerField(default=0)
+    confirmed = models.IntegerField(default=0)
+    in_transit = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0, help_text=_("Sum of feedback ratings on completed donations"))
+    rating_count = models.IntegerField(default=0, help_text=_("Number of completed donations with feedback"))
+    
+    class Meta:
+        verbose_name = _('organization daily rollup')
+        verbose_name_plural = _('organization daily rollups')
+        ordering = ['-date']
+        unique_together = ('organization', 'date')
+    
+    def __str__(self):
+        return f"{self.organization_id} - {self.date}"
+
+class OrganizationDonorRollup(models.Model):
+    """Completed donation count per donor for an organization."""
+    
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='donor_rollups')
+    donor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    completed_count = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = _('organization donor rollup')
+        verbose_name_plural = _('organization donor rollups')
+        unique_together = ('organization', 'donor')
+    
+    def __str__(self):
+        return f"{self.organization_id} - {self.donor_id}: {self.completed_count}"
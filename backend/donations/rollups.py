@@ -0,0 +1,179 @@
+"""
+Incremental maintenance of the organization analytics rollups.
+
+Every donation contributes to one OrganizationDailyRollup row (keyed by
+organization and donation date) and, once completed, to one
+OrganizationDonorRollup row. Changes are applied as deltas between the
+donation's state before and after a write, so the analytics view only
+has to read the rollup rows instead of aggregating over Donation.
+"""
+
+from collections import Counter, defaultdict, namedtuple
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+STATUS_FIELDS = ('pending', 'confirmed', 'in_transit', 'completed', 'cancelled')
+
+DonationState = namedtuple(
+    'DonationState', ['organization_id', 'donation_date', 'status', 'donor_id', 'rating']
+)
+
+STATE_FIELDS = ('organization_id', 'donation_date', 'status', 'donor_id', 'feedback__rating')
+
+
+def state_from_values(values):
+    """Build a DonationState from a ``.values(*STATE_FIELDS)`` row."""
+    return DonationState(
+        values['organization_id'],
+        values['donation_date'],
+        values['status'],
+        values['donor_id'],
+        values['feedback__rating'],
+    )
+
+
+def state_of(donation, rating=None):
+    """Build a DonationState from a Donation instance."""
+    return DonationState(
+        donation.organization_id,
+        donation.donation_date,
+        donation.status,
+        donation.donor_id,
+        rating,
+    )
+
+
+def fetch_state(donation_id):
+    """Return the stored DonationState of a donation, or None if it does not exist."""
+    Donation = global_apps.get_model('donations', 'Donation')
+    values = Donation.objects.filter(pk=donation_id).values(*STATE_FIELDS).first()
+    return state_from_values(values) if values else None
+
+
+def _accumulate(state, sign, daily, donors):
+    if state is None:
+        return
+    counters = daily[(state.organization_id, state.donation_date)]
+    counters[state.status] += sign
+    if state.status == 'completed':
+        donors[(state.organization_id, state.donor_id)] += sign
+        if state.rating is not None:
+            counters['rating_sum'] += sign * state.rating
+            counters['rating_count'] += sign
+
+
+def record_changes(changes):
+    """
+    Apply a batch of (old_state, new_state) pairs to the rollup tables.
+
+    Either side may be None for created or deleted donations. Changes to
+    the same rollup row are merged so each row is written at most once.
+    """
+    daily = defaultdict(Counter)
+    donors = Counter()
+    for old, new in changes:
+        if old == new:
+            continue
+        _accumulate(old, -1, daily, donors)
+        _accumulate(new, 1, daily, donors)
+
+    DailyRollup = global_apps.get_model('donations', 'OrganizationDailyRollup')
+    DonorRollup = global_apps.get_model('donations', 'OrganizationDonorRollup')
+    with transaction.atomic():
+        for (organization_id, date), counters in daily.items():
+            deltas = {field: delta for field, delta in counters.items() if delta}
+            if deltas:
+                _apply(DailyRollup, {'organization_id': organization_id, 'date': date}, deltas)
+        for (organization_id, donor_id), delta in donors.items():
+            if delta:
+                _apply(
+                    DonorRollup,
+                    {'organization_id': organization_id, 'donor_id': donor_id},
+                    {'completed_count': delta}
+                )
+
+
+def _apply(model, key, deltas):
+    """
+    Add ``deltas`` to the row identified by ``key``, creating it if needed.
+
+    Deltas that only take counts away never create the row: it is missing
+    because the organization or donor it belongs to is being deleted, and
+    the cascade has already removed it.
+    """
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**key).update(**increments):
+        return
+    if all(delta <= 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another writer created the row in the meantime.
+        model.objects.filter(**key).update(**increments)
+
+
+def rebuild(organization_ids=None, apps=global_apps, batch_size=1000):
+    """
+    Recompute the rollup tables from the Donation table.
+
+    Only the given organizations are rebuilt when ``organization_ids`` is
+    passed. ``apps`` selects the model registry the tables are read from.
+    """
+    Donation = apps.get_model('donations', 'Donation')
+    DailyRollup = apps.get_model('donations', 'OrganizationDailyRollup')
+    DonorRollup = apps.get_model('donations', 'OrganizationDonorRollup')
+
+    donations = Donation.objects.order_by()
+    daily_rollups = DailyRollup.objects.all()
+    donor_rollups = DonorRollup.objects.all()
+    if organization_ids is not None:
+        donations = donations.filter(organization_id__in=organization_ids)
+        daily_rollups = daily_rollups.filter(organization_id__in=organization_ids)
+        donor_rollups = donor_rollups.filter(organization_id__in=organization_ids)
+
+    completed = Q(status='completed')
+    daily_rows = donations.values('organization_id', 'donation_date').annotate(
+        rating_sum=Sum('feedback__rating', filter=completed),
+        rating_count=Count('feedback', filter=completed),
+        **{field: Count('id', filter=Q(status=field)) for field in STATUS_FIELDS}
+    )
+    donor_rows = donations.filter(completed).values('organization_id', 'donor_id').annotate(
+        completed_count=Count('id')
+    )
+
+    with transaction.atomic():
+        daily_rollups.delete()
+        donor_rollups.delete()
+        daily_count = _bulk_insert(DailyRollup, (
+            DailyRollup(
+                organization_id=row['organization_id'],
+                date=row['donation_date'],
+                rating_sum=row['rating_sum'] or 0,
+                rating_count=row['rating_count'],
+                **{field: row[field] for field in STATUS_FIELDS}
+            )
+            for row in daily_rows.iterator(chunk_size=batch_size)
+        ), batch_size)
+        donor_count = _bulk_insert(DonorRollup, (
+            DonorRollup(**row) for row in donor_rows.iterator(chunk_size=batch_size)
+        ), batch_size)
+    return daily_count, donor_count
+
+
+def _bulk_insert(model, objects, batch_size):
+    batch = []
+    total = 0
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    return total
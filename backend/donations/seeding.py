@@ -0,0 +1,478 @@
+"""
+Synthetic data at production scale (``manage.py seed_scale``).
+
+``ScaleSeeder`` fills the database with donors and organization users,
+geo-distributed organizations and their needs, food items, donations
+with items and feedback, and waste logs. The data follows realistic
+shapes:
+
+* people cluster around a list of metro areas;
+* items expire relative to their category's shelf life;
+* recent donations are still open and old ones completed or cancelled;
+* waste follows expiry.
+
+Everything comes from one ``random.Random(seed)``, with dates counted
+back from an anchor date, so the same seed, counts and anchor date
+always produce the same rows, whatever time the seeder runs. The data
+is a snapshot taken at the start of the anchor date: all activity
+happens on the days before it, so nothing is in the future, and a row's
+``updated_at`` is never before its ``created_at``.
+
+Donors are processed in chunks. Each chunk's items, donations and
+waste logs are built in memory, written with ``bulk_create`` in one
+transaction, and dropped. Memory therefore depends on the chunk size,
+not the totals. ``bulk_create`` skips ``save()`` and the signals, so
+the seeder sets ``Organization.geo_cell`` itself and rebuilds the
+donation rollups at the end. The organization snapshots pick the new
+rows up when their TTL expires.
+
+The timestamps are backdated, so rows may land before the watermark of
+an earlier expiry sweep; run ``sweep_expiring_items --full`` after
+seeding a database that has been swept.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from config.caching import bump_cache_version
+from food.models import FoodCategory, FoodItem, WasteLog
+from organizations.geo import grid_cell
+
+from . import rollups
+from .models import Donation, DonationFeedback, DonationItem, Organization, OrganizationNeed
+
+User = get_user_model()
+
+# (city, state, latitude, longitude, relative population)
+METROS = (
+    ('New York', 'NY', 40.7128, -74.0060, 19),
+    ('Los Angeles', 'CA', 34.0522, -118.2437, 13),
+    ('Chicago', 'IL', 41.8781, -87.6298, 9),
+    ('Dallas', 'TX', 32.7767, -96.7970, 8),
+    ('Houston', 'TX', 29.7604, -95.3698, 7),
+    ('Washington', 'DC', 38.9072, -77.0369, 6),
+    ('Philadelphia', 'PA', 39.9526, -75.1652, 6),
+    ('Miami', 'FL', 25.7617, -80.1918, 6),
+    ('Atlanta', 'GA', 33.7490, -84.3880, 6),
+    ('Boston', 'MA', 42.3601, -71.0589, 5),
+    ('Phoenix', 'AZ', 33.4484, -112.0740, 5),
+    ('San Francisco', 'CA', 37.7749, -122.4194, 5),
+    ('Seattle', 'WA', 47.6062, -122.3321, 4),
+    ('Minneapolis', 'MN', 44.9778, -93.2650, 4),
+    ('Denver', 'CO', 39.7392, -104.9903, 3),
+    ('Portland', 'OR', 45.5152, -122.6784, 2),
+)
+
+# Used when the database has no food categories yet:
+# (name, shelf life in days, food names, units)
+CATEGORIES = (
+    ('Produce', 7, ('Apples', 'Bananas', 'Carrots', 'Lettuce', 'Tomatoes', 'Spinach'), ('kg', 'lb', 'pcs')),
+    ('Dairy', 10, ('Milk', 'Yogurt', 'Cheese', 'Butter'), ('l', 'pcs', 'kg')),
+    ('Bakery', 4, ('Bread', 'Bagels', 'Muffins', 'Tortillas'), ('pcs', 'loaves')),
+    ('Meat', 5, ('Chicken', 'Ground Beef', 'Pork Chops', 'Turkey'), ('kg', 'lb')),
+    ('Prepared Meals', 3, ('Sandwiches', 'Soup', 'Pasta Salad', 'Casserole'), ('servings', 'pcs')),
+    ('Canned Goods', 730, ('Canned Beans', 'Canned Tuna', 'Tomato Sauce', 'Canned Corn'), ('cans',)),
+    ('Dry Goods', 365, ('Rice', 'Pasta', 'Oats', 'Flour', 'Lentils'), ('kg', 'lb', 'boxes')),
+    ('Frozen', 180, ('Frozen Vegetables', 'Frozen Pizza', 'Ice Cream', 'Frozen Berries'), ('pcs', 'kg')),
+    ('Beverages', 270, ('Juice', 'Bottled Water', 'Coffee', 'Tea'), ('l', 'bottles', 'boxes')),
+)
+
+ORGANIZATION_KINDS = ('Food Bank', 'Community Pantry', 'Shelter', 'Soup Kitchen', 'Mutual Aid', 'Youth Center')
+STREETS = ('Main St', 'Oak Ave', 'Maple Dr', 'Park Rd', 'Cedar Ln', 'Elm St', 'Lake Blvd', 'Hill St')
+WASTE_REASONS = (('expired', 40), ('spoiled', 25), ('excess', 15), ('damaged', 10), ('other', 10))
+RATINGS = ((1, 5), (2, 5), (3, 15), (4, 35), (5, 40))
+
+
+def _share(total, start, end, size):
+    """Part of ``total`` that falls to rows ``start:end`` of ``size`` rows."""
+    return total * end // size - total * start // size
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let ``bulk_create`` keep the ``auto_now``/``auto_now_add`` values set on objects.
+
+    This changes the model fields for the whole process, so it is only
+    meant for one-off commands.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ScaleSeeder:
+    """Generate a deterministic, realistically shaped data set."""
+
+    def __init__(self, seed=0, prefix=None, today=None, history_days=365,
+                 chunk_size=2000, batch_size=1000, password='seed-password', log=None):
+        self.random = random.Random(seed)
+        self.prefix = prefix or f'seed{seed}'
+        self.today = today or timezone.localdate()
+        self.tz = timezone.get_current_timezone()
+        # The moment the data is a snapshot of; every timestamp is before it
+        self.now = datetime.combine(self.today, time(), self.tz)
+        self.history_days = history_days
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        # One hash for every user, with a salt derived from the seed
+        self.password = make_password(password, salt=f'{self.prefix}salt'.replace('-', ''))
+        self.log = log or (lambda message: None)
+        self.counts = dict.fromkeys(
+            ('users', 'organizations', 'needs', 'food_items', 'donations',
+             'donation_items', 'feedback', 'waste_logs'), 0
+        )
+        weights = [metro[4] for metro in METROS]
+        self.metro_weights = [sum(weights[:i + 1]) for i in range(len(weights))]
+
+    def exists(self):
+        """Whether users with this seeder's prefix are already in the database."""
+        return User.objects.filter(username__startswith=f'{self.prefix}-').exists()
+
+    def run(self, donors, organizations, food_items, donations, waste_logs, feedback_rate=0.4):
+        """Create the rows and return how many of each were created."""
+        with explicit_timestamps(User, Organization, OrganizationNeed, FoodItem,
+                                 Donation, DonationFeedback, WasteLog):
+            self.categories = self.get_categories()
+            self.orgs_by_metro = self.create_organizations(organizations)
+            self.all_orgs = [org for orgs in self.orgs_by_metro for org in orgs]
+            for start in range(0, donors, self.chunk_size):
+                end = min(start + self.chunk_size, donors)
+                with transaction.atomic():
+                    self.seed_donors(
+                        start, end,
+                        _share(food_items, start, end, donors),
+                        _share(donations, start, end, donors),
+                        _share(waste_logs, start, end, donors),
+                        feedback_rate
+                    )
+                self.log(
+                    f"{end}/{donors} donors: {self.counts['food_items']} items, "
+                    f"{self.counts['donations']} donations, {self.counts['waste_logs']} waste logs"
+                )
+        rollups.rebuild(batch_size=self.batch_size)
+        return self.counts
+
+    # Helpers
+
+    def moment(self, days_ago):
+        """An aware datetime on the ``days_ago``-th day before the anchor date, at a random time."""
+        day = self.today - timedelta(days=days_ago + 1)
+        seconds = self.random.randrange(6 * 3600, 22 * 3600)
+        return datetime.combine(day, time(), self.tz) + timedelta(seconds=seconds)
+
+    def days_ago(self):
+        # Skewed towards recent activity
+        return int(self.history_days * self.random.random() ** 2)
+
+    def metro(self):
+        index = self.random.random() * self.metro_weights[-1]
+        for position, bound in enumerate(self.metro_weights):
+            if index < bound:
+                return position
+        return len(METROS) - 1
+
+    def location(self, metro, spread):
+        _, _, latitude, longitude, _ = METROS[metro]
+        return (
+            Decimal(f'{latitude + self.random.gauss(0, spread):.6f}'),
+            Decimal(f'{longitude + self.random.gauss(0, spread):.6f}'),
+        )
+
+    def weighted(self, choices):
+        total = sum(weight for _, weight in choices)
+        point = self.random.random() * total
+        for value, weight in choices:
+            point -= weight
+            if point < 0:
+                return value
+        return choices[-1][0]
+
+    def quantity(self, low=1, high=50):
+        return Decimal(self.random.randint(low * 100, high * 100)) / 100
+
+    def new_user(self, kind, number, metro):
+        city, state, *_ = METROS[metro]
+        latitude, longitude = self.location(metro, 0.15)
+        joined = self.moment(self.history_days + self.random.randrange(365))
+        name = f'{self.prefix}-{kind}-{number}'
+        return User(
+            username=name,
+            email=f'{name}@example.com',
+            password=self.password,
+            first_name=kind.title(),
+            last_name=str(number),
+            user_type='organization' if kind == 'org' else 'donor',
+            city=city,
+            state=state,
+            latitude=latitude,
+            longitude=longitude,
+            date_joined=joined,
+            created_at=joined,
+            updated_at=joined,
+        )
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[{
+            User: 'users', Organization: 'organizations', OrganizationNeed: 'needs',
+            FoodItem: 'food_items', Donation: 'donations', DonationItem: 'donation_items',
+            DonationFeedback: 'feedback', WasteLog: 'waste_logs',
+        }[model]] += len(objects)
+        return objects
+
+    # Reference data
+
+    def get_categories(self):
+        """Return [(id, shelf life, food names, units)], creating the defaults if needed."""
+        existing = list(FoodCategory.objects.order_by('id').values_list('id', 'name', 'shelf_life_days'))
+        if not existing:
+            FoodCategory.objects.bulk_create([
+                FoodCategory(name=name, description=f'{name} donated by the community',
+                             shelf_life_days=shelf_life)
+                for name, shelf_life, _, _ in CATEGORIES
+            ])
+            bump_cache_version('food-categories')
+            existing = list(FoodCategory.objects.order_by('id').values_list('id', 'name', 'shelf_life_days'))
+        defaults = {name: (foods, units) for name, _, foods, units in CATEGORIES}
+        categories = []
+        for pk, name, shelf_life in existing:
+            foods, units = defaults.get(name, ((name,), ('pcs', 'kg')))
+            categories.append((pk, max(shelf_life, 1), foods, units))
+        return categories
+
+    def create_organizations(self, count):
+        """Create organization users, organizations and needs; return their (id, user id) by metro."""
+        by_metro = [[] for _ in METROS]
+        for start in range(0, count, self.chunk_size):
+            end = min(start + self.chunk_size, count)
+            metros = [self.metro() for _ in range(start, end)]
+            with transaction.atomic():
+                users = self.bulk_create(User, [
+                    self.new_user('org', number, metro) for number, metro in zip(range(start, end), metros)
+                ])
+                organizations = self.bulk_create(Organization, [
+                    self.new_organization(user, number, metro)
+                    for user, number, metro in zip(users, range(start, end), metros)
+                ])
+                needs = []
+                for organization in organizations:
+                    for category in self.random.sample(
+                        self.categories, self.random.randint(1, min(5, len(self.categories)))
+                    ):
+                        needs.append(OrganizationNeed(
+                            organization_id=organization.id,
+                            food_category_id=category[0],
+                            priority=self.random.randint(0, 10),
+                            created_at=organization.created_at,
+                            updated_at=organization.created_at,
+                        ))
+                self.bulk_create(OrganizationNeed, needs)
+            for organization, metro in zip(organizations, metros):
+                by_metro[metro].append((organization.id, organization.user_id))
+        self.log(f'{count} organizations')
+        return by_metro
+
+    def new_organization(self, user, number, metro):
+        city, state, *_ = METROS[metro]
+        kind = self.random.choice(ORGANIZATION_KINDS)
+        latitude, longitude = self.location(metro, 0.1)
+        if self.random.random() < 0.05:
+            latitude = longitude = None
+        return Organization(
+            user_id=user.id,
+            name=f'{city} {kind} {number}',
+            description=f'{kind} serving {city}, {state}.',
+            address=f'{self.random.randint(1, 9999)} {self.random.choice(STREETS)}',
+            city=city,
+            state=state,
+            zip_code=f'{self.random.randint(10000, 99999)}',
+            latitude=latitude,
+            longitude=longitude,
+            geo_cell=grid_cell(latitude, longitude),
+            phone_number=f'555-{self.random.randint(1000000, 9999999)}',
+            email=user.email,
+            website=f'https://{self.prefix}-org-{number}.example.org',
+            is_verified=self.random.random() < 0.85,
+            created_at=user.created_at,
+            updated_at=user.created_at,
+        )
+
+    # Donor activity
+
+    def seed_donors(self, start, end, item_count, donation_count, waste_count, feedback_rate):
+        metros = [self.metro() for _ in range(start, end)]
+        donors = self.bulk_create(User, [
+            self.new_user('donor', number, metro) for number, metro in zip(range(start, end), metros)
+        ])
+
+        # Items, grouped by donor position for the donations and waste logs
+        items, owners = [], []
+        donor_items = [[] for _ in donors]
+        for _ in range(item_count):
+            position = self.random.randrange(len(donors))
+            donor_items[position].append(len(items))
+            items.append(self.new_food_item(donors[position]))
+            owners.append(position)
+
+        # Pick each donation's items before saving them, to flag them donated.
+        # Donations start from a random open item, so donors with more items
+        # donate more often.
+        planned = []
+        for _ in range(donation_count):
+            first = self.open_item(items)
+            if first is None:
+                break
+            position = owners[first]
+            others = [
+                index for index in donor_items[position]
+                if index != first and not items[index].is_donated
+            ]
+            chosen = [first] + self.random.sample(others, min(len(others), self.random.randint(0, 3)))
+            for index in chosen:
+                items[index].is_donated = True
+            planned.append((position, chosen))
+
+        self.bulk_create(FoodItem, items)
+        self.create_donations(donors, metros, items, planned, feedback_rate)
+        self.bulk_create(WasteLog, [
+            self.new_waste_log(donors, donor_items, items) for _ in range(waste_count)
+        ])
+
+    def open_item(self, items, attempts=20):
+        """Index of a random item not donated yet, or None when they are (nearly) all donated."""
+        for _ in range(attempts if items else 0):
+            index = self.random.randrange(len(items))
+            if not items[index].is_donated:
+                return index
+        return None
+
+    def new_food_item(self, donor):
+        category_id, shelf_life, foods, units = self.random.choice(self.categories)
+        created = self.moment(self.days_ago())
+        lifetime = max(1, round(shelf_life * self.random.lognormvariate(0, 0.35)))
+        expiry = created.date() + timedelta(days=lifetime)
+        return FoodItem(
+            user_id=donor.id,
+            name=self.random.choice(foods),
+            category_id=category_id if self.random.random() < 0.9 else None,
+            quantity=self.quantity(),
+            unit=self.random.choice(units),
+            expiry_date=expiry,
+            description='Sealed, stored as labelled.' if self.random.random() < 0.3 else None,
+            is_available=expiry >= self.today or self.random.random() < 0.2,
+            is_donated=False,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def create_donations(self, donors, metros, items, planned, feedback_rate):
+        donations, feedback, donation_items = [], [], []
+        for position, chosen in planned:
+            local = self.orgs_by_metro[metros[position]]
+            organization_id, organization_user_id = self.random.choice(
+                local if local and self.random.random() < 0.8 else self.all_orgs
+            )
+            latest_item = max(items[index].created_at for index in chosen)
+            created = latest_item + timedelta(hours=self.random.randint(1, 72))
+            if created >= self.now:
+                # Items from the last days: donated between their creation and now
+                created = latest_item + (self.now - latest_item) * self.random.random()
+            age = (self.today - created.date()).days
+            if age > 14:
+                status = self.weighted((('completed', 80), ('cancelled', 20)))
+            elif age > 3:
+                status = self.weighted((('completed', 40), ('in_transit', 20), ('confirmed', 25), ('cancelled', 15)))
+            else:
+                status = self.weighted((('pending', 50), ('confirmed', 30), ('in_transit', 20)))
+            # Not before created, since created <= now
+            updated = min(created + timedelta(days=min(age, self.random.randint(0, 7))), self.now)
+            donations.append(Donation(
+                donor_id=donors[position].id,
+                organization_id=organization_id,
+                status=status,
+                pickup_time=None if status == 'pending' else created + timedelta(hours=self.random.randint(2, 48)),
+                donation_date=created.date(),
+                notes='Pick up at the back entrance.' if self.random.random() < 0.25 else None,
+                created_at=created,
+                updated_at=updated,
+            ))
+            if status == 'completed' and self.random.random() < feedback_rate:
+                feedback.append((len(donations) - 1, organization_user_id, updated))
+
+        self.bulk_create(Donation, donations)
+        for donation, (_, chosen) in zip(donations, planned):
+            for index in chosen:
+                item = items[index]
+                donation_items.append(DonationItem(
+                    donation_id=donation.id,
+                    food_item_id=item.id,
+                    quantity=item.quantity,
+                    unit=item.unit,
+                ))
+        self.bulk_create(DonationItem, donation_items)
+        self.bulk_create(DonationFeedback, [
+            DonationFeedback(
+                donation_id=donations[index].id,
+                rating=self.weighted(RATINGS),
+                comments='Thank you!' if self.random.random() < 0.5 else None,
+                created_by_id=user_id,
+                created_at=moment,
+                updated_at=moment,
+            )
+            for index, user_id, moment in feedback
+        ])
+
+    def new_waste_log(self, donors, donor_items, items):
+        position = self.random.randrange(len(donors))
+        candidates = donor_items[position]
+        item = None
+        if candidates and self.random.random() < 0.6:
+            item = items[self.random.choice(candidates)]
+        if item is not None and not item.is_donated:
+            waste_date = min(
+                item.expiry_date + timedelta(days=self.random.randint(0, 5)),
+                self.today - timedelta(days=1)
+            )
+            values = {
+                'food_item_id': item.id,
+                'food_name': item.name,
+                'category_id': item.category_id,
+                'unit': item.unit,
+                'quantity': min(item.quantity, self.quantity(high=10)),
+            }
+        else:
+            category_id, _, foods, units = self.random.choice(self.categories)
+            waste_date = self.today - timedelta(days=self.days_ago() + 1)
+            values = {
+                'food_name': self.random.choice(foods),
+                'category_id': category_id,
+                'unit': self.random.choice(units),
+                'quantity': self.quantity(high=10),
+            }
+        reason = self.weighted(WASTE_REASONS)
+        created = datetime.combine(waste_date, time(20), self.tz)
+        return WasteLog(
+            user_id=donors[position].id,
+            waste_date=waste_date,
+            reason=reason,
+            notes='Found at the back of the fridge.' if reason == 'expired' and self.random.random() < 0.3 else None,
+            created_at=created,
+            **values
+        )
@@ -1,3 +1,6 @@
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Organization, OrganizationNeed, Donation, DonationItem, DonationFeedback
 from food.serializers import FoodItemSerializer
@@ -54,7 +57,7 @@ class DonationSerializer(serializers.ModelSerializer):
     
     donor_email = serializers.ReadOnlyField(source='donor.email')
     organization_name = serializers.ReadOnlyField(source='organization.name')
-    donation_items = DonationItemSerializer(many=True, read_only=True, source='donation_items')
+    donation_items = DonationItemSerializer(many=True, read_only=True)
     feedback = DonationFeedbackSerializer(read_only=True)
     food_items_data = serializers.ListField(child=serializers.DictField(), write_only=True, required=False)
     
@@ -68,26 +71,89 @@ class DonationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'donor', 'donor_email', 'created_at', 'updated_at']
     
+    def validate_status(self, value):
+        if self.instance is not None and value != self.instance.status:
+            if not self.instance.can_transition_to(value):
+                raise serializers.ValidationError(
+                    f'Cannot change status from "{self.instance.status}" to "{value}".'
+                )
+        return value
+    
+    def validate(self, data):
+        data = super().validate(data)
+        food_items_data = data.get('food_items_data')
+        if self.instance is None and food_items_data:
+            self._food_items = self._get_donor_food_items(food_items_data)
+        return data
+    
+    def _get_donor_food_items(self, food_items_data):
+        """Validate the item entries and fetch their food items in one query, reporting any the donor does not own."""
+        food_item_ids = []
+        errors = []
+        # The optional per-item values are checked like DonationItem's fields
+        item_fields = DonationItemSerializer().fields
+        for item_data in food_items_data:
+            try:
+                food_item_ids.append(int(item_data.get('food_item')))
+            except (TypeError, ValueError):
+                errors.append(f"Invalid food item id: {item_data.get('food_item')!r}.")
+            for name in ('quantity', 'unit', 'notes'):
+                if name not in item_data:
+                    continue
+                try:
+                    item_data[name] = item_fields[name].run_validation(item_data[name])
+                except serializers.ValidationError as exc:
+                    errors.extend(
+                        f"Invalid {name} for food item {item_data.get('food_item')!r}: {message}"
+                        for message in exc.detail
+                    )
+        
+        food_items = FoodItem.objects.filter(
+            id__in=food_item_ids, user=self.context['request'].user
+        ).in_bulk()
+        errors.extend(
+            f"Food item {food_item_id} does not exist or does not belong to you."
+            for food_item_id in dict.fromkeys(food_item_ids) if food_item_id not in food_items
+        )
+        if errors:
+            raise serializers.ValidationError({'food_items_data': errors})
+        return food_items
+    
     def create(self, validated_data):
         food_items_data = validated_data.pop('food_items_data', None)
         validated_data['donor'] = self.context['request'].user
-        donation = Donation.objects.create(**validated_data)
         
-        if food_items_data:
-            for item_data in food_items_data:
-                food_item_id = item_data.get('food_item')
-                try:
-                    food_item = FoodItem.objects.get(id=food_item_id, user=donation.donor)
-                    DonationItem.objects.create(
+        with transaction.atomic():
+            donation = Donation.objects.create(**validated_data)
+            
+            if food_items_data:
+                food_items = self._food_items
+                donation_items = []
+                for item_data in food_items_data:
+                    food_item = food_items[int(item_data['food_item'])]
+                    donation_items.append(DonationItem(
                         donation=donation,
                         food_item=food_item,
                         quantity=item_data.get('quantity', food_item.quantity),
                         unit=item_data.get('unit', food_item.unit),
                         notes=item_data.get('notes', '')
-                    )
-                    food_item.is_donated = True
-                    food_item.save()
-                except FoodItem.DoesNotExist:
-                    pass
-                
-        return donation
\ No newline at end of file
+                    ))
+                DonationItem.objects.bulk_create(donation_items)
+                FoodItem.objects.filter(id__in=food_items).update(
+                    is_donated=True, updated_at=timezone.now()
+                )
+        
+        # Load the items the response renders in one query
+        prefetch_related_objects(
+            [donation],
+            Prefetch('donation_items', queryset=DonationItem.objects.select_related('food_item'))
+        )
+        return donation
+
+class DonationTransitionSerializer(serializers.Serializer):
+    """Serializer for bulk donation status transitions."""
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=Donation.STATUS_CHOICES)
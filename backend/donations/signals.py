@@ -0,0 +1,61 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import rollups
+from .models import Donation, DonationFeedback
+
+
+@receiver(pre_save, sender=Donation)
+def remember_donation_state(sender, instance, raw=False, **kwargs):
+    """Keep the stored state around so post_save can compute the rollup delta."""
+    if raw:
+        return
+    instance._rollup_state = rollups.fetch_state(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Donation)
+def update_rollups_on_donation_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_rollup_state', None)
+    # Saving a donation never changes its feedback, so carry the rating over
+    rating = old.rating if old else None
+    rollups.record_changes([(old, rollups.state_of(instance, rating))])
+
+
+@receiver(post_delete, sender=Donation)
+def update_rollups_on_donation_delete(sender, instance, **kwargs):
+    # Any feedback is deleted first and has already taken its rating out
+    rollups.record_changes([(rollups.state_of(instance), None)])
+
+
+@receiver(pre_save, sender=DonationFeedback)
+def remember_feedback_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._rollup_rating = None
+    if instance.pk:
+        instance._rollup_rating = DonationFeedback.objects.filter(
+            pk=instance.pk
+        ).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=DonationFeedback)
+def update_rollups_on_feedback_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    state = rollups.fetch_state(instance.donation_id)
+    if state is None:
+        return
+    old_rating = getattr(instance, '_rollup_rating', None)
+    rollups.record_changes([
+        (state._replace(rating=old_rating), state._replace(rating=instance.rating))
+    ])
+
+
+@receiver(post_delete, sender=DonationFeedback)
+def update_rollups_on_feedback_delete(sender, instance, **kwargs):
+    state = rollups.fetch_state(instance.donation_id)
+    if state is None:
+        return
+    rollups.record_changes([(state._replace(rating=instance.rating), state._replace(rating=None))])
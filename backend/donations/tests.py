@@ -0,0 +1,568 @@
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config import search
+from config.pagination import keyset_filter
+from food.models import FoodCategory, FoodItem, WasteLog
+
+from . import rollups
+from .models import (
+    Donation, DonationFeedback, DonationItem, Organization, OrganizationDailyRollup,
+    OrganizationDonorRollup, OrganizationNeed
+)
+from .seeding import ScaleSeeder
+from .views import DonationViewSet
+
+User = get_user_model()
+
+
+def create_donor(number=0):
+    return User.objects.create_user(
+        username=f'donor-{number}', email=f'donor-{number}@example.com', password=None
+    )
+
+
+def create_organization(number=0, **kwargs):
+    user = User.objects.create_user(
+        username=f'org-{number}', email=f'org-{number}@example.com', password=None,
+        user_type='organization'
+    )
+    fields = {
+        'name': f'Organization {number}', 'address': '1 Main St', 'city': 'Springfield',
+        'state': 'IL', 'zip_code': '62701', 'phone_number': '555-0100',
+        'email': user.email, 'is_verified': True,
+    }
+    fields.update(kwargs)
+    return Organization.objects.create(user=user, **fields)
+
+
+def create_food_items(user, count):
+    return FoodItem.objects.bulk_create([
+        FoodItem(
+            user=user, name=f'Item {number}', quantity='2.00', unit='kg',
+            expiry_date=date.today() + timedelta(days=5)
+        )
+        for number in range(count)
+    ])
+
+
+class DonationCreateTests(TestCase):
+    """Creating a donation with items (food_items_data)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        cls.organization = create_organization()
+        cls.items = create_food_items(cls.donor, 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def create(self, entries):
+        return self.client.post('/api/donations/', {
+            'organization': self.organization.id,
+            'donation_date': date.today().isoformat(),
+            'food_items_data': entries,
+        }, format='json')
+
+    def count_create_queries(self, items):
+        with CaptureQueriesContext(connection) as context:
+            response = self.create([{'food_item': item.id} for item in items])
+        self.assertEqual(response.status_code, 201, response.content)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        # The first donation of the day also creates the organization's rollup row
+        self.count_create_queries(self.items[:1])
+        one = self.count_create_queries(self.items[:1])
+        ten = self.count_create_queries(self.items)
+        self.assertEqual(one, ten)
+        self.assertLessEqual(ten, DonationViewSet.query_budget['create'])
+
+    def test_items_are_created_and_marked_donated(self):
+        response = self.create([
+            {'food_item': self.items[0].id, 'quantity': '1.50', 'unit': 'lb'},
+            {'food_item': self.items[1].id},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        donation = Donation.objects.get(pk=response.data['id'])
+        items = {item.food_item_id: item for item in DonationItem.objects.filter(donation=donation)}
+        self.assertEqual(str(items[self.items[0].id].quantity), '1.50')
+        self.assertEqual(items[self.items[0].id].unit, 'lb')
+        self.assertEqual(str(items[self.items[1].id].quantity), '2.00')
+        self.assertEqual(FoodItem.objects.filter(id__in=items, is_donated=True).count(), 2)
+
+    def test_invalid_quantity_is_rejected(self):
+        for quantity in ('lots', '1e400', '123456789012.5'):
+            with self.subTest(quantity=quantity):
+                response = self.create([{'food_item': self.items[0].id, 'quantity': quantity}])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('food_items_data', response.data)
+        self.assertFalse(Donation.objects.exists())
+
+    def test_other_donors_items_are_rejected(self):
+        other_item = create_food_items(create_donor(1), 1)[0]
+        response = self.create([{'food_item': other_item.id}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Donation.objects.exists())
+
+
+class ListQueryCountTests(TestCase):
+    """The list endpoints run a fixed number of queries, whatever the page holds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        organizations = [create_organization(number) for number in range(3)]
+        for organization in organizations:
+            OrganizationNeed.objects.create(
+                organization=organization, food_category=FoodCategory.objects.create(
+                    name=f'Category {organization.id}', shelf_life_days=7
+                )
+            )
+        items = create_food_items(cls.donor, 6)
+        for number, organization in enumerate(organizations):
+            donation = Donation.objects.create(
+                donor=cls.donor, organization=organization, donation_date=date.today(),
+                status='completed'
+            )
+            DonationItem.objects.bulk_create([
+                DonationItem(donation=donation, food_item=item, quantity=item.quantity, unit=item.unit)
+                for item in items[number * 2:number * 2 + 2]
+            ])
+            DonationFeedback.objects.create(donation=donation, rating=5, created_by=organization.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def assert_list_queries(self, path, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_donations(self):
+        response = self.assert_list_queries('/api/donations/', 4)
+        self.assertEqual(response.data['count'], 3)
+
+    def test_donations_cursor(self):
+        response = self.assert_list_queries('/api/donations/?cursor=', 3)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_organizations(self):
+        response = self.assert_list_queries('/api/donations/organizations/', 3)
+        self.assertEqual(response.data['count'], 3)
+
+
+class IndexUsageTests(TestCase):
+    """The list and analytics queries are served by the indexes of migration 0006."""
+
+    def assert_uses_index(self, queryset, name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The test tables are tiny; make the planner show what it would pick at scale
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn(name, plan)
+
+    def test_donor_pages(self):
+        ordering = DonationViewSet.keyset_ordering
+        queryset = Donation.objects.filter(donor_id=1).order_by(*ordering)
+        self.assert_uses_index(queryset[:21], 'donation_donor_created_idx')
+        after = queryset.filter(keyset_filter(ordering, [timezone.now(), 100]))
+        self.assert_uses_index(after[:21], 'donation_donor_created_idx')
+
+    def test_organization_pages(self):
+        queryset = Donation.objects.filter(organization_id=1).order_by(*DonationViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'donation_org_created_idx')
+
+    def test_staff_pages(self):
+        queryset = Donation.objects.order_by(*DonationViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'donation_created_idx')
+
+    def test_organization_status_by_date(self):
+        queryset = Donation.objects.filter(
+            organization_id=1, status='completed', donation_date__gte=date.today() - timedelta(days=30)
+        )
+        self.assert_uses_index(queryset, 'donation_org_status_date_idx')
+
+    def test_needs_by_category(self):
+        queryset = OrganizationNeed.objects.filter(food_category_id=1).order_by('-priority')
+        self.assert_uses_index(queryset, 'orgneed_category_priority_idx')
+
+
+class DonationExportTests(TestCase):
+    """The streamed export reads items one query per chunk of donations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        organization = create_organization()
+        items = create_food_items(cls.donor, 5)
+        donations = Donation.objects.bulk_create([
+            Donation(donor=cls.donor, organization=organization, donation_date=date.today())
+            for _ in range(5)
+        ])
+        DonationItem.objects.bulk_create([
+            DonationItem(donation=donation, food_item=item, quantity=item.quantity, unit=item.unit)
+            for donation, item in zip(donations, items)
+        ])
+
+    def test_queries_run_per_chunk_while_streaming(self):
+        client = APIClient()
+        client.force_authenticate(self.donor)
+        with patch.object(DonationViewSet, 'export_chunk_size', 2):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/donations/export/?export_format=ndjson')
+                # Nothing is read until the body is consumed
+                self.assertEqual(len(context.captured_queries), 0)
+                lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 5)
+        # The donations, then the items of each of the three chunks
+        self.assertEqual(len(context.captured_queries), 4)
+
+
+class FastListParityTests(TestCase):
+    """The .values() list path returns exactly what the serializers return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        organizations = [create_organization(number) for number in range(2)]
+        items = create_food_items(cls.donor, 12)
+        statuses = [choice for choice, _ in Donation.STATUS_CHOICES]
+        for number in range(12):
+            donation = Donation.objects.create(
+                donor=cls.donor, organization=organizations[number % 2],
+                donation_date=date.today() - timedelta(days=number), status=statuses[number % len(statuses)],
+                notes=f'Pickup at the back door {number}' if number % 3 else None,
+            )
+            if number % 4:
+                DonationItem.objects.create(
+                    donation=donation, food_item=items[number], quantity='1.25', unit='kg',
+                    notes='Chilled' if number % 2 else None
+                )
+            if number % 5 == 0:
+                DonationFeedback.objects.create(
+                    donation=donation, rating=4, comments='Thanks', created_by=organizations[number % 2].user
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def assert_parity(self, path):
+        with self.settings(FAST_LIST_SERIALIZATION=True):
+            fast = self.client.get(path)
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(path)
+        self.assertEqual(fast.status_code, 200, fast.content)
+        self.assertEqual(fast.json(), slow.json())
+        return fast.json()
+
+    def test_page_number_pages(self):
+        self.assert_parity('/api/donations/?page_size=5')
+        self.assert_parity('/api/donations/?page_size=5&page=3')
+
+    def test_cursor_pages(self):
+        first = self.assert_parity('/api/donations/?cursor=&page_size=5')
+        self.assertIsNotNone(first['next'])
+        self.assert_parity(first['next'])
+
+    def test_search(self):
+        results = self.assert_parity('/api/donations/?search=door')['results']
+        self.assertEqual(len(results), 8)
+
+
+class ScaleSeederTests(TestCase):
+    """Seeded data depends on the seed and anchor date, not on the time the seeder runs."""
+
+    def seed(self, hour):
+        today = timezone.localdate()
+        now = timezone.make_aware(datetime.combine(today, time(hour, 30)))
+        with patch('django.utils.timezone.now', return_value=now):
+            ScaleSeeder(seed=1, history_days=3).run(
+                donors=20, organizations=5, food_items=200, donations=60, waste_logs=20
+            )
+        return timezone.make_aware(datetime.combine(today, time()))
+
+    def snapshot(self):
+        return [
+            sorted(queryset.values_list(*fields))
+            for queryset, fields in (
+                (FoodItem.objects, ('user__username', 'name', 'quantity', 'expiry_date', 'is_available',
+                                    'created_at', 'updated_at')),
+                (Donation.objects, ('donor__username', 'organization__name', 'status', 'donation_date',
+                                    'pickup_time', 'created_at', 'updated_at')),
+                (DonationFeedback.objects, ('donation__created_at', 'rating', 'created_at')),
+                (WasteLog.objects, ('user__username', 'food_name', 'waste_date', 'reason', 'created_at')),
+            )
+        ]
+
+    def test_timestamps_are_before_the_anchor_date_and_in_order(self):
+        start_of_today = self.seed(hour=0)
+        self.assertEqual(Donation.objects.count(), 60)
+        for model in (FoodItem, Donation, DonationFeedback, WasteLog):
+            with self.subTest(model=model.__name__):
+                self.assertFalse(model.objects.filter(created_at__gte=start_of_today).exists())
+                if model is not WasteLog:
+                    self.assertFalse(model.objects.filter(updated_at__lt=F('created_at')).exists())
+
+    def test_same_seed_gives_the_same_rows(self):
+        self.seed(hour=0)
+        first = self.snapshot()
+        User.objects.filter(username__startswith='seed1-').delete()
+        self.assertFalse(Donation.objects.exists())
+        self.seed(hour=23)
+        self.assertEqual(self.snapshot(), first)
+
+
+class RollupCascadeTests(TestCase):
+    """Deleting an organization or a donor cascades through donations and rollups."""
+
+    def setUp(self):
+        self.donor = create_donor()
+        self.other_donor = create_donor(1)
+        self.organization = create_organization()
+        for donor in (self.donor, self.other_donor):
+            donation = Donation.objects.create(
+                donor=donor, organization=self.organization, donation_date=date.today(),
+                status='completed'
+            )
+            DonationFeedback.objects.create(donation=donation, rating=4, created_by=self.organization.user)
+
+    def test_delete_organization(self):
+        organization_id = self.organization.id
+        self.organization.delete()
+        self.assertFalse(OrganizationDailyRollup.objects.filter(organization_id=organization_id).exists())
+        self.assertFalse(OrganizationDonorRollup.objects.filter(organization_id=organization_id).exists())
+
+    def test_delete_donor(self):
+        self.donor.delete()
+        daily = OrganizationDailyRollup.objects.get(organization=self.organization)
+        self.assertEqual((daily.completed, daily.rating_count, daily.rating_sum), (1, 1, 4))
+        self.assertEqual(
+            list(OrganizationDonorRollup.objects.values_list('donor_id', 'completed_count')),
+            [(self.other_donor.id, 1)]
+        )
+
+
+class SearchTests(TestCase):
+    """Full-text search over donation notes and organization names."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        harbor = create_organization(0, name='Harbor Pantry')
+        lakeside = create_organization(1, name='Lakeside Kitchen')
+        cls.donations = {
+            name: Donation.objects.create(
+                donor=cls.donor, organization=organization, donation_date=date.today(), notes=notes
+            ).id
+            for name, organization, notes in (
+                ('harbor_door', harbor, 'Pickup at the back door'),
+                ('lakeside_door', lakeside, 'Pickup at the back door'),
+                ('harbor_bread', harbor, 'Fresh bread'),
+                ('lakeside_blank', lakeside, None),
+            )
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def search(self, terms):
+        response = self.client.get('/api/donations/', {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def expected(self, *names):
+        return {self.donations[name] for name in names}
+
+    def test_index_is_used(self):
+        self.assertTrue(search.is_installed(connection, Donation))
+        self.assertTrue(search.is_installed(connection, Organization))
+
+    def test_every_term_must_match_in_any_field(self):
+        cases = {
+            'door': ('harbor_door', 'lakeside_door'),
+            'harbor': ('harbor_door', 'harbor_bread'),
+            'door harbor': ('harbor_door',),
+            'harbor door': ('harbor_door',),
+            'door bread': (),
+            'lakeside': ('lakeside_door', 'lakeside_blank'),
+            'pick': ('harbor_door', 'lakeside_door'),
+        }
+        for terms, names in cases.items():
+            with self.subTest(terms=terms):
+                indexed = self.search(terms)
+                self.assertEqual(indexed, self.expected(*names))
+                # Same rows as the SearchFilter fallback
+                with patch('config.search.is_installed', return_value=False):
+                    self.assertEqual(self.search(terms), indexed)
+
+    def test_query_count(self):
+        with self.assertNumQueries(4):
+            self.search('door harbor')
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+    def test_index_lookup_is_outside_the_request_budget(self):
+        with patch.dict(search._installed, clear=True):
+            client = APIClient()
+            client.force_authenticate(self.donor)
+            response = client.get('/api/donations/', {'search': 'door'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Query-Count'], '4')
+            self.assertIn((connection.alias, Donation._meta.db_table), search._installed)
+
+
+def rollup_rows():
+    return (
+        list(OrganizationDailyRollup.objects.order_by('organization', 'date').values(
+            'organization', 'date', 'pending', 'confirmed', 'in_transit', 'completed', 'cancelled',
+            'rating_sum', 'rating_count'
+        )),
+        list(OrganizationDonorRollup.objects.order_by('organization', 'donor').values(
+            'organization', 'donor', 'completed_count'
+        )),
+    )
+
+
+class StatusTransitionTests(TestCase):
+    """Single and bulk status changes follow Donation.STATUS_TRANSITIONS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.donor = create_donor()
+        cls.organization = create_organization()
+        other_donor = create_donor(1)
+        cls.donations = {}
+        for name, donor, status, days_ago in (
+            ('pending', cls.donor, 'pending', 0),
+            ('confirmed', cls.donor, 'confirmed', 1),
+            ('in_transit', cls.donor, 'in_transit', 1),
+            ('completed', cls.donor, 'completed', 2),
+            ('cancelled', cls.donor, 'cancelled', 2),
+            ('other_donor', other_donor, 'pending', 0),
+        ):
+            cls.donations[name] = Donation.objects.create(
+                donor=donor, organization=cls.organization, status=status,
+                donation_date=date.today() - timedelta(days=days_ago)
+            ).id
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def bulk(self, names, status, extra_ids=()):
+        ids = [self.donations[name] for name in names] + list(extra_ids)
+        response = self.client.post(
+            '/api/donations/bulk_transition/', {'ids': ids, 'status': status}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def status_of(self, name):
+        return Donation.objects.get(pk=self.donations[name]).status
+
+    def test_bulk_cancel(self):
+        data = self.bulk(
+            ['pending', 'confirmed', 'completed', 'cancelled', 'other_donor', 'pending'],
+            'cancelled', extra_ids=[999999]
+        )
+        self.assertEqual(data['status'], 'cancelled')
+        self.assertEqual(data['updated'], [self.donations['pending'], self.donations['confirmed']])
+        self.assertEqual(data['skipped'], [
+            {'id': self.donations['completed'], 'reason': 'invalid_transition', 'status': 'completed'},
+            {'id': self.donations['cancelled'], 'reason': 'invalid_transition', 'status': 'cancelled'},
+            # Donations of other donors are reported like missing ones
+            {'id': self.donations['other_donor'], 'reason': 'not_found'},
+            {'id': 999999, 'reason': 'not_found'},
+        ])
+        self.assertEqual(self.status_of('pending'), 'cancelled')
+        self.assertEqual(self.status_of('other_donor'), 'pending')
+
+    def test_bulk_complete(self):
+        data = self.bulk(['pending', 'confirmed', 'in_transit'], 'completed')
+        self.assertEqual(data['updated'], [self.donations['confirmed'], self.donations['in_transit']])
+        self.assertEqual(data['skipped'], [
+            {'id': self.donations['pending'], 'reason': 'invalid_transition', 'status': 'pending'},
+        ])
+
+    def test_organization_sees_its_donations(self):
+        self.client.force_authenticate(self.organization.user)
+        data = self.bulk(['other_donor'], 'confirmed')
+        self.assertEqual(data['updated'], [self.donations['other_donor']])
+
+    def test_rollups_match_a_rebuild(self):
+        self.bulk(['confirmed', 'in_transit'], 'completed')
+        self.bulk(['pending', 'other_donor'], 'cancelled')
+        self.client.force_authenticate(self.organization.user)
+        self.bulk(['other_donor'], 'cancelled')
+        daily, donors = rollup_rows()
+        self.assertEqual(sum(row['completed'] for row in daily), 3)
+        self.assertEqual(sum(row['cancelled'] for row in daily), 3)
+        self.assertEqual(donors, [
+            {'organization': self.organization.id, 'donor': self.donor.id, 'completed_count': 3}
+        ])
+        rollups.rebuild()
+        self.assertEqual(rollup_rows(), (daily, donors))
+
+    def test_invalid_request(self):
+        for payload in ({'ids': [], 'status': 'cancelled'}, {'ids': [1], 'status': 'lost'}):
+            with self.subTest(payload=payload):
+                response = self.client.post('/api/donations/bulk_transition/', payload, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_patch_follows_the_transitions(self):
+        path = f"/api/donations/{self.donations['completed']}/"
+        response = self.client.patch(path, {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+        self.assertEqual(self.status_of('completed'), 'completed')
+
+        path = f"/api/donations/{self.donations['pending']}/"
+        response = self.client.patch(path, {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.status_of('pending'), 'confirmed')
+
+
+class BenchmarkEndpointsCommandTests(TestCase):
+    """The benchmark_endpoints regression gate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        donor = create_donor()
+        create_food_items(donor, 3)
+        Donation.objects.create(donor=donor, organization=create_organization(), donation_date=date.today())
+
+    def run_command(self, baseline, *args):
+        call_command(
+            'benchmark_endpoints', '--iterations=1', '--warmup=0', '--endpoint=food_items_list',
+            f'--baseline={baseline}', *args, stdout=StringIO()
+        )
+
+    def test_missing_baseline_fails(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / 'baseline.json'
+            with self.assertRaisesMessage(CommandError, 'No baseline'):
+                self.run_command(baseline)
+            self.run_command(baseline, '--update-baseline')
+            self.assertIn('food_items_list', json.loads(baseline.read_text())['endpoints'])
+            # Latency may vary, the query count may not; a generous tolerance keeps the test stable
+            self.run_command(baseline, '--tolerance=1000')
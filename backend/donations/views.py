@@ -1,15 +1,24 @@
+from collections import defaultdict
+
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Prefetch, Q
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from config.export import StreamingExportMixin, batched
+from config.fast_list import FastListMixin
+from config.search import FullTextSearchFilter
 
-from .models import Organization, OrganizationNeed, Donation, DonationFeedback
+from . import rollups
+from .models import Organization, OrganizationNeed, Donation, DonationItem, DonationFeedback
 from .serializers import (
     OrganizationSerializer, OrganizationNeedSerializer,
-    DonationSerializer, DonationFeedbackSerializer
+    DonationSerializer, DonationFeedbackSerializer, DonationTransitionSerializer
 )
 
 User = get_user_model()
@@ -27,17 +36,21 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     
     serializer_class = OrganizationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['city', 'state', 'is_verified']
     search_fields = ['name', 'description', 'city', 'state']
     ordering_fields = ['name', 'created_at']
+    query_budget = {'list': 5, 'retrieve': 4}
     
     def get_queryset(self):
         """Return all verified organizations or the user's own organization."""
         user = self.request.user
+        queryset = Organization.objects.select_related('user').prefetch_related(
+            Prefetch('needs', queryset=OrganizationNeed.objects.select_related('food_category'))
+        )
         if user.is_staff:
-            return Organization.objects.all()
-        return Organization.objects.filter(Q(is_verified=True) | Q(user=user))
+            return queryset
+        return queryset.filter(Q(is_verified=True) | Q(user=user))
     
     def get_permissions(self):
         """
@@ -60,13 +73,15 @@ class OrganizationNeedViewSet(viewsets.ModelViewSet):
     
     serializer_class = OrganizationNeedSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 4, 'retrieve': 3}
     
     def get_queryset(self):
         """Return needs for all verified organizations or the user's own organization."""
         user = self.request.user
+        queryset = OrganizationNeed.objects.select_related('food_category')
         if user.is_staff:
-            return OrganizationNeed.objects.all()
-        return OrganizationNeed.objects.filter(
+            return queryset
+        return queryset.filter(
             Q(organization__is_verified=True) | Q(organization__user=user)
         )
     
@@ -83,30 +98,117 @@ class OrganizationNeedViewSet(viewsets.ModelViewSet):
                     return [permissions.IsAdminUser()]
         return super().get_permissions()
 
-class DonationViewSet(viewsets.ModelViewSet):
+class DonationViewSet(FastListMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """ViewSet for managing donations."""
     
     serializer_class = DonationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'organization', 'donation_date']
     search_fields = ['notes', 'organization__name']
     ordering_fields = ['donation_date', 'created_at', 'status']
+    keyset_ordering = ('-created_at', 'id')
+    query_budget = {'list': 5, 'retrieve': 4, 'create': 16}
+    export_filename = 'donations'
+    export_fields = {
+        'id': 'id',
+        'donor': 'donor__email',
+        'organization': 'organization__name',
+        'status': 'status',
+        'pickup_time': 'pickup_time',
+        'donation_date': 'donation_date',
+        'notes': 'notes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    export_nested = ('items', ('food_item', 'food_name', 'quantity', 'unit', 'notes'))
     
     def get_queryset(self):
         """Return donations relevant to the current user."""
+        return self.filter_visible(Donation.objects.select_related(
+            'donor', 'organization', 'feedback__created_by'
+        ).prefetch_related(
+            Prefetch('donation_items', queryset=DonationItem.objects.select_related('food_item'))
+        ))
+    
+    def filter_visible(self, queryset):
+        """Limit ``queryset`` to the donations the current user may see and change."""
         user = self.request.user
         if user.is_staff:
-            return Donation.objects.all()
+            return queryset
         if user.user_type == 'donor':
-            return Donation.objects.filter(donor=user)
+            return queryset.filter(donor=user)
         elif user.user_type == 'organization':
-            try:
-                org = Organization.objects.get(user=user)
-                return Donation.objects.filter(organization=org)
-            except Organization.DoesNotExist:
-                return Donation.objects.none()
-        return Donation.objects.none()
+            return queryset.filter(organization__user=user)
+        return queryset.none()
+    
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """
+        Move many donations to ``status`` at once.
+        
+        Only donations the user can see and whose current status allows the
+        transition are changed, with a single conditional UPDATE; the rest
+        are reported as skipped.
+        """
+        serializer = DonationTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        target = serializer.validated_data['status']
+        sources = Donation.statuses_leading_to(target)
+        
+        visible = self.filter_visible(Donation.objects.filter(pk__in=ids))
+        with transaction.atomic():
+            # Lock the rows first so the rollup deltas match what the UPDATE changes
+            states = {
+                row['id']: rollups.state_from_values(row)
+                for row in visible.filter(status__in=sources).select_for_update(
+                    of=('self',)
+                ).values('id', *rollups.STATE_FIELDS)
+            }
+            if states:
+                visible.filter(pk__in=states, status__in=sources).update(
+                    status=target, updated_at=timezone.now()
+                )
+                # update() does not send the signals that maintain the rollups
+                rollups.record_changes([
+                    (state, state._replace(status=target)) for state in states.values()
+                ])
+        
+        current = dict(visible.exclude(pk__in=states).values_list('id', 'status'))
+        skipped = []
+        for donation_id in ids:
+            if donation_id in states:
+                continue
+            if donation_id in current:
+                skipped.append({
+                    'id': donation_id,
+                    'reason': 'invalid_transition',
+                    'status': current[donation_id]
+                })
+            else:
+                skipped.append({'id': donation_id, 'reason': 'not_found'})
+        
+        return Response({
+            'status': target,
+            'updated': [donation_id for donation_id in ids if donation_id in states],
+            'skipped': skipped
+        })
+    
+    def get_export_rows(self, queryset):
+        """Attach each donation's items, fetched one query per chunk of donations."""
+        for chunk in batched(super().get_export_rows(queryset), self.export_chunk_size):
+            items = defaultdict(list)
+            rows = DonationItem.objects.filter(
+                donation_id__in=[row['id'] for row in chunk]
+            ).order_by('id').values(
+                'donation_id', 'food_item', 'quantity', 'unit', 'notes', food_name=F('food_item__name')
+            )
+            for item in rows:
+                items[item.pop('donation_id')].append(item)
+            for row in chunk:
+                row['items'] = items[row['id']]
+                yield row
     
     @action(detail=True, methods=['post'])
     def add_feedback(self, request, pk=None):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FoodCategory, FoodItem, WasteLog
+from .models import FoodCategory, FoodItem, WasteLog, ExpiryAlert, ExpirySweep
 
 @admin.register(FoodCategory)
 class FoodCategoryAdmin(admin.ModelAdmin):
@@ -18,4 +18,15 @@ class WasteLogAdmin(admin.ModelAdmin):
     list_display = ('food_name', 'user', 'category', 'quantity', 'unit', 'waste_date', 'reason')
     list_filter = ('category', 'reason', 'waste_date')
     search_fields = ('food_name', 'user__email', 'notes')
-    date_hierarchy = 'waste_date'
\ No newline at end of file
+    date_hierarchy = 'waste_date'
+
+@admin.register(ExpiryAlert)
+class ExpiryAlertAdmin(admin.ModelAdmin):
+    list_display = ('food_item', 'user', 'expiry_date', 'created_at')
+    list_filter = ('expiry_date',)
+    search_fields = ('food_item__name', 'user__email')
+    raw_id_fields = ('food_item', 'user')
+
+@admin.register(ExpirySweep)
+class ExpirySweepAdmin(admin.ModelAdmin):
+    list_display = ('run_date', 'started_at', 'finished_at', 'alerts_created', 'users_alerted')
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
+
+from config.search import remember_search_indexes, repair_search_triggers, warm_search_indexes
+
+
+class FoodConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'food'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(repair_search_triggers, sender=self)
+        post_migrate.connect(remember_search_indexes, sender=self)
+        request_started.connect(warm_search_indexes, dispatch_uid='config.search.warm_search_indexes')
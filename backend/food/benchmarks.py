@@ -0,0 +1,63 @@
+"""
+Benchmarks of the bulk importers (``manage.py run_benchmarks``).
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from config.microbench import benchmark, scratch_data, time_call
+
+from .importers import FoodItemImporter
+from .models import FoodCategory, FoodItem
+
+User = get_user_model()
+
+
+def food_item_rows(count, categories):
+    today = timezone.localdate()
+    return [
+        {
+            'name': f'Benchmark item {number}', 'quantity': '1.50', 'unit': 'kg',
+            'expiry_date': (today + timedelta(days=number % 30)).isoformat(),
+            'category': categories[number % len(categories)], 'description': 'Fresh',
+        }
+        for number in range(count)
+    ]
+
+
+@benchmark('import', sizes=(1000, 10000, 50000))
+def food_item_import(sizes, repeat, log):
+    """Food item import: validation alone, model instances, bulk_create, and the whole run."""
+    rows = []
+    with scratch_data():
+        user = User.objects.create_user(
+            username='benchmark-import', email='benchmark-import@example.com', password=None
+        )
+        categories = [
+            FoodCategory.objects.create(name=f'Benchmark category {number}', shelf_life_days=7).name
+            for number in range(10)
+        ]
+        importer = FoodItemImporter(user)
+        for size in sizes:
+            data = food_item_rows(size, categories)
+            lookups = importer.resolve(data)
+            values = [importer.clean_row(row, lookups)[0] for row in data]
+            # Each timed call inserts rows; a few calls are enough
+            calls = max(1, min(repeat, 20000 // size))
+
+            def rate(func):
+                return round(size / time_call(func, calls, warmup=0)['p50_ms'] * 1000)
+
+            rows.append({
+                'rows': size,
+                'validate_rows_per_s': rate(lambda: [importer.clean_row(row, lookups) for row in data]),
+                'instances_rows_per_s': rate(lambda: [FoodItem(user=user, **row) for row in values]),
+                'bulk_create_rows_per_s': rate(lambda: FoodItem.objects.bulk_create(
+                    [FoodItem(user=user, **row) for row in values], batch_size=importer.chunk_size
+                )),
+                'total_rows_per_s': rate(lambda: importer.run(data)),
+            })
+            log(f'  {size} rows')
+    return rows
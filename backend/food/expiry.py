@@ -0,0 +1,123 @@
+"""
+Expiry sweep: raise "donate soon" alerts for food items close to expiry.
+
+How soon is "soon" depends on the category: an item is alerted once it
+is within ``shelf_life_fraction`` of its category's shelf life of
+expiring, capped at ``horizon_days`` (items without a category use the
+full horizon). Users are processed in chunks and each chunk's items are
+read with a range scan on the (user, expiry_date) index of open items,
+so memory stays bounded however many items there are.
+
+Each run is recorded as an ExpirySweep. The previous run is used as a
+watermark: only items whose alert window opened since then, or that
+were changed since then (``updated_at``, or the ``updated_at`` of their
+category), are scanned again. Writes that bypass ``auto_now`` must set
+``updated_at`` themselves, as the donation endpoints do; rows loaded
+with backdated timestamps (``seed_scale``) need a ``--full`` sweep.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ExpiryAlert, ExpirySweep, FoodCategory, FoodItem
+
+User = get_user_model()
+
+
+def alert_windows(horizon_days, shelf_life_fraction):
+    """Return {window_days: [category ids]}, with None standing for no category."""
+    windows = defaultdict(list)
+    windows[horizon_days].append(None)
+    for category_id, shelf_life_days in FoodCategory.objects.values_list('id', 'shelf_life_days'):
+        window = math.ceil(shelf_life_days * shelf_life_fraction)
+        windows[min(max(window, 1), horizon_days)].append(category_id)
+    return windows
+
+
+def sweep_filter(windows, today, previous=None):
+    """Return a Q object matching the items that are due an alert."""
+    condition = Q()
+    for window, category_ids in windows.items():
+        in_window = Q(expiry_date__gte=today, expiry_date__lte=today + timedelta(days=window))
+        if previous is not None:
+            # Skip what the previous sweep already looked at, unless the item
+            # or its category changed since (new expiry date, shelf life, ...)
+            in_window &= (
+                Q(expiry_date__gt=previous.run_date + timedelta(days=window)) |
+                Q(updated_at__gt=previous.started_at) |
+                Q(category__updated_at__gt=previous.started_at)
+            )
+        categories = Q(category_id__in=[pk for pk in category_ids if pk is not None])
+        if None in category_ids:
+            categories |= Q(category__isnull=True)
+        condition |= categories & in_window
+    return condition
+
+
+def run_sweep(horizon_days=7, shelf_life_fraction=0.25, chunk_size=1000, full=False, today=None):
+    """Run one sweep and return its ExpirySweep record."""
+    today = today or timezone.localdate()
+    previous = None
+    if not full:
+        previous = ExpirySweep.objects.filter(
+            finished_at__isnull=False,
+            horizon_days=horizon_days,
+            shelf_life_fraction=shelf_life_fraction,
+            run_date__lte=today
+        ).first()
+
+    sweep = ExpirySweep.objects.create(
+        started_at=timezone.now(),
+        run_date=today,
+        horizon_days=horizon_days,
+        shelf_life_fraction=shelf_life_fraction
+    )
+    condition = sweep_filter(alert_windows(horizon_days, shelf_life_fraction), today, previous)
+
+    user_ids = User.objects.order_by('id').values_list('id', flat=True)
+    chunk = []
+    for user_id in user_ids.iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            _sweep_users(sweep, chunk, condition, chunk_size)
+            chunk = []
+    if chunk:
+        _sweep_users(sweep, chunk, condition, chunk_size)
+
+    # Count what was actually inserted: concurrent sweeps may have alerted some items first
+    sweep.alerts_created = sweep.alerts.count()
+    sweep.users_alerted = sweep.alerts.values('user_id').distinct().count()
+    sweep.finished_at = timezone.now()
+    sweep.save(update_fields=['alerts_created', 'users_alerted', 'finished_at'])
+    return sweep
+
+
+def _sweep_users(sweep, user_ids, condition, chunk_size):
+    items = FoodItem.objects.filter(
+        condition,
+        user_id__in=user_ids,
+        is_available=True,
+        is_donated=False,
+        expiry_alert__isnull=True
+    ).order_by('user_id', 'expiry_date').values_list('id', 'user_id', 'expiry_date')
+
+    alerts = []
+    for item_id, user_id, expiry_date in items.iterator(chunk_size=chunk_size):
+        alerts.append(ExpiryAlert(
+            user_id=user_id, food_item_id=item_id, sweep=sweep, expiry_date=expiry_date
+        ))
+        if len(alerts) >= chunk_size:
+            _save_alerts(alerts)
+            alerts = []
+    _save_alerts(alerts)
+
+
+def _save_alerts(alerts):
+    if alerts:
+        # Another sweep may have alerted the same items concurrently
+        ExpiryAlert.objects.bulk_create(alerts, ignore_conflicts=True)
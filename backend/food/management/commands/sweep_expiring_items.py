@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from food.expiry import run_sweep
+
+
+class Command(BaseCommand):
+    help = 'Raise "donate soon" alerts for food items that are about to expire.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon', type=int, default=getattr(settings, 'EXPIRY_SWEEP_HORIZON_DAYS', 7),
+            help='Longest alert window in days.'
+        )
+        parser.add_argument(
+            '--shelf-life-fraction', type=float,
+            default=getattr(settings, 'EXPIRY_SWEEP_SHELF_LIFE_FRACTION', 0.25),
+            help="Alert once an item is within this fraction of its category's shelf life."
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Ignore the previous sweep and scan every open item.'
+        )
+
+    def handle(self, *args, **options):
+        sweep = run_sweep(
+            horizon_days=options['horizon'],
+            shelf_life_fraction=options['shelf_life_fraction'],
+            chunk_size=options['chunk_size'],
+            full=options['full'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {sweep.alerts_created} alerts for {sweep.users_alerted} users.'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='fooditem_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['-created_at', 'id'], name='fooditem_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_donated', False)), fields=['user', 'expiry_date'], name='fooditem_user_open_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastelog',
+            index=models.Index(fields=['user', '-waste_date', 'id'], name='wastelog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastelog',
+            index=models.Index(fields=['-waste_date', 'id'], name='wastelog_date_idx'),
+        ),
+    ]
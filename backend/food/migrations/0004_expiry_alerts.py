@@ -0,0 +1,50 @@
+# Generated by Django 4.2.16 on 2026-10-18 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpirySweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('run_date', models.DateField()),
+                ('horizon_days', models.PositiveIntegerField()),
+                ('shelf_life_fraction', models.FloatField()),
+                ('alerts_created', models.PositiveIntegerField(default=0)),
+                ('users_alerted', models.PositiveIntegerField(default=0)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'expiry sweep',
+                'verbose_name_plural': 'expiry sweeps',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExpiryAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expiry_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('food_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_alert', to='food.fooditem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'expiry alert',
+                'verbose_name_plural': 'expiry alerts',
+                'ordering': ['expiry_date'],
+                'indexes': [models.Index(fields=['user', 'expiry_date'], name='expiryalert_user_expiry_idx')],
+            },
+        ),
+    ]
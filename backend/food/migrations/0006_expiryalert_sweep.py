@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0005_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expiryalert',
+            name='sweep',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='food.expirysweep'),
+        ),
+    ]
@@ -22,6 +22,9 @@ class FoodCategory(models.Model):
 class FoodItem(models.Model):
     """Model representing food items logged by users."""
     
+    # Columns of the full-text index (config.search)
+    search_index_fields = ('name', 'description')
+    
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='food_items')
     name = models.CharField(max_length=255)
     category = models.ForeignKey(FoodCategory, on_delete=models.SET_NULL, null=True, related_name='food_items')
@@ -38,6 +41,17 @@ class FoodItem(models.Model):
         verbose_name = _('food item')
         verbose_name_plural = _('food items')
         ordering = ['-created_at']
+        indexes = [
+            # Per-user and staff listings, including keyset pagination
+            models.Index(fields=['user', '-created_at', 'id'], name='fooditem_user_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='fooditem_created_idx'),
+            # Items that can still be donated, by how soon they expire
+            models.Index(
+                fields=['user', 'expiry_date'],
+                condition=models.Q(is_available=True, is_donated=False),
+                name='fooditem_user_open_expiry_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.quantity} {self.unit})"
@@ -45,6 +59,9 @@ class FoodItem(models.Model):
 class WasteLog(models.Model):
     """Model for tracking food waste."""
     
+    # Columns of the full-text index (config.search)
+    search_index_fields = ('food_name', 'notes')
+    
     WASTE_REASON_CHOICES = (
         ('expired', 'Expired'),
         ('spoiled', 'Spoiled'),
@@ -68,6 +85,55 @@ class WasteLog(models.Model):
         verbose_name = _('waste log')
         verbose_name_plural = _('waste logs')
         ordering = ['-waste_date']
+        indexes = [
+            models.Index(fields=['user', '-waste_date', 'id'], name='wastelog_user_date_idx'),
+            models.Index(fields=['-waste_date', 'id'], name='wastelog_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.food_name} - {self.quantity} {self.unit} - {self.get_reason_display()}"
+
+class ExpiryAlert(models.Model):
+    """A "donate soon" alert raised by the expiry sweep for a food item."""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='expiry_alerts')
+    food_item = models.OneToOneField(FoodItem, on_delete=models.CASCADE, related_name='expiry_alert')
+    sweep = models.ForeignKey('ExpirySweep', on_delete=models.SET_NULL, null=True, blank=True, related_name='alerts')
+    expiry_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('expiry alert')
+        verbose_name_plural = _('expiry alerts')
+        ordering = ['expiry_date']
+        indexes = [
+            models.Index(fields=['user', 'expiry_date'], name='expiryalert_user_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.food_item_id} expires {self.expiry_date}"
+
+class ExpirySweep(models.Model):
+    """
+    A run of the expiry sweep.
+    
+    The last finished sweep is the watermark for the next one: items it
+    already covered are not scanned again as long as the sweep settings
+    are unchanged.
+    """
+    
+    started_at = models.DateTimeField()
+    run_date = models.DateField()
+    horizon_days = models.PositiveIntegerField()
+    shelf_life_fraction = models.FloatField()
+    alerts_created = models.PositiveIntegerField(default=0)
+    users_alerted = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = _('expiry sweep')
+        verbose_name_plural = _('expiry sweeps')
+        ordering = ['-started_at']
     
     def __str__(self):
-        return f"{self.food_name} - {self.quantity} {self.unit} - {self.get_reason_display()}"
\ No newline at end of file
+        return f"Expiry sweep {self.run_date}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import FoodCategory, FoodItem, WasteLog
+from .models import FoodCategory, FoodItem, WasteLog, ExpiryAlert
 
 class FoodCategorySerializer(serializers.ModelSerializer):
     """Serializer for food categories."""
@@ -46,4 +46,14 @@ class WasteLogSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class ExpiryAlertSerializer(serializers.ModelSerializer):
+    """Serializer for expiry alerts."""
+    
+    food_item_name = serializers.ReadOnlyField(source='food_item.name')
+    
+    class Meta:
+        model = ExpiryAlert
+        fields = ['id', 'food_item', 'food_item_name', 'expiry_date', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,26 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from config.caching import invalidate_on_change
+from .models import FoodCategory, WasteLog
+from .stats import invalidate_waste_stats
+from .views import FoodCategoryViewSet
+
+invalidate_on_change(FoodCategoryViewSet.cache_namespace, FoodCategory)
+
+
+@receiver(pre_save, sender=WasteLog)
+def remember_waste_log_user(sender, instance, raw=False, **kwargs):
+    """Keep the stored owner around so a reassigned log invalidates both users' stats."""
+    if raw or not instance.pk:
+        return
+    instance._stats_user_id = WasteLog.objects.filter(
+        pk=instance.pk
+    ).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=WasteLog)
+@receiver(post_delete, sender=WasteLog)
+def waste_log_changed(sender, instance, **kwargs):
+    user_ids = {instance.user_id, getattr(instance, '_stats_user_id', None)} - {None}
+    invalidate_waste_stats(*user_ids)
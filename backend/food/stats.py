@@ -0,0 +1,101 @@
+"""
+Waste statistics, aggregated in the database and cached per user.
+
+Cache entries live under a versioned namespace per user, plus one for
+the staff-wide view; ``food.signals`` bumps the versions whenever a
+waste log changes (for both owners when it is reassigned). Versions live
+in the cache itself, so with a per-process backend such as the default
+LocMemCache other processes keep serving their cached stats until
+``WASTE_STATS_CACHE_TIMEOUT``; multi-process deployments need a shared
+cache (see ``CACHE_BACKEND``).
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from config.caching import bump_cache_version, versioned_key
+from .models import WasteLog
+
+BUCKETS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+ALL_USERS_NAMESPACE = 'waste-stats:all'
+
+
+def user_namespace(user_id):
+    return f'waste-stats:user:{user_id}'
+
+
+def invalidate_waste_stats(*user_ids):
+    """Drop cached stats for the given users and for the staff-wide view."""
+    bump_cache_version(ALL_USERS_NAMESPACE, *(user_namespace(user_id) for user_id in user_ids))
+
+
+def _quantity(value):
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def _groups(queryset, key, *fields):
+    rows = queryset.values(*fields).annotate(
+        count=Count('id'), quantity=Sum('quantity')
+    ).order_by(*fields)
+    return [
+        dict(
+            {name: row[field] for name, field in zip(key, fields)},
+            count=row['count'],
+            total_quantity=_quantity(row['quantity'])
+        )
+        for row in rows
+    ]
+
+
+def compute_waste_stats(user_id=None, start=None, end=None, bucket='month'):
+    """Aggregate waste logs for one user (or everyone) between two dates."""
+    queryset = WasteLog.objects.order_by()
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    if start is not None:
+        queryset = queryset.filter(waste_date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(waste_date__lte=end)
+
+    totals = queryset.aggregate(count=Count('id'), quantity=Sum('quantity'))
+    periods = queryset.annotate(period=BUCKETS[bucket]('waste_date'))
+
+    reason_labels = dict(WasteLog.WASTE_REASON_CHOICES)
+    by_reason = _groups(queryset, ('reason',), 'reason')
+    for row in by_reason:
+        row['reason_display'] = reason_labels.get(row['reason'], row['reason'])
+
+    return {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'bucket': bucket,
+        'total_count': totals['count'],
+        'total_quantity': _quantity(totals['quantity']),
+        'by_reason': by_reason,
+        'by_category': _groups(
+            queryset, ('category', 'category_name'), 'category_id', 'category__name'
+        ),
+        'by_period': [
+            dict(row, period=row['period'].isoformat())
+            for row in _groups(periods, ('period',), 'period')
+        ],
+    }
+
+
+def get_waste_stats(user_id=None, start=None, end=None, bucket='month'):
+    """Return the waste stats, from the cache when they are still current."""
+    namespace = ALL_USERS_NAMESPACE if user_id is None else user_namespace(user_id)
+    key = versioned_key(namespace, start, end, bucket)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_waste_stats(user_id, start, end, bucket)
+        cache.set(key, stats, getattr(settings, 'WASTE_STATS_CACHE_TIMEOUT', 3600))
+    return stats
@@ -0,0 +1,483 @@
+import json
+import tracemalloc
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .expiry import _save_alerts as save_alerts, run_sweep
+from .importers import FoodItemImporter
+from .models import ExpiryAlert, FoodCategory, FoodItem, WasteLog
+from .stats import get_waste_stats
+from .views import FoodItemViewSet, WasteLogViewSet
+
+User = get_user_model()
+
+
+def create_user(number=0, **kwargs):
+    return User.objects.create_user(
+        username=f'user-{number}', email=f'user-{number}@example.com', password=None, **kwargs
+    )
+
+
+class ListQueryCountTests(TestCase):
+    """The list endpoints run a fixed number of queries, whatever the page holds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        categories = [
+            FoodCategory.objects.create(name=f'Category {number}', shelf_life_days=7)
+            for number in range(3)
+        ]
+        items = FoodItem.objects.bulk_create([
+            FoodItem(
+                user=cls.user, name=f'Item {number}', category=categories[number % 3],
+                quantity='1.00', unit='kg', expiry_date=date.today() + timedelta(days=number)
+            )
+            for number in range(6)
+        ])
+        WasteLog.objects.bulk_create([
+            WasteLog(
+                user=cls.user, food_item=item, food_name=item.name, category=item.category,
+                quantity='0.50', unit='kg', waste_date=date.today(), reason='expired'
+            )
+            for item in items
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_list_queries(self, path, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_food_items(self):
+        response = self.assert_list_queries('/api/food/items/', 2)
+        self.assertEqual(response.data['count'], 6)
+
+    def test_food_items_cursor(self):
+        response = self.assert_list_queries('/api/food/items/?cursor=', 1)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_waste_logs(self):
+        response = self.assert_list_queries('/api/food/waste/', 2)
+        self.assertEqual(response.data['count'], 6)
+
+    def test_waste_logs_cursor(self):
+        response = self.assert_list_queries('/api/food/waste/?cursor=', 1)
+        self.assertEqual(len(response.data['results']), 6)
+
+
+class CursorOrderingTests(TestCase):
+    """Cursor pages only come in the view's keyset ordering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        FoodItem.objects.bulk_create([
+            FoodItem(
+                user=cls.user, name=f'Apple {number}', quantity='1.00', unit='kg',
+                expiry_date=date.today() + timedelta(days=number)
+            )
+            for number in range(3)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matching_ordering_is_accepted(self):
+        response = self.client.get('/api/food/items/?cursor=&ordering=-created_at')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_other_ordering_is_rejected(self):
+        response = self.client.get('/api/food/items/?cursor=&ordering=name')
+        self.assertEqual(response.status_code, 400)
+
+    def test_relevance_ordering_is_rejected(self):
+        response = self.client.get('/api/food/items/?cursor=&search=apple')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_number_mode_keeps_ordering(self):
+        response = self.client.get('/api/food/items/?ordering=-name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.data['results']], ['Apple 2', 'Apple 1', 'Apple 0'])
+
+
+class IndexUsageTests(TestCase):
+    """The list and expiry queries are served by the indexes of migration 0003."""
+
+    def assert_uses_index(self, queryset, name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The test tables are tiny; make the planner show what it would pick at scale
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn(name, plan)
+
+    def test_food_item_pages(self):
+        queryset = FoodItem.objects.filter(user_id=1).order_by(*FoodItemViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'fooditem_user_created_idx')
+        queryset = FoodItem.objects.order_by(*FoodItemViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'fooditem_created_idx')
+
+    def test_open_items_by_expiry(self):
+        queryset = FoodItem.objects.filter(
+            user_id=1, is_available=True, is_donated=False, expiry_date__lte=date.today()
+        )
+        self.assert_uses_index(queryset, 'fooditem_user_open_expiry_idx')
+
+    def test_waste_log_pages(self):
+        queryset = WasteLog.objects.filter(user_id=1).order_by(*WasteLogViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'wastelog_user_date_idx')
+        queryset = WasteLog.objects.order_by(*WasteLogViewSet.keyset_ordering)
+        self.assert_uses_index(queryset[:21], 'wastelog_date_idx')
+
+
+class ExpirySweepTests(TestCase):
+    """The sweep watermark and its alert counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.category = FoodCategory.objects.create(name='Dairy', shelf_life_days=8)
+
+    def create_item(self, days, **kwargs):
+        return FoodItem.objects.create(
+            user=self.user, name='Milk', category=self.category, quantity='1.00', unit='l',
+            expiry_date=date.today() + timedelta(days=days), **kwargs
+        )
+
+    def test_edited_expiry_date_is_rescanned(self):
+        item = self.create_item(30)
+        self.assertEqual(run_sweep().alerts_created, 0)
+        item.expiry_date = date.today() + timedelta(days=1)
+        item.save()
+        sweep = run_sweep()
+        self.assertEqual(sweep.alerts_created, 1)
+        self.assertTrue(ExpiryAlert.objects.filter(food_item=item, sweep=sweep).exists())
+
+    def test_item_available_again_is_rescanned(self):
+        item = self.create_item(1, is_available=False)
+        self.assertEqual(run_sweep().alerts_created, 0)
+        item.is_available = True
+        item.save()
+        self.assertEqual(run_sweep().alerts_created, 1)
+
+    def test_longer_shelf_life_is_rescanned(self):
+        self.create_item(5)
+        self.assertEqual(run_sweep().alerts_created, 0)
+        self.category.shelf_life_days = 40
+        self.category.save()
+        self.assertEqual(run_sweep().alerts_created, 1)
+
+    def test_counts_only_inserted_alerts(self):
+        for _ in range(3):
+            self.create_item(1)
+        FoodItem.objects.create(
+            user=create_user(1), name='Eggs', quantity='1.00', unit='pcs', expiry_date=date.today()
+        )
+
+        def save_after_concurrent_sweep(alerts):
+            # Another sweep alerts the first item between the scan and the insert
+            if alerts:
+                first = alerts[0]
+                ExpiryAlert.objects.create(
+                    user_id=first.user_id, food_item_id=first.food_item_id, expiry_date=first.expiry_date
+                )
+            save_alerts(alerts)
+
+        with patch('food.expiry._save_alerts', side_effect=save_after_concurrent_sweep):
+            sweep = run_sweep(full=True)
+        self.assertEqual(ExpiryAlert.objects.count(), 4)
+        self.assertEqual(sweep.alerts_created, 3)
+        self.assertEqual(sweep.users_alerted, 2)
+
+
+class WasteStatsCacheTests(TestCase):
+    """Cached waste stats are invalidated by waste log changes."""
+
+    def setUp(self):
+        self.first, self.second = create_user(), create_user(1)
+        self.log = WasteLog.objects.create(
+            user=self.first, food_name='Bread', quantity='1.00', unit='kg',
+            waste_date=date.today(), reason='expired'
+        )
+
+    def test_reassigned_log_invalidates_both_users(self):
+        self.assertEqual(get_waste_stats(self.first.id)['total_count'], 1)
+        self.assertEqual(get_waste_stats(self.second.id)['total_count'], 0)
+        self.log.user = self.second
+        self.log.save()
+        self.assertEqual(get_waste_stats(self.first.id)['total_count'], 0)
+        self.assertEqual(get_waste_stats(self.second.id)['total_count'], 1)
+
+
+class CategoryResponseCacheTests(TestCase):
+    """ETags of the cached category responses."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        FoodCategory.objects.bulk_create([
+            FoodCategory(name=f'Category {number}', description='Keep refrigerated. ' * 5, shelf_life_days=7)
+            for number in range(20)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_gzipped_etag_revalidates(self):
+        response = self.client.get('/api/food/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(
+            '/api/food/categories/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors_have_no_etag(self):
+        response = self.client.get('/api/food/categories/0/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+
+class WasteLogExportTests(TestCase):
+    """Streaming exports keep memory bounded however many rows there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small, cls.large = create_user(), create_user(1)
+        for user, count in ((cls.small, 2500), (cls.large, 25000)):
+            WasteLog.objects.bulk_create([
+                WasteLog(
+                    user=user, food_name=f'Item {number}', quantity='0.50', unit='kg',
+                    waste_date=date.today(), reason='expired', notes='Left in the back of the fridge.'
+                )
+                for number in range(count)
+            ], batch_size=2000)
+
+    def export(self, user, export_format):
+        """Stream ``user``'s export; return its line count and the peak traced memory in bytes."""
+        client = APIClient()
+        client.force_authenticate(user)
+        lines = 0
+        tracemalloc.start()
+        try:
+            response = client.get(f'/api/food/waste/export/?export_format={export_format}')
+            for chunk in response.streaming_content:
+                lines += chunk.count(b'\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return lines, peak
+
+    def test_memory_does_not_grow_with_rows(self):
+        for export_format, header_lines in (('ndjson', 0), ('csv', 1)):
+            with self.subTest(export_format=export_format):
+                small_lines, small_peak = self.export(self.small, export_format)
+                large_lines, large_peak = self.export(self.large, export_format)
+                self.assertEqual(small_lines, 2500 + header_lines)
+                self.assertEqual(large_lines, 25000 + header_lines)
+                # Ten times the rows, about the same peak (a few chunks)
+                self.assertLess(large_peak, small_peak * 2)
+
+
+class FastListParityTests(TestCase):
+    """The .values() list path returns exactly what the serializers return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        category = FoodCategory.objects.create(name='Bakery', shelf_life_days=3)
+        items = [
+            FoodItem.objects.create(
+                user=cls.user, name=f'Bread loaf {number}', category=category if number % 3 else None,
+                quantity='0.75', unit='kg', expiry_date=date.today() + timedelta(days=number),
+                description='Sourdough' if number % 2 else None, is_donated=number % 4 == 0
+            )
+            for number in range(12)
+        ]
+        reasons = [choice for choice, _ in WasteLog.WASTE_REASON_CHOICES]
+        for number, item in enumerate(items):
+            WasteLog.objects.create(
+                user=cls.user, food_item=item if number % 2 else None, food_name=item.name,
+                category=item.category, quantity='0.25', unit='kg',
+                waste_date=date.today() - timedelta(days=number), reason=reasons[number % len(reasons)],
+                notes='Stale bread' if number % 3 else None
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_parity(self, path):
+        with self.settings(FAST_LIST_SERIALIZATION=True):
+            fast = self.client.get(path)
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(path)
+        self.assertEqual(fast.status_code, 200, fast.content)
+        self.assertEqual(fast.json(), slow.json())
+        return fast.json()
+
+    def test_page_number_pages(self):
+        for path in ('/api/food/items/', '/api/food/waste/'):
+            with self.subTest(path=path):
+                self.assert_parity(f'{path}?page_size=5')
+                self.assert_parity(f'{path}?page_size=5&page=3')
+
+    def test_cursor_pages(self):
+        for path in ('/api/food/items/', '/api/food/waste/'):
+            with self.subTest(path=path):
+                first = self.assert_parity(f'{path}?cursor=&page_size=5')
+                self.assertIsNotNone(first['next'])
+                self.assert_parity(first['next'])
+
+    def test_search(self):
+        self.assertEqual(len(self.assert_parity('/api/food/items/?search=bread')['results']), 10)
+        self.assertEqual(len(self.assert_parity('/api/food/waste/?search=stale')['results']), 8)
+
+
+class BulkImportTests(TestCase):
+    """Food item and waste log imports from JSON bodies and CSV/JSON files."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.produce = FoodCategory.objects.create(name='Produce', shelf_life_days=7)
+        cls.bakery = FoodCategory.objects.create(name='Bakery', shelf_life_days=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def item(self, **values):
+        row = {'name': 'Apples', 'quantity': '2.50', 'unit': 'kg', 'expiry_date': '2030-01-31'}
+        row.update(values)
+        return row
+
+    def test_json_body(self):
+        response = self.client.post('/api/food/items/import/', [
+            self.item(category='Produce', is_available='no'),
+            self.item(name='Rolls', category=self.bakery.id, description='Day old'),
+            self.item(name='Salt'),
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data, {'created': 3})
+        items = {item.name: item for item in FoodItem.objects.filter(user=self.user)}
+        self.assertEqual(items['Apples'].category_id, self.produce.id)
+        self.assertFalse(items['Apples'].is_available)
+        self.assertEqual(str(items['Apples'].quantity), '2.50')
+        self.assertEqual(items['Rolls'].category_id, self.bakery.id)
+        self.assertEqual(items['Rolls'].description, 'Day old')
+        self.assertIsNone(items['Salt'].category_id)
+        self.assertTrue(items['Salt'].is_available)
+
+    def test_csv_file(self):
+        upload = SimpleUploadedFile('items.csv', (
+            '\ufeffname,quantity,unit,expiry_date,category,is_available\n'
+            'Apples,1.5,kg,2030-01-31,Produce,yes\n'
+            'Rolls,12,pcs,2030-01-02, Bakery ,0\n'
+        ).encode(), content_type='text/csv')
+        response = self.client.post('/api/food/items/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            set(FoodItem.objects.values_list('name', 'category__name', 'is_available')),
+            {('Apples', 'Produce', True), ('Rolls', 'Bakery', False)}
+        )
+
+    def test_json_file(self):
+        upload = SimpleUploadedFile(
+            'items.json', json.dumps([self.item(category=self.produce.id)]).encode(),
+            content_type='application/json'
+        )
+        response = self.client.post('/api/food/items/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(FoodItem.objects.get().category_id, self.produce.id)
+
+    def test_unreadable_upload(self):
+        upload = SimpleUploadedFile('items.json', b'{"name": ', content_type='application/json')
+        response = self.client.post('/api/food/items/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Could not read items.json', response.data['detail'])
+
+    def test_errors_are_reported_per_row_and_nothing_is_saved(self):
+        response = self.client.post('/api/food/items/import/', [
+            self.item(),
+            self.item(quantity='lots'),
+            self.item(category='Dairy', expiry_date=None),
+            self.item(category=True),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(list(errors), [2, 3, 4])
+        self.assertEqual(list(errors[2]), ['quantity'])
+        self.assertEqual(errors[3], {
+            'expiry_date': ['This field is required.'], 'category': ['Unknown category "Dairy".']
+        })
+        self.assertEqual(list(errors[4]), ['category'])
+        self.assertFalse(FoodItem.objects.exists())
+
+    def test_row_limit(self):
+        with self.settings(IMPORT_MAX_ROWS=2):
+            response = self.client.post(
+                '/api/food/items/import/', [self.item() for _ in range(3)], format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'At most 2 rows can be imported at once.')
+        self.assertFalse(FoodItem.objects.exists())
+
+    def test_failing_batch_rolls_back_earlier_batches(self):
+        importer = FoodItemImporter(self.user)
+        importer.chunk_size = 2
+        bulk_create = FoodItem.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objects, *args, **kwargs):
+            calls.append(len(objects))
+            if len(calls) == 2:
+                raise IntegrityError('simulated failure')
+            return bulk_create(objects, *args, **kwargs)
+
+        with patch.object(FoodItem.objects, 'bulk_create', failing_bulk_create):
+            with self.assertRaises(IntegrityError):
+                importer.run([self.item(name=f'Item {number}') for number in range(5)])
+        self.assertEqual(calls, [2, 2])
+        self.assertFalse(FoodItem.objects.exists())
+
+    def test_waste_logs_only_reference_own_items(self):
+        own = FoodItem.objects.create(
+            user=self.user, name='Apples', quantity='1.00', unit='kg', expiry_date=date.today()
+        )
+        other = FoodItem.objects.create(
+            user=create_user(1), name='Pears', quantity='1.00', unit='kg', expiry_date=date.today()
+        )
+        row = {'food_name': 'Apples', 'quantity': '1', 'unit': 'kg', 'waste_date': '2030-01-01', 'reason': 'expired'}
+        response = self.client.post('/api/food/waste/import/', [
+            dict(row, food_item=own.id, category='Produce'),
+            dict(row, food_item=other.id),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'row': 2, 'errors': {'food_item': ['Unknown food item.']}}])
+
+        response = self.client.post('/api/food/waste/import/', [
+            dict(row, food_item=own.id, category='Produce'), dict(row, reason='spoiled')
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            list(WasteLog.objects.order_by('id').values_list('food_item', 'category', 'reason')),
+            [(own.id, self.produce.id, 'expired'), (None, None, 'spoiled')]
+        )
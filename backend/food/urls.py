@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FoodCategoryViewSet, FoodItemViewSet, WasteLogViewSet
+from .views import FoodCategoryViewSet, FoodItemViewSet, WasteLogViewSet, ExpiryAlertViewSet
 
 router = DefaultRouter()
 router.register(r'categories', FoodCategoryViewSet)
 router.register(r'items', FoodItemViewSet, basename='fooditem')
 router.register(r'waste', WasteLogViewSet, basename='wastelog')
+router.register(r'expiry-alerts', ExpiryAlertViewSet, basename='expiryalert')
 
 urlpatterns = [
     path('', include(router.urls)),
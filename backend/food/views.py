@@ -1,48 +1,150 @@
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import FoodCategory, FoodItem, WasteLog
-from .serializers import FoodCategorySerializer, FoodItemSerializer, WasteLogSerializer
+from django.utils.dateparse import parse_date
+from config.caching import VersionedResponseCacheMixin
+from config.export import StreamingExportMixin
+from config.fast_list import FastListMixin
+from config.search import FullTextSearchFilter
+from .importers import FoodItemImporter, UploadError, WasteLogImporter, read_rows
+from .models import FoodCategory, FoodItem, WasteLog, ExpiryAlert
+from .serializers import (
+    FoodCategorySerializer, FoodItemSerializer, WasteLogSerializer, ExpiryAlertSerializer
+)
+from .stats import BUCKETS, get_waste_stats
 
-class FoodCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+def import_response(importer, request):
+    """Run a bulk import and report what was created, or the per-row errors."""
+    try:
+        rows = read_rows(request)
+    except UploadError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    created, errors = importer.run(rows)
+    if errors:
+        return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+class FoodCategoryViewSet(VersionedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing food categories."""
     
+    cache_namespace = 'food-categories'
+    # Categories are shared by all users
+    cache_per_user = False
     queryset = FoodCategory.objects.all()
     serializer_class = FoodCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'shelf_life_days']
+    query_budget = {'list': 4, 'retrieve': 3}
 
-class FoodItemViewSet(viewsets.ModelViewSet):
+class FoodItemViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet for managing food items."""
     
     serializer_class = FoodItemSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'is_available', 'is_donated']
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'expiry_date', 'created_at']
+    keyset_ordering = ('-created_at', 'id')
+    query_budget = {'list': 4, 'retrieve': 3}
     
     def get_queryset(self):
         """Return only the current user's food items."""
         user = self.request.user
+        queryset = FoodItem.objects.select_related('category', 'user')
         if user.is_staff:
-            return FoodItem.objects.all()
-        return FoodItem.objects.filter(user=user)
+            return queryset
+        return queryset.filter(user=user)
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """Create food items from a CSV/JSON upload or a JSON array of rows."""
+        return import_response(FoodItemImporter(request.user), request)
 
-class WasteLogViewSet(viewsets.ModelViewSet):
+class WasteLogViewSet(FastListMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """ViewSet for managing waste logs."""
     
     serializer_class = WasteLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'reason', 'waste_date']
     search_fields = ['food_name', 'notes']
     ordering_fields = ['waste_date', 'created_at']
+    keyset_ordering = ('-waste_date', 'id')
+    query_budget = {'list': 4, 'retrieve': 3, 'stats': 6}
+    export_filename = 'waste-logs'
+    export_fields = {
+        'id': 'id',
+        'user': 'user__email',
+        'food_item': 'food_item_id',
+        'food_name': 'food_name',
+        'category': 'category__name',
+        'quantity': 'quantity',
+        'unit': 'unit',
+        'waste_date': 'waste_date',
+        'reason': 'reason',
+        'notes': 'notes',
+        'created_at': 'created_at',
+    }
     
     def get_queryset(self):
         """Return only the current user's waste logs."""
         user = self.request.user
+        queryset = WasteLog.objects.select_related('category', 'user')
         if user.is_staff:
-            return WasteLog.objects.all()
-        return WasteLog.objects.filter(user=user)
\ No newline at end of file
+            return queryset
+        return queryset.filter(user=user)
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """Create waste logs from a CSV/JSON upload or a JSON array of rows."""
+        return import_response(WasteLogImporter(request.user), request)
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Return waste totals by reason, by category and by week or month.
+        
+        Staff see the breakdown across all users. Accepts ``start`` and
+        ``end`` dates (inclusive) and ``bucket`` (``week`` or ``month``).
+        """
+        bucket = request.query_params.get('bucket', 'month')
+        if bucket not in BUCKETS:
+            return Response(
+                {'detail': f"bucket must be one of: {', '.join(BUCKETS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dates = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+                if value and dates[param] is None:
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {'detail': f'{param} must be a date in YYYY-MM-DD format.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        user_id = None if request.user.is_staff else request.user.id
+        return Response(get_waste_stats(user_id, dates['start'], dates['end'], bucket))
+
+class ExpiryAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for viewing "donate soon" alerts raised by the expiry sweep."""
+    
+    serializer_class = ExpiryAlertSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 4, 'retrieve': 3}
+    
+    def get_queryset(self):
+        """Return the current user's alerts for items that can still be donated."""
+        return ExpiryAlert.objects.filter(
+            user=self.request.user,
+            food_item__is_available=True,
+            food_item__is_donated=False
+        ).select_related('food_item')
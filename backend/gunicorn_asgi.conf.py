@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for serving the ASGI application with uvicorn workers.
+
+    gunicorn -c gunicorn_asgi.conf.py config.asgi:application
+
+Each worker runs an event loop, so the async views (``.../async/``)
+keep serving other requests while one waits on the database; sync views
+still work and run in a thread pool. Set ``SERVE_STATIC=False`` and
+serve static files elsewhere, otherwise the sync-only WhiteNoise
+middleware puts every request on a thread (see ``config.async_api``).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
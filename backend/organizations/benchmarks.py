@@ -0,0 +1,148 @@
+"""
+Benchmarks of the organization lookups (``manage.py run_benchmarks``).
+
+The benchmarks add verified organizations spread evenly over the
+continental US (roughly 25-49N, 124-67W) in scratch transactions, then
+search around random points in the same area. At a million
+organizations that is about 7 per 0.1 degree grid cell.
+"""
+
+import random
+
+from django.contrib.auth import get_user_model
+
+from config.microbench import benchmark, scratch_data, time_call
+from donations.models import Organization
+
+from .engine import OrganizationDistanceEngine
+from .geo import grid_cell, haversine_km
+from .views import NearbyOrganizationsView
+
+User = get_user_model()
+
+AREA = (25.0, 49.0, -124.0, -67.0)
+BATCH_SIZE = 5000
+
+
+def random_point(rng):
+    min_lat, max_lat, min_lng, max_lng = AREA
+    return round(rng.uniform(min_lat, max_lat), 6), round(rng.uniform(min_lng, max_lng), 6)
+
+
+def add_organizations(start, count, rng):
+    """Create ``count`` verified organizations (and their users) at random points in AREA."""
+    for offset in range(0, count, BATCH_SIZE):
+        numbers = range(start + offset, start + min(offset + BATCH_SIZE, count))
+        users = User.objects.bulk_create([
+            User(
+                username=f'benchmark-org-{number}', email=f'benchmark-org-{number}@example.com',
+                password='!', user_type='organization'
+            )
+            for number in numbers
+        ])
+        organizations = []
+        for user, number in zip(users, numbers):
+            latitude, longitude = random_point(rng)
+            organizations.append(Organization(
+                user_id=user.id, name=f'Benchmark Organization {number}', address='1 Main St',
+                city='Benchmark', state='BM', zip_code='00000', phone_number='555-0000000',
+                email=user.email, latitude=latitude, longitude=longitude,
+                geo_cell=grid_cell(latitude, longitude), is_verified=True,
+            ))
+        Organization.objects.bulk_create(organizations)
+
+
+def grow(sizes, rng, log):
+    """Add organizations up to each size in turn, yielding the size once it is reached."""
+    created = 0
+    for size in sorted(sizes):
+        add_organizations(created, size - created, rng)
+        created = size
+        log(f'  {size} organizations added')
+        yield size
+
+
+def scan_repeat(repeat, size):
+    # Full scans of large tables take seconds; a few calls are enough
+    return max(1, min(repeat, 100000 // size))
+
+
+@benchmark('nearby', sizes=(1000, 10000, 100000, 1000000))
+def nearby(sizes, repeat, log):
+    """Nearby search (10 km): grid-cell prefilter vs scanning every verified organization."""
+    rng = random.Random(0)
+    view = NearbyOrganizationsView()
+    rows = []
+
+    def grid():
+        lat, lng = random_point(rng)
+        return view.within_radius(lat, lng, 10, view.get_candidates(lat, lng, 10))
+
+    def scan():
+        # The lookup before the grid cells: every verified organization,
+        # with its distance computed in Python
+        lat, lng = random_point(rng)
+        nearby = []
+        for org_id, org_lat, org_lng in Organization.objects.filter(
+            is_verified=True, latitude__isnull=False, longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude'):
+            distance = haversine_km(lat, lng, float(org_lat), float(org_lng))
+            if distance <= 10:
+                nearby.append((org_id, distance))
+        nearby.sort(key=lambda x: x[1])
+        return nearby
+
+    with scratch_data():
+        for size in grow(sizes, rng, log):
+            found = [len(grid()) for _ in range(20)]
+            rows.append({
+                'added': size,
+                'verified': Organization.objects.filter(is_verified=True).count(),
+                'found_avg': round(sum(found) / len(found), 1),
+                'grid_p50_ms': time_call(grid, repeat)['p50_ms'],
+                'scan_p50_ms': time_call(scan, scan_repeat(repeat, size), warmup=0)['p50_ms'],
+            })
+    return rows
+
+
+@benchmark('distance_engine', sizes=(1000, 10000, 100000, 1000000))
+def distance_engine(sizes, repeat, log):
+    """k-nearest (k=10): NumPy engine vs a Python haversine loop over the same coordinates."""
+    rng = random.Random(0)
+    engine = OrganizationDistanceEngine()
+    rows = []
+
+    def reload():
+        engine.invalidate()
+        engine.snapshot()
+
+    def vectorized():
+        lat, lng = random_point(rng)
+        return engine.nearest(lat, lng, 10)
+
+    with scratch_data():
+        for size in grow(sizes, rng, log):
+            coordinates = [
+                (org_id, float(lat), float(lng))
+                for org_id, lat, lng in Organization.objects.filter(
+                    is_verified=True, latitude__isnull=False, longitude__isnull=False
+                ).values_list('id', 'latitude', 'longitude')
+            ]
+
+            def loop():
+                lat, lng = random_point(rng)
+                distances = [
+                    (haversine_km(lat, lng, org_lat, org_lng), org_id)
+                    for org_id, org_lat, org_lng in coordinates
+                ]
+                distances.sort()
+                return distances[:10]
+
+            rows.append({
+                'added': size,
+                'indexed': len(coordinates),
+                'load_ms': time_call(reload, scan_repeat(repeat, size), warmup=0)['p50_ms'],
+                'engine_p50_ms': time_call(vectorized, repeat)['p50_ms'],
+                'loop_p50_ms': time_call(loop, scan_repeat(repeat, size), warmup=0)['p50_ms'],
+            })
+    return rows
@@ -0,0 +1,144 @@
+"""
+In-memory distance engine for verified organizations.
+
+The engine keeps the coordinates of every verified organization in NumPy
+arrays so a whole batch of haversine distances can be computed at once,
+and k-nearest queries use a partial selection instead of a full sort.
+The snapshot is process-local: it is invalidated by the Organization
+signals in ``organizations.signals`` and otherwise refreshed after
+``ORGANIZATION_ENGINE_TTL`` seconds to pick up changes made by other
+processes or by queryset updates that bypass signals.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from donations.models import Organization
+
+from .geo import EARTH_RADIUS_KM
+
+DEFAULT_TTL = 300
+
+
+def haversine_km_batch(latitude, longitude, lat_radians, lng_radians, cos_lat):
+    """Distances in km from a point to arrays of coordinates given in radians."""
+    origin_lat = np.radians(latitude)
+    dlat = lat_radians - origin_lat
+    dlng = lng_radians - np.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(origin_lat) * cos_lat * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def indexed_position(organization):
+    """Return the coordinates an index holds for an organization, or None if excluded."""
+    if (organization.is_verified and organization.latitude is not None
+            and organization.longitude is not None):
+        return (float(organization.latitude), float(organization.longitude))
+    return None
+
+
+class OrganizationSnapshot:
+    """
+    Base class for process-local snapshots of verified organizations.
+    
+    Subclasses implement ``_load`` returning the snapshot data and the
+    {organization id: (latitude, longitude)} positions it was built from,
+    which are compared with ``indexed_state`` to tell whether a saved
+    organization affects it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._positions = {}
+        self._loaded_at = None
+        self._stale = True
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ORGANIZATION_ENGINE_TTL', DEFAULT_TTL)
+
+    def invalidate(self):
+        """Force a reload on the next query."""
+        self._stale = True
+
+    def indexed_state(self, organization):
+        """Return what the snapshot holds for an organization, or None if it is excluded."""
+        return indexed_position(organization)
+
+    def organization_changed(self, organization, deleted=False):
+        """Invalidate the snapshot if an organization's indexed state changed."""
+        current = None if deleted else self.indexed_state(organization)
+        if self._positions.get(organization.pk) != current:
+            self.invalidate()
+
+    def _is_fresh(self):
+        if self._stale or self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.ttl
+
+    def _load(self):
+        raise NotImplementedError
+
+    def snapshot(self):
+        """Return the current snapshot, reloading it if stale or expired."""
+        if not self._is_fresh():
+            with self._lock:
+                if not self._is_fresh():
+                    # Clear the flag first so an invalidation that races with
+                    # the reload is not lost.
+                    self._stale = False
+                    self._snapshot, self._positions = self._load()
+                    self._loaded_at = time.monotonic()
+        return self._snapshot
+
+
+class OrganizationDistanceEngine(OrganizationSnapshot):
+    """Process-local coordinate index for verified organizations."""
+
+    def _load(self):
+        rows = Organization.objects.filter(
+            is_verified=True,
+            latitude__isnull=False,
+            longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude')
+
+        ids, latitudes, longitudes = [], [], []
+        for org_id, latitude, longitude in rows:
+            ids.append(org_id)
+            latitudes.append(float(latitude))
+            longitudes.append(float(longitude))
+
+        lat_radians = np.radians(np.asarray(latitudes, dtype=np.float64))
+        snapshot = (
+            np.asarray(ids, dtype=np.int64),
+            lat_radians,
+            np.radians(np.asarray(longitudes, dtype=np.float64)),
+            np.cos(lat_radians),
+        )
+        return snapshot, dict(zip(ids, zip(latitudes, longitudes)))
+
+    def distances(self, latitude, longitude):
+        """Return (ids, distances_km) for every indexed organization."""
+        ids, lat_radians, lng_radians, cos_lat = self.snapshot()
+        return ids, haversine_km_batch(latitude, longitude, lat_radians, lng_radians, cos_lat)
+
+    def nearest(self, latitude, longitude, k, max_distance=None):
+        """Return up to ``k`` (id, distance_km) pairs ordered by distance."""
+        ids, distances = self.distances(latitude, longitude)
+        if max_distance is not None:
+            within = distances <= max_distance
+            ids, distances = ids[within], distances[within]
+
+        if k < len(distances):
+            selected = np.argpartition(distances, k - 1)[:k]
+        else:
+            selected = np.arange(len(distances))
+        selected = selected[np.argsort(distances[selected], kind='stable')]
+        return [(int(ids[i]), float(distances[i])) for i in selected]
+
+
+distance_engine = OrganizationDistanceEngine()
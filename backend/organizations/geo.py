@@ -0,0 +1,119 @@
+"""
+Geospatial helpers for organization lookups.
+
+Organizations are bucketed into a fixed latitude/longitude grid. Each
+organization stores the integer id of the cell it falls in (``geo_cell``),
+so a radius search can be answered with a handful of indexed range scans
+instead of loading every row. Exact distances are then only computed for
+the candidates inside the covering cells.
+"""
+
+import math
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371
+
+# 0.1 degree cells are roughly 11km tall, which keeps the default 10km
+# search down to a 3x3 block of cells.
+GRID_CELL_DEGREES = 0.1
+GRID_ROWS = 1800
+GRID_COLUMNS = 3600
+
+# Above this many rows the per-row ranges are collapsed into a single band.
+MAX_GRID_ROW_RANGES = 64
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Return the great-circle distance between two points in kilometres."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(dlng / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _grid_row(latitude):
+    row = math.floor((latitude + 90) / GRID_CELL_DEGREES)
+    return min(max(row, 0), GRID_ROWS - 1)
+
+
+def _grid_column(longitude):
+    return math.floor((longitude + 180) / GRID_CELL_DEGREES) % GRID_COLUMNS
+
+
+def grid_cell(latitude, longitude):
+    """Return the grid cell id for a coordinate, or None if it is incomplete."""
+    if latitude is None or longitude is None:
+        return None
+    return _grid_row(float(latitude)) * GRID_COLUMNS + _grid_column(float(longitude))
+
+
+def bounding_box(latitude, longitude, distance_km):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing the search circle.
+
+    The longitude bounds are None when the circle spans every meridian
+    (large radii or searches close to a pole).
+    """
+    delta_lat = math.degrees(distance_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, None, None
+
+    angular_distance = distance_km / EARTH_RADIUS_KM
+    ratio = math.sin(angular_distance) / math.cos(math.radians(latitude))
+    if angular_distance >= math.pi / 2 or ratio >= 1:
+        return min_lat, max_lat, None, None
+    delta_lng = math.degrees(math.asin(ratio))
+    return min_lat, max_lat, longitude - delta_lng, longitude + delta_lng
+
+
+def grid_cell_ranges(latitude, longitude, distance_km):
+    """Return inclusive (low, high) ``geo_cell`` ranges covering the search circle."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, distance_km)
+    first_row, last_row = _grid_row(min_lat), _grid_row(max_lat)
+
+    if min_lng is None or last_row - first_row >= MAX_GRID_ROW_RANGES:
+        # A single band of whole rows; the longitude bounds are applied
+        # separately by the caller.
+        return [(first_row * GRID_COLUMNS, last_row * GRID_COLUMNS + GRID_COLUMNS - 1)]
+
+    first_column, last_column = _grid_column(min_lng), _grid_column(max_lng)
+    ranges = []
+    for row in range(first_row, last_row + 1):
+        base = row * GRID_COLUMNS
+        if first_column <= last_column:
+            ranges.append((base + first_column, base + last_column))
+        else:
+            # The box crosses the antimeridian.
+            ranges.append((base + first_column, base + GRID_COLUMNS - 1))
+            ranges.append((base, base + last_column))
+    return ranges
+
+
+def nearby_filter(latitude, longitude, distance_km):
+    """
+    Return a Q object selecting organizations that may lie within the radius.
+
+    This is a cheap, index-backed prefilter: it matches everything inside
+    the covering grid cells and bounding box, so callers still need to check
+    the exact distance of each candidate.
+    """
+    cells = Q()
+    for low, high in grid_cell_ranges(latitude, longitude, distance_km):
+        cells |= Q(geo_cell__gte=low, geo_cell__lte=high)
+
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, distance_km)
+    condition = cells & Q(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lng is not None:
+        if min_lng < -180.0:
+            condition &= Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng)
+        elif max_lng > 180.0:
+            condition &= Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360)
+        else:
+            condition &= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+    return condition
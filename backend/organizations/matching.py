@@ -0,0 +1,162 @@
+"""
+Donation matching: rank verified organizations for a donor's food items.
+
+An organization's score for a donor is the sum, over the donor's items
+whose category it needs, of the need's priority weighted by how soon the
+item expires, scaled down by the organization's distance from the donor.
+Needs are held in a process-local index from food category to the
+organizations that need it (see ``OrganizationSnapshot``), so a request
+only loads the donor's items and scores all candidates in one NumPy batch.
+Organizations without coordinates are only matched for donors without a
+location, where distance plays no part.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from django.utils import timezone
+
+from donations.models import OrganizationNeed
+
+from .engine import OrganizationSnapshot, haversine_km_batch
+
+# Distance at which the distance factor halves the score
+DISTANCE_SCALE_KM = 10.0
+
+
+class NeedIndex(OrganizationSnapshot):
+    """Category -> needing organizations index over verified organizations."""
+
+    def indexed_state(self, organization):
+        if not organization.is_verified:
+            return None
+        return tuple(
+            None if value is None else float(value)
+            for value in (organization.latitude, organization.longitude)
+        )
+
+    def _load(self):
+        rows = OrganizationNeed.objects.filter(
+            organization__is_verified=True
+        ).order_by().values_list(
+            'food_category_id', 'organization_id', 'priority',
+            'organization__latitude', 'organization__longitude'
+        )
+
+        org_positions = {}
+        coordinates = []
+        latitudes, longitudes = [], []
+        needs = defaultdict(lambda: ([], []))
+        categories = defaultdict(set)
+        max_priority = 0
+        for category_id, org_id, priority, latitude, longitude in rows:
+            position = org_positions.get(org_id)
+            if position is None:
+                position = org_positions[org_id] = len(latitudes)
+                if latitude is None or longitude is None:
+                    coordinates.append((None, None))
+                    # NaN distances keep these out of distance-based matches
+                    latitudes.append(np.nan)
+                    longitudes.append(np.nan)
+                else:
+                    coordinates.append((float(latitude), float(longitude)))
+                    latitudes.append(float(latitude))
+                    longitudes.append(float(longitude))
+            needs[category_id][0].append(position)
+            needs[category_id][1].append(priority)
+            categories[position].add(category_id)
+            max_priority = max(max_priority, priority)
+
+        by_category = {
+            category_id: (
+                np.asarray(positions, dtype=np.int64),
+                (np.asarray(priorities, dtype=np.float64) + 1) / (max_priority + 1),
+            )
+            for category_id, (positions, priorities) in needs.items()
+        }
+        lat_radians = np.radians(np.asarray(latitudes, dtype=np.float64))
+        org_ids = np.empty(len(org_positions), dtype=np.int64)
+        for org_id, position in org_positions.items():
+            org_ids[position] = org_id
+
+        snapshot = {
+            'org_ids': org_ids,
+            'lat_radians': lat_radians,
+            'lng_radians': np.radians(np.asarray(longitudes, dtype=np.float64)),
+            'cos_lat': np.cos(lat_radians),
+            'by_category': by_category,
+            'categories': dict(categories),
+        }
+        positions = {
+            int(org_ids[position]): coordinates[position] for position in range(len(org_ids))
+        }
+        return snapshot, positions
+
+    def match(self, items, latitude=None, longitude=None, max_distance=None, limit=10):
+        """
+        Rank organizations for ``items``, a list of (id, category_id, expiry_date).
+
+        Returns up to ``limit`` dicts with the organization id, its score, its
+        distance (None when the donor has no location) and the matched item ids.
+        """
+        snapshot = self.snapshot()
+        by_category = snapshot['by_category']
+        items = [item for item in items if item[1] in by_category]
+        if not items:
+            return []
+
+        # Items expiring today count double, items a week out ~1.1x
+        today = timezone.localdate()
+        days_left = np.array([max((expiry - today).days, 0) for _, _, expiry in items], dtype=np.float64)
+        item_weights = 1 + 1 / (1 + days_left)
+        item_categories = np.array([category_id for _, category_id, _ in items], dtype=np.int64)
+        category_ids, inverse = np.unique(item_categories, return_inverse=True)
+        category_weights = np.bincount(inverse, weights=item_weights)
+
+        positions = np.concatenate([by_category[int(c)][0] for c in category_ids])
+        weights = np.concatenate([
+            by_category[int(c)][1] * w for c, w in zip(category_ids, category_weights)
+        ])
+        candidates, inverse = np.unique(positions, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        distances = None
+        if latitude is not None and longitude is not None:
+            distances = haversine_km_batch(
+                latitude, longitude,
+                snapshot['lat_radians'][candidates],
+                snapshot['lng_radians'][candidates],
+                snapshot['cos_lat'][candidates],
+            )
+            scores = scores / (1 + distances / DISTANCE_SCALE_KM)
+            within = ~np.isnan(distances)
+            if max_distance is not None:
+                within &= distances <= max_distance
+            candidates, scores, distances = candidates[within], scores[within], distances[within]
+
+        if limit < len(scores):
+            selected = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            selected = np.arange(len(scores))
+        selected = selected[np.argsort(-scores[selected], kind='stable')]
+
+        items_by_category = defaultdict(list)
+        for item_id, category_id, _ in items:
+            items_by_category[category_id].append(item_id)
+
+        matches = []
+        for i in selected:
+            position = int(candidates[i])
+            matched_items = []
+            for category_id in snapshot['categories'][position]:
+                matched_items.extend(items_by_category.get(category_id, ()))
+            matches.append({
+                'organization_id': int(snapshot['org_ids'][position]),
+                'score': float(scores[i]),
+                'distance': None if distances is None else float(distances[i]),
+                'matched_items': sorted(matched_items),
+            })
+        return matches
+
+
+need_index = NeedIndex()
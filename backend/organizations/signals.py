@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from donations.models import Organization, OrganizationNeed
+from .engine import distance_engine
+from .matching import need_index
+
+
+@receiver(post_save, sender=Organization)
+def organization_saved(sender, instance, **kwargs):
+    distance_engine.organization_changed(instance)
+    need_index.organization_changed(instance)
+
+
+@receiver(post_delete, sender=Organization)
+def organization_deleted(sender, instance, **kwargs):
+    distance_engine.organization_changed(instance, deleted=True)
+    need_index.organization_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=OrganizationNeed)
+@receiver(post_delete, sender=OrganizationNeed)
+def organization_need_changed(sender, instance, **kwargs):
+    need_index.invalidate()
@@ -0,0 +1,346 @@
+import random
+from datetime import date, timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config.profiling import ProfilingMiddleware
+from config.query_budget import QueryBudgetMiddleware
+from donations.models import Organization, OrganizationNeed
+from food.models import FoodCategory, FoodItem
+from users.authentication import issue_token
+
+from .engine import distance_engine
+from .geo import grid_cell, haversine_km
+from .matching import need_index
+from .views import MatchOrganizationsView
+
+User = get_user_model()
+
+
+def create_organization(number, latitude=None, longitude=None, is_verified=True):
+    user = User.objects.create_user(
+        username=f'org-{number}', email=f'org-{number}@example.com', password=None,
+        user_type='organization'
+    )
+    return Organization.objects.create(
+        user=user, name=f'Organization {number}', address='1 Main St', city='Springfield',
+        state='IL', zip_code='62701', phone_number='555-0100', email=user.email,
+        latitude=latitude, longitude=longitude, is_verified=is_verified
+    )
+
+
+class NearbyOrganizationsTests(TestCase):
+    """Radius and nearest-k lookups of verified organizations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        positions = {
+            'center': ('39.781721', '-89.650148'),
+            'north_4km': ('39.820000', '-89.650148'),
+            'east_30km': ('39.781721', '-89.300000'),
+            'west_of_antimeridian': ('10.000000', '179.990000'),
+            'east_of_antimeridian': ('10.000000', '-179.990000'),
+            'pole_greenwich': ('89.950000', '0.000000'),
+            'pole_dateline': ('89.950000', '180.000000'),
+        }
+        cls.organizations = {
+            name: create_organization(number, *position)
+            for number, (name, position) in enumerate(positions.items())
+        }
+        cls.unverified = create_organization(len(positions), '39.781800', '-89.650100', is_verified=False)
+        cls.user = User.objects.create_user(username='donor', email='donor@example.com', password=None)
+
+    def setUp(self):
+        distance_engine.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def nearby(self, **params):
+        response = self.client.get('/api/organizations/nearby/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def nearby_names(self, **params):
+        names = {organization.id: name for name, organization in self.organizations.items()}
+        return [names[row['id']] for row in self.nearby(**params)]
+
+    def test_radius_defaults_to_10km(self):
+        rows = self.nearby(lat=39.781721, lng=-89.650148)
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.organizations['center'].id, self.organizations['north_4km'].id]
+        )
+        self.assertEqual(rows[0]['distance'], 0)
+        self.assertAlmostEqual(rows[1]['distance'], 4.26, places=1)
+
+    def test_radius(self):
+        self.assertEqual(
+            self.nearby_names(lat=39.781721, lng=-89.650148, distance=50),
+            ['center', 'north_4km', 'east_30km']
+        )
+        self.assertEqual(self.nearby_names(lat=39.781721, lng=-89.650148, distance=0), ['center'])
+
+    def test_radius_across_the_antimeridian(self):
+        for lng in (179.999, -179.999):
+            with self.subTest(lng=lng):
+                self.assertEqual(
+                    set(self.nearby_names(lat=10, lng=lng, distance=5)),
+                    {'west_of_antimeridian', 'east_of_antimeridian'}
+                )
+
+    def test_radius_across_the_pole(self):
+        for lng in (90, -90, 179.5):
+            with self.subTest(lng=lng):
+                self.assertEqual(
+                    set(self.nearby_names(lat=89.95, lng=lng, distance=20)),
+                    {'pole_greenwich', 'pole_dateline'}
+                )
+
+    def test_nearest_k(self):
+        self.assertEqual(
+            self.nearby_names(lat=39.81, lng=-89.65, k=2), ['north_4km', 'center']
+        )
+        self.assertEqual(
+            self.nearby_names(lat=39.81, lng=-89.65, k=5, distance=10), ['north_4km', 'center']
+        )
+        # Without a distance, k reaches across the globe
+        self.assertEqual(len(self.nearby(lat=39.81, lng=-89.65, k=100)), len(self.organizations))
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'lat': 'x', 'lng': 0},
+            {'lat': 91, 'lng': 0},
+            {'lat': 0, 'lng': 0, 'distance': 'nan'},
+            {'lat': 0, 'lng': 0, 'distance': -1},
+            {'lat': 0, 'lng': 0, 'k': 0},
+            {'lat': 0, 'lng': 0, 'k': 101},
+            {'lat': 0, 'lng': 0, 'k': 'two'},
+        ):
+            with self.subTest(**params):
+                response = self.client.get('/api/organizations/nearby/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def nearest_ids(self):
+        return [org_id for org_id, _ in distance_engine.nearest(39.781721, -89.650148, 3, max_distance=10)]
+
+    def test_engine_follows_saves(self):
+        center, far = self.organizations['center'], self.organizations['east_30km']
+        self.assertNotIn(self.unverified.id, self.nearest_ids())
+
+        far.latitude, far.longitude = '39.781721', '-89.650000'
+        far.save()
+        self.assertIn(far.id, self.nearest_ids())
+
+        center.is_verified = False
+        center.save()
+        self.assertNotIn(center.id, self.nearest_ids())
+
+        self.unverified.is_verified = True
+        self.unverified.save()
+        self.assertIn(self.unverified.id, self.nearest_ids())
+
+    def test_engine_is_stale_after_queryset_update(self):
+        far = self.organizations['east_30km']
+        self.assertNotIn(far.id, self.nearest_ids())
+        # update() sends no signals: the snapshot keeps the old position until it expires
+        Organization.objects.filter(pk=far.pk).update(latitude='39.781721', longitude='-89.650000')
+        self.assertNotIn(far.id, self.nearest_ids())
+        with self.settings(ORGANIZATION_ENGINE_TTL=0):
+            self.assertIn(far.id, self.nearest_ids())
+
+
+class NearbyPrefilterTests(TestCase):
+    """The grid-cell prefilter never drops an organization within the radius."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        centers = [(39.78, -89.65), (0, 179.9), (-33.9, -179.95), (89.9, 45), (-89.85, -120), (0, 0)]
+        users = User.objects.bulk_create([
+            User(username=f'org-{number}', email=f'org-{number}@example.com', user_type='organization')
+            for number in range(300)
+        ])
+        organizations = []
+        for number, user in enumerate(users):
+            lat, lng = centers[number % len(centers)]
+            latitude = f'{max(-90, min(90, lat + rng.uniform(-0.5, 0.5))):.6f}'
+            longitude = f'{(lng + rng.uniform(-3, 3) + 180) % 360 - 180:.6f}'
+            organizations.append(Organization(
+                user=user, name=f'Organization {number}', address='1 Main St', city='Springfield',
+                state='IL', zip_code='62701', phone_number='555-0100', email=user.email,
+                latitude=latitude, longitude=longitude, geo_cell=grid_cell(latitude, longitude),
+                is_verified=True
+            ))
+        Organization.objects.bulk_create(organizations)
+        cls.positions = [
+            (organization.id, float(organization.latitude), float(organization.longitude))
+            for organization in Organization.objects.all()
+        ]
+        cls.centers = centers
+
+    def test_matches_brute_force(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.first())
+        found = 0
+        for lat, lng in self.centers:
+            for distance in (5, 20, 60, 250):
+                with self.subTest(lat=lat, lng=lng, distance=distance):
+                    response = client.get(
+                        '/api/organizations/nearby/', {'lat': lat, 'lng': lng, 'distance': distance}
+                    )
+                    expected = {
+                        org_id for org_id, org_lat, org_lng in self.positions
+                        if haversine_km(lat, lng, org_lat, org_lng) <= distance
+                    }
+                    self.assertEqual({row['id'] for row in response.data}, expected)
+                    found += len(expected)
+        self.assertGreater(found, 200)
+
+
+class MatchOrganizationsTests(TestCase):
+    """Ranking organizations for a donor's items."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = FoodCategory.objects.create(name='Produce', shelf_life_days=7)
+        cls.located = create_organization(0, latitude='39.781721', longitude='-89.650148')
+        cls.unlocated = create_organization(1)
+        for organization in (cls.located, cls.unlocated):
+            OrganizationNeed.objects.create(organization=organization, food_category=category)
+        cls.donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password=None
+        )
+        FoodItem.objects.create(
+            user=cls.donor, name='Apples', category=category, quantity='1.00', unit='kg',
+            expiry_date=date.today() + timedelta(days=2)
+        )
+
+    def setUp(self):
+        need_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.donor)
+
+    def set_location(self, latitude, longitude):
+        self.donor.latitude, self.donor.longitude = latitude, longitude
+        self.donor.save()
+
+    def matched_ids(self, path='/api/organizations/match/'):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['organization']['id'] for row in response.data}
+
+    def test_donor_without_location_matches_every_organization(self):
+        self.assertEqual(self.matched_ids(), {self.located.id, self.unlocated.id})
+
+    def test_donor_with_location_matches_located_organizations(self):
+        self.set_location('39.800000', '-89.600000')
+        self.assertEqual(self.matched_ids(), {self.located.id})
+        self.assertEqual(self.matched_ids('/api/organizations/match/?distance=0'), set())
+
+    def test_distance_without_location_is_rejected(self):
+        response = self.client.get('/api/organizations/match/?distance=5')
+        self.assertEqual(response.status_code, 400)
+
+    def test_negative_distance_is_rejected(self):
+        self.set_location('39.800000', '-89.600000')
+        response = self.client.get('/api/organizations/match/?distance=-1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non-negative', response.data['detail'])
+
+
+class MatchQueryCountTests(TestCase):
+    """Matching runs a fixed number of queries, however many items a donor has."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(9)
+        categories = FoodCategory.objects.bulk_create([
+            FoodCategory(name=f'Category {number}', shelf_life_days=7) for number in range(30)
+        ])
+        organizations = [
+            create_organization(
+                number, latitude=f'{39.5 + rng.random():.6f}', longitude=f'{-90 + rng.random():.6f}'
+            )
+            for number in range(60)
+        ]
+        OrganizationNeed.objects.bulk_create([
+            OrganizationNeed(organization=organization, food_category=category, priority=rng.randint(0, 3))
+            for organization in organizations
+            for category in rng.sample(categories, 5)
+        ])
+        cls.donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password=None,
+            latitude='40.000000', longitude='-89.500000'
+        )
+        cls.few = User.objects.create_user(
+            username='few', email='few@example.com', password=None,
+            latitude='40.000000', longitude='-89.500000'
+        )
+        FoodItem.objects.bulk_create([
+            FoodItem(
+                user=user, name=f'Item {number}', category=categories[number % len(categories)],
+                quantity='1.00', unit='kg', expiry_date=date.today() + timedelta(days=number % 10)
+            )
+            for user, count in ((cls.donor, 300), (cls.few, 1))
+            for number in range(count)
+        ])
+
+    def count_match_queries(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/organizations/match/?limit=50')
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries), response.data
+
+    def test_query_count_does_not_grow_with_items(self):
+        need_index.invalidate()
+        cold, _ = self.count_match_queries(self.donor)
+        few, _ = self.count_match_queries(self.few)
+        many, results = self.count_match_queries(self.donor)
+        self.assertEqual(cold, many + 1)
+        self.assertEqual(few, many)
+        self.assertLessEqual(cold, MatchOrganizationsView.query_budget)
+        self.assertEqual(len(results), 50)
+        scores = [row['score'] for row in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(row['matched_items'] for row in results))
+
+
+class AsyncViewTests(TestCase):
+    """The async views under ASGI, with the custom middleware in the chain."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization(0, latitude='39.781721', longitude='-89.650148')
+
+    def get_headers(self):
+        return {'AUTHORIZATION': f'Bearer {issue_token(self.organization.user)}'}
+
+    async def test_analytics_match_sync_view(self):
+        path = f'/api/organizations/analytics/{self.organization.id}/'
+        client = AsyncClient()
+        headers = await sync_to_async(self.get_headers)()
+        # Warm the user cache of the token authentication
+        await client.get(path, headers=headers)
+        sync_response = await client.get(path, headers=headers)
+        async_response = await client.get(path + 'async/', headers=headers)
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+        # Queries run in the sync_to_async thread are still counted
+        self.assertEqual(async_response['X-Query-Count'], sync_response['X-Query-Count'])
+        self.assertNotEqual(async_response['X-Query-Count'], '0')
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, REQUEST_PROFILING=True)
+    def test_custom_middleware_stays_async(self):
+        async def get_response(request):
+            return None
+
+        for middleware in (QueryBudgetMiddleware, ProfilingMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                self.assertTrue(iscoroutinefunction(middleware(get_response)))
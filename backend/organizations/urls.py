@@ -1,8 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NearbyOrganizationsView, OrganizationAnalyticsView
+from .views import (
+    NearbyOrganizationsView,
+    AsyncNearbyOrganizationsView,
+    MatchOrganizationsView,
+    OrganizationAnalyticsView,
+    AsyncOrganizationAnalyticsView,
+)
 
 urlpatterns = [
     path('nearby/', NearbyOrganizationsView.as_view(), name='nearby-organizations'),
+    path('nearby/async/', AsyncNearbyOrganizationsView.as_view(), name='nearby-organizations-async'),
+    path('match/', MatchOrganizationsView.as_view(), name='match-organizations'),
     path('analytics/<int:organization_id>/', OrganizationAnalyticsView.as_view(), name='organization-analytics'),
+    path('analytics/<int:organization_id>/async/', AsyncOrganizationAnalyticsView.as_view(), name='organization-analytics-async'),
 ]
\ No newline at end of file
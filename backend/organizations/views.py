@@ -1,143 +1,296 @@
+from asgiref.sync import sync_to_async
 from rest_framework import status, permissions
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Avg, F, Q
-from donations.models import Organization, Donation
+from django.db.models import Sum, F, Q
+from donations.models import Organization, OrganizationDailyRollup, OrganizationDonorRollup
+from donations.rollups import STATUS_FIELDS
 from donations.serializers import OrganizationSerializer
 from django.utils import timezone
 from datetime import timedelta
-import math
+
+from config.async_api import AsyncAPIView
+from food.models import FoodItem
+from .engine import distance_engine
+from .geo import haversine_km, nearby_filter
+from .matching import need_index
 
 class NearbyOrganizationsView(APIView):
-    """View for finding nearby organizations."""
+    """
+    View for finding nearby organizations.
+    
+    Returns every verified organization within ``distance`` km of
+    ``lat``/``lng``, or only the ``k`` closest ones when ``k`` is given.
+    """
     
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
+    max_k = 100
     
     def get(self, request):
+        lat, lng, distance, k = self.get_params()
+        if k is not None:
+            # Only limit the k-nearest search by distance when asked to
+            nearest = distance_engine.nearest(lat, lng, k, max_distance=distance)
+        else:
+            distance = 10 if distance is None else distance
+            nearest = self.within_radius(lat, lng, distance, self.get_candidates(lat, lng, distance))
+        
+        organizations = self.get_organizations(nearest).in_bulk()
+        return Response(self.serialize(nearest, organizations))
+    
+    def get_params(self):
+        """Return the validated (lat, lng, distance, k) query parameters."""
         # Get latitude, longitude and distance (in km)
         lat = self.request.query_params.get('lat')
         lng = self.request.query_params.get('lng')
-        distance = self.request.query_params.get('distance', '10') # default 10km
+        distance = self.request.query_params.get('distance')
+        k = self.request.query_params.get('k')
         
         try:
             lat = float(lat)
             lng = float(lng)
-            distance = float(distance)
+            if distance is not None:
+                distance = float(distance)
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                raise ValueError
+            if distance is not None and not distance >= 0:
+                raise ValueError
         except (TypeError, ValueError):
+            raise ParseError('Invalid latitude, longitude, or distance.')
+        
+        if k is not None:
+            try:
+                k = int(k)
+                if not 1 <= k <= self.max_k:
+                    raise ValueError
+            except ValueError:
+                raise ParseError(f'k must be an integer between 1 and {self.max_k}.')
+        return lat, lng, distance, k
+    
+    def get_candidates(self, lat, lng, distance):
+        """Return (id, latitude, longitude) rows of verified organizations near the point."""
+        # Let the database narrow the search down to the grid cells around
+        # the point, then check the exact distance on that small candidate set
+        return Organization.objects.filter(
+            nearby_filter(lat, lng, distance),
+            is_verified=True
+        ).order_by().values_list('id', 'latitude', 'longitude')
+    
+    def within_radius(self, lat, lng, distance, candidates):
+        """Return (id, distance) pairs of the candidates within the radius."""
+        nearby = []
+        for org_id, org_lat, org_lng in candidates:
+            org_distance = haversine_km(lat, lng, float(org_lat), float(org_lng))
+            if org_distance <= distance:
+                nearby.append((org_id, org_distance))
+        
+        # Sort by distance
+        nearby.sort(key=lambda x: x[1])
+        return nearby
+    
+    def get_organizations(self, nearest):
+        return Organization.objects.filter(
+            id__in=[org_id for org_id, _ in nearest],
+            is_verified=True
+        ).select_related('user').prefetch_related('needs__food_category')
+    
+    def serialize(self, nearest, organizations):
+        nearby_orgs = []
+        for org_id, org_distance in nearest:
+            if org_id not in organizations:
+                # Removed or unverified since the engine snapshot was taken
+                continue
+            org_data = OrganizationSerializer(organizations[org_id]).data
+            org_data['distance'] = round(org_distance, 2)
+            nearby_orgs.append(org_data)
+        return nearby_orgs
+
+class AsyncNearbyOrganizationsView(AsyncAPIView, NearbyOrganizationsView):
+    """Async variant of NearbyOrganizationsView for ASGI deployments."""
+    
+    async def get(self, request):
+        lat, lng, distance, k = self.get_params()
+        if k is not None:
+            nearest = await sync_to_async(distance_engine.nearest)(lat, lng, k, max_distance=distance)
+        else:
+            distance = 10 if distance is None else distance
+            candidates = [row async for row in self.get_candidates(lat, lng, distance)]
+            nearest = self.within_radius(lat, lng, distance, candidates)
+        
+        organizations = await self.get_organizations(nearest).ain_bulk()
+        return Response(self.serialize(nearest, organizations))
+
+class MatchOrganizationsView(APIView):
+    """
+    View for ranking verified organizations for the current donor's food.
+    
+    Scores combine each organization's need priority for the categories
+    of the donor's available items, how soon those items expire and the
+    distance from the donor's location.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
+    max_limit = 50
+    
+    def get(self, request):
+        limit = request.query_params.get('limit', '10')
+        distance = request.query_params.get('distance')
+        try:
+            limit = int(limit)
+            if not 1 <= limit <= self.max_limit:
+                raise ValueError
+            if distance is not None:
+                distance = float(distance)
+                if not distance >= 0:
+                    raise ValueError
+        except ValueError:
             return Response(
-                {'detail': 'Invalid latitude, longitude, or distance.'},
+                {'detail': f'limit must be between 1 and {self.max_limit} and distance a non-negative number.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Basic haversine formula to filter organizations within distance
-        # This is a simplified approach for demonstration purposes
-        earth_radius = 6371  # km
+        user = request.user
+        latitude = float(user.latitude) if user.latitude is not None else None
+        longitude = float(user.longitude) if user.longitude is not None else None
+        if distance is not None and (latitude is None or longitude is None):
+            return Response(
+                {'detail': 'distance requires a location on your profile.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get all verified organizations
-        organizations = Organization.objects.filter(is_verified=True)
+        items = FoodItem.objects.filter(
+            user=request.user,
+            is_available=True,
+            is_donated=False,
+            category__isnull=False,
+            expiry_date__gte=timezone.localdate()
+        ).order_by().values_list('id', 'category_id', 'expiry_date')
         
-        nearby_orgs = []
-        for org in organizations:
-            if org.latitude is None or org.longitude is None:
-                continue
-                
-            # Calculate distance using haversine formula
-            dlat = math.radians(org.latitude - lat)
-            dlng = math.radians(org.longitude - lng)
-            a = (math.sin(dlat/2) * math.sin(dlat/2) +
-                 math.cos(math.radians(lat)) * math.cos(math.radians(org.latitude)) *
-                 math.sin(dlng/2) * math.sin(dlng/2))
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-            org_distance = earth_radius * c
-            
-            if org_distance <= distance:
-                org_data = OrganizationSerializer(org).data
-                org_data['distance'] = round(org_distance, 2)
-                nearby_orgs.append(org_data)
+        matches = need_index.match(
+            list(items), latitude, longitude, max_distance=distance, limit=limit
+        )
         
-        # Sort by distance
-        nearby_orgs.sort(key=lambda x: x['distance'])
+        organizations = Organization.objects.filter(
+            id__in=[match['organization_id'] for match in matches],
+            is_verified=True
+        ).select_related('user').prefetch_related('needs__food_category').in_bulk()
         
-        return Response(nearby_orgs)
+        results = []
+        for match in matches:
+            organization = organizations.get(match['organization_id'])
+            if organization is None:
+                continue
+            results.append({
+                'organization': OrganizationSerializer(organization).data,
+                'score': round(match['score'], 4),
+                'distance': None if match['distance'] is None else round(match['distance'], 2),
+                'matched_items': match['matched_items'],
+            })
+        
+        return Response(results)
 
 class OrganizationAnalyticsView(APIView):
     """View for getting analytics about an organization."""
     
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 5
+    
+    # Days covered by each ``period``
+    periods = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365}
     
     def get(self, request, organization_id):
         try:
             organization = Organization.objects.get(id=organization_id)
         except Organization.DoesNotExist:
-            return Response(
-                {'detail': 'Organization not found.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            raise NotFound('Organization not found.')
+        
+        rollups = OrganizationDailyRollup.objects.filter(organization=organization)
         
         # Check permissions
-        is_org_user = organization.user == request.user
-        if not (is_org_user or request.user.is_staff):
+        if not self.has_full_access(organization):
             # Only show basic metrics for non-org users
-            return Response({
-                'name': organization.name,
-                'total_donations_received': Donation.objects.filter(
-                    organization=organization,
-                    status='completed'
-                ).count()
-            })
+            return Response(self.basic_analytics(organization, rollups.aggregate(total=Sum('completed'))))
         
-        # Get time period for analytics
-        time_period = request.query_params.get('period', 'month')
-        if time_period == 'week':
-            start_date = timezone.now().date() - timedelta(days=7)
-        elif time_period == 'month':
-            start_date = timezone.now().date() - timedelta(days=30)
-        elif time_period == 'quarter':
-            start_date = timezone.now().date() - timedelta(days=90)
-        elif time_period == 'year':
-            start_date = timezone.now().date() - timedelta(days=365)
-        else:
-            start_date = timezone.now().date() - timedelta(days=30)  # Default to month
-        
-        # Get completed donations in time period
-        completed_donations = Donation.objects.filter(
+        time_period, start_date = self.get_period()
+        totals = rollups.aggregate(**self.get_aggregates(start_date))
+        top_donors = list(self.get_top_donors(organization))
+        return Response(self.full_analytics(organization, totals, top_donors, time_period))
+    
+    def has_full_access(self, organization):
+        return organization.user_id == self.request.user.id or self.request.user.is_staff
+    
+    def get_period(self):
+        """Return the requested period and the first date it covers."""
+        time_period = self.request.query_params.get('period', 'month')
+        # Default to month
+        days = self.periods.get(time_period, self.periods['month'])
+        return time_period, timezone.now().date() - timedelta(days=days)
+    
+    def get_aggregates(self, start_date):
+        """All counters come from the daily rollups in a single query."""
+        return {
+            'total_completed': Sum('completed'),
+            'period_completed': Sum('completed', filter=Q(date__gte=start_date)),
+            'rating_sum': Sum('rating_sum'),
+            'rating_count': Sum('rating_count'),
+            **{field: Sum(field) for field in STATUS_FIELDS}
+        }
+    
+    def get_top_donors(self, organization):
+        return OrganizationDonorRollup.objects.filter(
             organization=organization,
-            status='completed',
-            donation_date__gte=start_date
-        )
-        
-        # Calculate metrics
-        total_completed = completed_donations.count()
-        
+            completed_count__gt=0
+        ).order_by('-completed_count').values(
+            'donor__email', donation_count=F('completed_count')
+        )[:5]
+    
+    def basic_analytics(self, organization, totals):
+        return {
+            'name': organization.name,
+            'total_donations_received': totals['total'] or 0
+        }
+    
+    def full_analytics(self, organization, totals, top_donors, time_period):
         # Calculate average rating from feedback
-        average_rating = Donation.objects.filter(
-            organization=organization,
-            status='completed',
-            feedback__isnull=False
-        ).aggregate(avg_rating=Avg('feedback__rating'))['avg_rating'] or 0
-        
-        # Top donors
-        top_donors = Donation.objects.filter(
-            organization=organization,
-            status='completed'
-        ).values('donor__email').annotate(
-            donation_count=Count('id')
-        ).order_by('-donation_count')[:5]
+        rating_count = totals['rating_count'] or 0
+        average_rating = totals['rating_sum'] / rating_count if rating_count else 0
         
-        # Return analytics data
-        analytics = {
+        return {
             'name': organization.name,
-            'total_donations_all_time': Donation.objects.filter(
-                organization=organization,
-                status='completed'
-            ).count(),
-            'total_donations_period': total_completed,
+            'total_donations_all_time': totals['total_completed'] or 0,
+            'total_donations_period': totals['period_completed'] or 0,
             'average_rating': round(average_rating, 1),
-            'top_donors': list(top_donors),
-            'donation_status_breakdown': list(Donation.objects.filter(
-                organization=organization
-            ).values('status').annotate(count=Count('id')).order_by('status')),
+            'top_donors': top_donors,
+            'donation_status_breakdown': [
+                {'status': field, 'count': totals[field]}
+                for field in sorted(STATUS_FIELDS) if totals[field]
+            ],
             'period': time_period
         }
+
+class AsyncOrganizationAnalyticsView(AsyncAPIView, OrganizationAnalyticsView):
+    """Async variant of OrganizationAnalyticsView for ASGI deployments."""
+    
+    async def get(self, request, organization_id):
+        try:
+            organization = await Organization.objects.aget(id=organization_id)
+        except Organization.DoesNotExist:
+            raise NotFound('Organization not found.')
+        
+        rollups = OrganizationDailyRollup.objects.filter(organization=organization)
         
-        return Response(analytics)
\ No newline at end of file
+        if not self.has_full_access(organization):
+            totals = await rollups.aaggregate(total=Sum('completed'))
+            return Response(self.basic_analytics(organization, totals))
+        
+        time_period, start_date = self.get_period()
+        # The ORM runs a request's queries one at a time, so there is nothing to gain from gather()
+        totals = await rollups.aaggregate(**self.get_aggregates(start_date))
+        top_donors = await self.afetch_top_donors(organization)
+        return Response(self.full_analytics(organization, totals, top_donors, time_period))
+    
+    async def afetch_top_donors(self, organization):
+        return [row async for row in self.get_top_donors(organization)]
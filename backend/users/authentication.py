@@ -0,0 +1,72 @@
+"""
+Signed, expiring API tokens.
+
+Tokens are issued by the login view and carry the user id and the
+user's ``token_version``, signed with an HMAC of ``SECRET_KEY``.
+Verifying one costs a signature check and a cached user lookup instead
+of the password hash Basic authentication runs on every request.
+Incrementing ``User.token_version`` revokes all of a user's tokens.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from .cache import get_cached_user, invalidate_cached_user
+
+TOKEN_SALT = 'users.authentication.token'
+
+
+def get_token_max_age():
+    return getattr(settings, 'AUTH_TOKEN_MAX_AGE', 60 * 60 * 24)
+
+
+def issue_token(user):
+    """Return a signed token for ``user``."""
+    payload = {'u': user.pk, 'v': user.token_version}
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign_object(payload, compress=True)
+
+
+def revoke_tokens(user):
+    """Invalidate every token issued to ``user`` so far."""
+    # Increment in the database so concurrent revocations are not lost
+    get_user_model().objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    invalidate_cached_user(user.pk)
+    user.refresh_from_db(fields=['token_version'])
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate requests carrying ``Authorization: Bearer <token>``.
+    """
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            token = auth[1].decode()
+            payload = signing.TimestampSigner(salt=TOKEN_SALT).unsign_object(
+                token, max_age=get_token_max_age()
+            )
+            user_id, version = payload['u'], payload['v']
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        except (signing.BadSignature, UnicodeError, TypeError, KeyError, ValueError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active or user.token_version != version:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
@@ -0,0 +1,18 @@
+"""
+Authentication backend that resolves session users through the user cache.
+
+``AuthenticationMiddleware`` loads the session's user on every request;
+with this backend that is served from ``users.cache`` instead of a query.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose ``get_user`` reads through the user cache."""
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
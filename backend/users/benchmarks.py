@@ -0,0 +1,47 @@
+"""
+Benchmarks of request authentication (``manage.py run_benchmarks``).
+"""
+
+import base64
+
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.microbench import benchmark, scratch_data, time_call
+
+from .authentication import SignedTokenAuthentication, issue_token
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-password'
+
+
+@benchmark('authentication')
+def authentication(sizes, repeat, log):
+    """Authenticating one request: signed Bearer token vs HTTP Basic (password hash)."""
+    factory = APIRequestFactory()
+    rows = []
+    with scratch_data():
+        user = User.objects.create_user(
+            username='benchmark-auth', email='benchmark-auth@example.com', password=PASSWORD
+        )
+        credentials = base64.b64encode(f'{user.email}:{PASSWORD}'.encode()).decode()
+        schemes = [
+            ('token', SignedTokenAuthentication(), f'Bearer {issue_token(user)}'),
+            ('basic', BasicAuthentication(), f'Basic {credentials}'),
+        ]
+        for name, authenticator, header in schemes:
+            def authenticate():
+                request = Request(factory.get('/api/users/profile/', HTTP_AUTHORIZATION=header))
+                assert authenticator.authenticate(request)[0].pk == user.pk
+
+            timings = time_call(authenticate, repeat)
+            rows.append({
+                'scheme': name,
+                'p50_ms': timings['p50_ms'],
+                'mean_ms': timings['mean_ms'],
+                'requests_per_s': round(1000 / timings['mean_ms']),
+            })
+    return rows
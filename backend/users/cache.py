@@ -0,0 +1,33 @@
+"""
+Short-lived cache of User rows for the authentication path.
+
+Authenticating a request only needs the user row, which rarely changes,
+so it is cached for ``USER_CACHE_TIMEOUT`` seconds. Saving or deleting a
+user drops the entry (see ``users.signals``); with a per-process cache
+backend other processes may serve the old row until it times out.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Return the user with this primary key, or None if there is none."""
+    key = _key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        user = User._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, getattr(settings, 'USER_CACHE_TIMEOUT', 60))
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(_key(user_id))
@@ -23,6 +23,9 @@ class User(AbstractUser):
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     profile_image = models.URLField(blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
+    token_version = models.PositiveIntegerField(
+        default=0, help_text=_("Incremented to revoke every API token issued to the user")
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
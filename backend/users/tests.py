@@ -0,0 +1,148 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signing import b64_decode, b64_encode
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .authentication import issue_token, revoke_tokens
+from .cache import get_cached_user
+
+User = get_user_model()
+
+
+class TokenRevocationTests(TestCase):
+    """Revoking the signed API tokens of a user."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='donor', email='donor@example.com', password=None
+        )
+
+    def get_profile(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client.get('/api/users/profile/')
+
+    def test_revoked_token_is_rejected(self):
+        token = issue_token(self.user)
+        self.assertEqual(self.get_profile(token).status_code, 200)
+        revoke_tokens(self.user)
+        self.assertEqual(self.get_profile(token).status_code, 401)
+        self.assertEqual(self.get_profile(issue_token(self.user)).status_code, 200)
+
+    def test_concurrent_revocations_are_not_lost(self):
+        # Two requests holding the same stale user row
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        revoke_tokens(first)
+        revoke_tokens(second)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 2)
+        self.assertEqual(second.token_version, 2)
+
+
+class SignedTokenTests(TestCase):
+    """Logging in and authenticating with signed API tokens."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='donor', email='donor@example.com', password='correct horse battery'
+        )
+
+    def get_profile(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client.get('/api/users/profile/')
+
+    def test_login_issues_a_signed_token(self):
+        response = APIClient().post('/api/users/login/', {
+            'email': 'donor@example.com', 'password': 'correct horse battery',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['token_expires_in'], 60 * 60 * 24)
+        profile = self.get_profile(response.data['token'])
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(profile.data['email'], 'donor@example.com')
+
+    def test_wrong_password_issues_no_token(self):
+        response = APIClient().post('/api/users/login/', {
+            'email': 'donor@example.com', 'password': 'wrong',
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('token', response.data)
+
+    @override_settings(AUTH_TOKEN_MAX_AGE=60)
+    def test_token_expires_after_max_age(self):
+        issued = time.time()
+        with patch('django.core.signing.time.time', return_value=issued):
+            token = issue_token(self.user)
+        with patch('django.core.signing.time.time', return_value=issued + 59):
+            self.assertEqual(self.get_profile(token).status_code, 200)
+        with patch('django.core.signing.time.time', return_value=issued + 61):
+            response = self.get_profile(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(str(response.data['detail']), 'Token has expired.')
+
+    def test_tampered_token_is_rejected(self):
+        token = issue_token(self.user)
+        value, timestamp, signature = token.rsplit(':', 2)
+        other = User.objects.create_user(username='other', email='other@example.com', password=None)
+        other_value = issue_token(other).rsplit(':', 2)[0]
+        digest = b64_decode(signature.encode())
+        flipped = b64_encode(bytes([digest[0] ^ 1]) + digest[1:])
+        for tampered in (
+            f'{other_value}:{timestamp}:{signature}',
+            f'{value}:{timestamp}:{flipped.decode()}',
+            f'{value}:{timestamp}',
+            'not-a-token',
+        ):
+            with self.subTest(token=tampered):
+                response = self.get_profile(tampered)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(str(response.data['detail']), 'Invalid token.')
+
+
+class SessionUserCacheTests(TestCase):
+    """Session users are served from the user cache and the session cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='donor', email='donor@example.com', password=None, first_name='Old'
+        )
+        self.client = APIClient()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_session_user_is_served_from_cache(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'donor@example.com')
+
+    def test_profile_update_invalidates_cached_user(self):
+        self.assertEqual(self.client.get('/api/users/profile/').data['first_name'], 'Old')
+        response = self.client.patch('/api/users/profile/', {'first_name': 'New'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(get_cached_user(self.user.pk).first_name, 'New')
+        self.assertEqual(self.client.get('/api/users/profile/').data['first_name'], 'New')
+
+    def test_inactive_cached_user_is_logged_out(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        # update() sends no signal, so drop the cached row by hand
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertIn(self.client.get('/api/users/profile/').status_code, (401, 403))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_session_survives_a_cache_clear(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        cache.clear()
+        response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'donor@example.com')
@@ -3,6 +3,7 @@ from .views import (
     UserRegisterView,
     UserLoginView,
     UserLogoutView,
+    UserTokenRevokeView,
     UserProfileView,
     UserListView,
 )
@@ -11,6 +12,7 @@ urlpatterns = [
     path('register/', UserRegisterView.as_view(), name='user-register'),
     path('login/', UserLoginView.as_view(), name='user-login'),
     path('logout/', UserLogoutView.as_view(), name='user-logout'),
+    path('token/revoke/', UserTokenRevokeView.as_view(), name='user-token-revoke'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
     path('', UserListView.as_view(), name='user-list'),
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
 
+from .authentication import get_token_max_age, issue_token, revoke_tokens
 from .serializers import UserSerializer, UserLoginSerializer, UserRegisterSerializer
 
 User = get_user_model()
@@ -41,6 +42,8 @@ class UserLoginView(APIView):
                 login(request, user)
                 return Response({
                     'user': UserSerializer(user).data,
+                    'token': issue_token(user),
+                    'token_expires_in': get_token_max_age(),
                     'message': 'Login successful'
                 }, status=status.HTTP_200_OK)
             return Response({'message': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -53,6 +56,13 @@ class UserLogoutView(APIView):
         logout(request)
         return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
+class UserTokenRevokeView(APIView):
+    """View for revoking every API token issued to the current user."""
+    
+    def post(self, request, *args, **kwargs):
+        revoke_tokens(request.user)
+        return Response({'message': 'Tokens revoked'}, status=status.HTTP_200_OK)
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """View for retrieving and updating user profile."""
     